@@ -0,0 +1,52 @@
+"""
+Validation time of participants.tsv style columns, per cell val_checker against the compiled column validators
+
+    python benchmarks/bench_column_validation.py [--rows N]
+"""
+from __future__ import annotations
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsbuilder.modules.schema_objects import _set_object_schemas, Column
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    _set_object_schemas(parse_load_schema())
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "participant_id": [f"sub-{i:07d}" for i in range(args.rows)],
+        "age": rng.integers(18, 95, args.rows).astype(object),
+        "sex": rng.choice(["M", "F", "male", "other"], args.rows).astype(object),
+        "handedness": rng.choice(["left", "right", "ambidextrous", "up"], args.rows).astype(object),
+    })
+
+    total_cell, total_comp = 0.0, 0.0
+    for name in frame.columns:
+        col = Column(name, "optional")
+        series = frame[name]
+
+        start = time.perf_counter()
+        expected = [col.val_checker(val) for val in series]
+        t_cell = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = col.vectorized_val_checker(series)
+        t_comp = time.perf_counter() - start
+
+        assert result.tolist() == expected, f"compiled validator disagrees with val_checker for {name}"
+        total_cell += t_cell
+        total_comp += t_comp
+        print(f"{name:>15}: per cell {t_cell:8.2f} s  compiled {t_comp:8.3f} s  ({t_cell / t_comp:6.1f}x)")
+
+    print(f"{'total':>15}: per cell {total_cell:8.2f} s  compiled {total_comp:8.3f} s  ({total_cell / total_comp:6.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Memory held by hooked descriptors once filenames are dropped, creating and dropping 100k CompositeFilenames
+
+    python benchmarks/bench_descriptor_memory.py [--filenames N] [--rounds R]
+"""
+from __future__ import annotations
+
+import gc
+import time
+import argparse
+import tracemalloc
+
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsbuilder.modules.schema_objects import _set_object_schemas
+from bidsbuilder.modules.core.filenames import CompositeFilename
+
+def make(n:int) -> list[CompositeFilename]:
+    names = []
+    for i in range(n):
+        name = CompositeFilename.create(entities={"subject": ("required", f"{i:06d}")}, suffix="eeg")
+        name.entities # containers are wrapped on first access
+        names.append(name)
+    return names
+
+def descriptor_entries() -> int:
+    return sum(len(CompositeFilename.__dict__[key].variables) for key in ("entities", "suffix", "datatype"))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filenames", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    _set_object_schemas(parse_load_schema())
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    for r in range(args.rounds):
+        start = time.perf_counter()
+        names = make(args.filenames)
+        t_make = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[0] - baseline
+
+        del names
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        print(f"round {r}: create {t_make:5.2f} s  live {peak / 2**20:7.1f} MiB  "
+              f"retained after drop {retained / 2**20:7.1f} MiB  descriptor entries {descriptor_entries()}")
+
+if __name__ == "__main__":
+    main()
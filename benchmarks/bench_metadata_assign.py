@@ -0,0 +1,50 @@
+"""
+Cost of assigning sidecar metadata values, interpreting the rules on every assignment against the compiled validators
+
+    python benchmarks/bench_metadata_assign.py [--sidecars N]
+"""
+from __future__ import annotations
+
+import time
+import argparse
+
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsbuilder.modules.schema_objects import _set_object_schemas, Metadata
+
+SIDECAR = {
+    "TaskName": "rest",
+    "SamplingFrequency": 1000.0,
+    "PowerLineFrequency": 50,
+    "EEGReference": "Cz",
+    "SoftwareFilters": "n/a",
+    "EEGChannelCount": 64,
+    "RecordingDuration": 600.5,
+    "RecordingType": "continuous",
+    "Manufacturer": "Brain Products",
+}
+
+def interpreted(meta:Metadata, val):
+    is_correct, error_msg = meta._validate_new_val(val, meta._rules(), f"Value: {val} for {meta.name} is not valid:\n")
+    if not is_correct:
+        raise ValueError(error_msg)
+    meta._val = val
+
+def compiled(meta:Metadata, val):
+    meta.val = val
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sidecars", type=int, default=20_000)
+    args = parser.parse_args()
+
+    _set_object_schemas(parse_load_schema())
+
+    for label, assign in (("interpreted", interpreted), ("compiled", compiled)):
+        start = time.perf_counter()
+        for _ in range(args.sidecars):
+            for key, val in SIDECAR.items():
+                assign(Metadata(key, "recommended"), val)
+        print(f"{label:>12}: {time.perf_counter() - start:6.2f} s for {args.sidecars} sidecars")
+
+if __name__ == "__main__":
+    main()
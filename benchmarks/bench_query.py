@@ -0,0 +1,68 @@
+"""
+Time to find files by entity with dataset.query against walking the tree and resolving every filename
+
+Uses the dataset of bench_read_dataset (sub x 2 sessions x runs x 4 files), read into the object model.
+
+    python benchmarks/bench_query.py [--subjects N] [--runs N] [--repeat N]
+"""
+from __future__ import annotations
+
+import time
+import argparse
+import tempfile
+
+from pathlib import Path
+
+import mne
+
+from bidsbuilder import BidsDataset
+from bidsbuilder.modules.core.dataset_tree import FileCollection
+from bidsbuilder.modules.core.filenames import CompositeFilename
+from bench_read_dataset import make_dataset
+
+def scan(dataset:BidsDataset, criteria:dict) -> list:
+    """what the index replaces"""
+    found = []
+    for node in dataset.tree._iter_tree():
+        if isinstance(node, FileCollection) or node.parent.is_dir or not isinstance(node.parent._name_link, CompositeFilename):
+            continue
+        filename = node.parent._name_link
+        values = {key: str(val.val) for key, val in filename.resolved_entities.items()}
+        values["suffix"] = filename.resolved_suffix
+        values["extension"] = node.name
+        if all(values.get(key) == val for key, val in criteria.items()):
+            found.append(node._file_link)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subjects", type=int, default=250)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    mne.set_log_level("WARNING")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_dataset(Path(tmp), args.subjects, args.runs)
+        dataset = BidsDataset(tmp, minimal=True).read()
+        criteria = {"subject": "00007", "run": "2", "suffix": "eeg", "extension": ".edf"}
+
+        start = time.perf_counter()
+        expected = scan(dataset, criteria)
+        walk = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dataset.query(**criteria)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            found = dataset.query(**criteria)
+        query = (time.perf_counter() - start) / args.repeat
+        assert found == expected
+
+        print(f"{len(dataset.tree._query_index)} files: walk {walk * 1e3:.1f} ms, "
+              f"first query (builds the index) {build * 1e3:.1f} ms, query {query * 1e3:.3f} ms")
+
+if __name__ == "__main__":
+    main()
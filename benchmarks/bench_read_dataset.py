@@ -0,0 +1,61 @@
+"""
+Time to read an existing dataset of sub x 2 sessions x runs x 4 files into the object model
+
+    python benchmarks/bench_read_dataset.py [--subjects N] [--runs N] [--workers N] [--root PATH] [--lazy]
+"""
+from __future__ import annotations
+
+import json
+import time
+import argparse
+import tempfile
+
+from pathlib import Path
+
+import mne
+
+from bidsbuilder import BidsDataset
+
+def make_dataset(root:Path, subjects:int, runs:int):
+    (root / "dataset_description.json").write_text(json.dumps({"Name": "bench", "BIDSVersion": "1.10.0"}))
+    rows = ["participant_id\tage"]
+    for s in range(subjects):
+        sub = f"sub-{s:05d}"
+        rows.append(f"{sub}\t{20 + s % 60}")
+        for ses in ("a", "b"):
+            eeg = root / sub / f"ses-{ses}" / "eeg"
+            eeg.mkdir(parents=True)
+            for run in range(1, runs + 1):
+                stem = f"{sub}_ses-{ses}_task-rest_run-{run}"
+                (eeg / f"{stem}_eeg.json").write_text('{"TaskName": "rest", "SamplingFrequency": 256}')
+                (eeg / f"{stem}_eeg.edf").write_bytes(b"0")
+                (eeg / f"{stem}_channels.tsv").write_text("name\ttype\tunits\nFp1\tEEG\tuV\n")
+                (eeg / f"{stem}_events.tsv").write_text("onset\tduration\n0\t1\n")
+    (root / "participants.tsv").write_text("\n".join(rows) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subjects", type=int, default=1250)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--root", type=str, default=None, help="existing dataset to read instead of a generated one")
+    parser.add_argument("--lazy", action="store_true", help="leave JSON and TSV files unread until accessed")
+    args = parser.parse_args()
+    mne.set_log_level("WARNING")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.root) if args.root else Path(tmp)
+        if args.root is None:
+            start = time.perf_counter()
+            make_dataset(root, args.subjects, args.runs)
+            print(f"generated {args.subjects * args.runs * 8} files in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        dataset = BidsDataset(root.as_posix(), minimal=True, lazy=args.lazy).read(workers=args.workers)
+        elapsed = time.perf_counter() - start
+
+        n_nodes = sum(1 for _ in dataset.tree._iter_tree())
+        print(f"read {n_nodes} tree nodes in {elapsed:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup benchmark for loading the interpreted schema
+
+Compares compiling every selector up front (eager) with deferring compilation until a selector is first checked (lazy),
+both when building from scratch and when loading from the on-disk cache. Each measurement runs in a fresh subprocess
+so the lru_caches in bidsschematools and bidsbuilder don't hide the cost.
+
+    python benchmarks/bench_schema_startup.py [--repeat N] [--dataset]
+
+--dataset additionally creates a minimal BidsDataset after loading, which is what a typical session pays for.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+_SNIPPET = """
+import gc, json, time, tracemalloc
+from bidsbuilder import BidsDataset, main_module
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsschematools.schema import _find
+
+if {trace}:
+    tracemalloc.start()
+start = time.perf_counter()
+
+schema = parse_load_schema(use_cache={use_cache}, lazy={lazy})
+if {dataset}:
+    main_module.parse_load_schema = lambda: schema
+    BidsDataset(r"{root}", minimal=True)
+
+elapsed = time.perf_counter() - start
+gc.collect()
+current, peak = tracemalloc.get_traced_memory()
+
+hooks = [s["selectors"] for s in _find(schema, lambda obj: "selectors" in obj)]
+compiled = sum(1 for h in hooks if h.is_compiled)
+print(json.dumps({{"time": elapsed, "current": current, "peak": peak, "compiled": compiled, "total": len(hooks)}}))
+"""
+
+def _run(cache_dir:str, root:str, use_cache:bool, lazy:bool, dataset:bool, trace:bool=False) -> dict:
+    """Run a single measurement in a fresh interpreter, imports happen before the timer starts"""
+    code = _SNIPPET.format(use_cache=use_cache, lazy=lazy, dataset=dataset, root=root, trace=trace)
+    env = {**os.environ, "BIDSBUILDER_CACHE_DIR": cache_dir}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dataset", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as root:
+        print(f"{'mode':<16}{'time (ms)':>12}{'traced MiB':>12}{'peak MiB':>12}{'compiled':>14}")
+        for use_cache in (False, True):
+            for lazy in (False, True):
+                if use_cache: # populate the cache entry outside of the timed runs
+                    _run(cache_dir, root, use_cache, lazy, False)
+
+                # time and memory are measured in separate runs, tracemalloc slows everything down considerably
+                timed = [_run(cache_dir, root, use_cache, lazy, args.dataset) for _ in range(args.repeat)]
+                traced = _run(cache_dir, root, use_cache, lazy, args.dataset, trace=True)
+
+                name = f"{'cached' if use_cache else 'build'}/{'lazy' if lazy else 'eager'}"
+                t = statistics.median(r["time"] for r in timed) * 1000
+                cur = traced["current"] / 2**20
+                peak = traced["peak"] / 2**20
+                compiled = f"{traced['compiled']}/{traced['total']}"
+                print(f"{name:<16}{t:>12.1f}{cur:>12.2f}{peak:>12.2f}{compiled:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of selector evaluation, interpreted selectorFunc trees against the compiled selectorHook
+
+Every selector in the bundled schema is evaluated against every file of a minimal dataset. Selectors which raise
+when interpreted (mostly unimplemented context fields) are left out of both timings.
+
+    python benchmarks/bench_selectors.py [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import timeit
+
+from bidsschematools.schema import _find
+
+from bidsbuilder import BidsDataset
+
+def _collect(dataset:BidsDataset) -> list[tuple]:
+    cores = [node._file_link for node in dataset.tree._iter_tree() if node._file_link]
+    hooks = [struct["selectors"] for struct in _find(dataset.schema, lambda obj: "selectors" in obj)]
+
+    pairs = []
+    for hook in hooks:
+        for core in cores:
+            try:
+                expected = hook.interpret(core)
+            except Exception:
+                continue
+            assert hook(core) == expected, f"compiled selector disagrees with the interpreter for {hook.original}"
+            pairs.append((hook, core))
+    return pairs
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        dataset = BidsDataset(root, minimal=True)
+        pairs = _collect(dataset)
+
+        def interpreted():
+            for hook, core in pairs:
+                hook.interpret(core)
+
+        def compiled():
+            for hook, core in pairs:
+                hook(core)
+
+        t_interp = min(timeit.repeat(interpreted, number=1, repeat=args.repeat))
+        t_comp = min(timeit.repeat(compiled, number=1, repeat=args.repeat))
+
+    n = len(pairs)
+    print(f"{n} selector evaluations per pass")
+    print(f"interpreted: {t_interp * 1000:8.2f} ms  ({t_interp / n * 1e6:6.2f} us/selector)")
+    print(f"compiled:    {t_comp * 1000:8.2f} ms  ({t_comp / n * 1e6:6.2f} us/selector)")
+    print(f"speedup:     {t_interp / t_comp:8.2f}x")
+
+if __name__ == "__main__":
+    main()
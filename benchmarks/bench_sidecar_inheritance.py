@@ -0,0 +1,68 @@
+"""
+Time to resolve the inherited sidecar metadata of every data file with dataset.sidecars against merging each file's
+chain of sidecars from scratch
+
+Uses the dataset of bench_read_dataset (sub x 2 sessions x runs x 4 files) with a root and a subject level
+task-rest_eeg.json added, so each .edf inherits from three sidecars of which the first two are shared.
+
+    python benchmarks/bench_sidecar_inheritance.py [--subjects N] [--runs N]
+"""
+from __future__ import annotations
+
+import json
+import time
+import argparse
+import tempfile
+
+from pathlib import Path
+
+import mne
+
+from bidsbuilder import BidsDataset
+from bidsbuilder.modules.file_bases.sidecar_inheritance import _values_of
+from bench_read_dataset import make_dataset
+
+def merge_uncached(dataset:BidsDataset, core) -> dict:
+    """what the cache replaces"""
+    merged = {}
+    for node in dataset.sidecars.applied(core._tree_link):
+        merged.update(_values_of(node._file_link))
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subjects", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    mne.set_log_level("WARNING")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_dataset(root, args.subjects, args.runs)
+        (root / "task-rest_eeg.json").write_text(json.dumps({"PowerLineFrequency": 50, "EEGReference": "Cz"}))
+        for sub in root.glob("sub-*"):
+            (sub / f"{sub.name}_task-rest_eeg.json").write_text(json.dumps({"PowerLineFrequency": 60}))
+
+        dataset = BidsDataset(tmp, minimal=True).read()
+        files = dataset.query(extension=".edf")
+        dataset.sidecars.clear()
+
+        start = time.perf_counter()
+        expected = [merge_uncached(dataset, core) for core in files]
+        uncached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        resolved = [dataset.resolve_sidecar(core) for core in files]
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for core in files:
+            dataset.resolve_sidecar(core)
+        warm = time.perf_counter() - start
+        assert [dict(values) for values in resolved] == expected
+
+        print(f"{len(files)} files: uncached {uncached * 1e3:.1f} ms, "
+              f"cached first pass {cold * 1e3:.1f} ms, cached {warm * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Memory and serialisation time of a participants.tsv held with each tableView storage
+
+    python benchmarks/bench_table_storage.py [--rows N] [--storage object typed ...]
+"""
+from __future__ import annotations
+
+import io
+import time
+import argparse
+
+import numpy as np
+import mne
+
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsbuilder.modules.schema_objects import _set_object_schemas
+from bidsbuilder.modules.file_bases.tabular_files import _set_tabular_schema, tabularFile
+from bidsbuilder.modules.column_storage import STORAGE_BACKENDS
+from bidsbuilder.util.io import _tsv_chunks
+
+def participants(rows:int, storage:str) -> tabularFile:
+    schema = parse_load_schema()
+    _set_object_schemas(schema)
+    _set_tabular_schema(schema)
+
+    table = tabularFile()
+    table._add_metadata_(schema.rules.tabular_data.modality_agnostic.Participants)
+    table.set_storage(storage)
+    for col in ("age", "sex", "handedness"):
+        table.addColumn(col)
+
+    rng = np.random.default_rng(0)
+    ages = rng.integers(18, 90, rows).tolist()
+    sexes = rng.choice(["M", "F", "O"], rows).tolist()
+    hands = rng.choice(["left", "right", "ambidextrous"], rows).tolist()
+    for i in range(rows):
+        table.appendRow(f"sub-{i:07d}", {"age": ages[i], "sex": sexes[i], "handedness": hands[i]})
+    table.flush()
+    return table
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--storage", nargs="+", default=[s for s in STORAGE_BACKENDS if s != "arrow"], choices=STORAGE_BACKENDS)
+    args = parser.parse_args()
+    mne.set_log_level("WARNING")
+
+    for storage in args.storage:
+        start = time.perf_counter()
+        table = participants(args.rows, storage)
+        t_fill = time.perf_counter() - start
+
+        frame = table.data.data
+        memory = (frame.memory_usage(deep=True).sum() + frame.index.memory_usage(deep=True)) / 2**20
+
+        start = time.perf_counter()
+        out = io.BytesIO()
+        for chunk in _tsv_chunks(frame, table.data.delimiters, True, 50_000):
+            out.write(chunk)
+        t_write = time.perf_counter() - start
+
+        print(f"{storage:>7}: {memory:8.1f} MiB  fill {t_fill:6.2f} s  serialise {t_write:6.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Peak memory and time of writing a large events table, one-shot stringify + to_csv against the chunked _write_tsv
+
+Half of the columns hold lists which are joined with a delimiter, as for user defined columns with a Delimiter.
+Each writer runs in its own process so peak memory isn't shared between them.
+
+    python benchmarks/bench_tsv_write.py [--rows N] [--gzip]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+def _make_table(rows:int):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "onset": rng.random(rows) * 1000,
+        "duration": rng.random(rows),
+        "trial_type": rng.choice(["go", "stop", "rest"], rows),
+        "channels": [[i % 64, (i + 1) % 64] for i in range(rows)],
+    })
+
+def _one_shot(df, path:str):
+    # the writer before chunking: a full stringified copy, then a single to_csv
+    df = df.copy()
+    df["channels"] = df["channels"].apply(lambda c: "[" + ",".join(map(str, c)) + "]" if isinstance(c, list) else c)
+    df.to_csv(path, sep="\t", index=False, na_rep="n/a", compression="gzip" if path.endswith(".gz") else None)
+
+def _run(mode:str, rows:int, compress:bool):
+    from bidsbuilder.util.io import _write_tsv
+
+    df = _make_table(rows)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "sub-01_events.tsv" + (".gz" if compress else ""))
+        write = (lambda: _one_shot(df, path)) if mode == "one-shot" else (lambda: _write_tsv(path, df, True, delimiters={"channels": ","}))
+
+        start = time.perf_counter()
+        write()
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        write()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{mode:>9}: {elapsed * 1000:9.1f} ms  peak {peak / 2**20:8.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--mode", choices=["one-shot", "chunked"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        import mne
+        mne.set_log_level("WARNING")
+        _run(args.mode, args.rows, args.gzip)
+        return
+
+    print(f"{args.rows} rows{', gzip' if args.gzip else ''}")
+    for mode in ("one-shot", "chunked"):
+        cmd = [sys.executable, __file__, "--mode", mode, "--rows", str(args.rows)] + (["--gzip"] if args.gzip else [])
+        subprocess.run(cmd, check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import argparse
+
+from typing import Sequence, Union
+
+"""
+command line entry point, installed as `bidsbuilder`
+
+    bidsbuilder schema warm-cache [--schema PATH] [--eager]
+    bidsbuilder schema clear-cache
+"""
+
+def _warm_cache(args:argparse.Namespace) -> int:
+    from .schema.schema import warm_schema_cache
+    from .schema.schema_cache import cache_file
+
+    lazy = not args.eager
+    warm_schema_cache(args.schema, lazy=lazy)
+    print(f"schema cache written to {cache_file(args.schema, lazy)}")
+    return 0
+
+def _clear_cache(args:argparse.Namespace) -> int:
+    from .schema.schema_cache import clear_cache, cache_dir
+
+    removed = clear_cache()
+    print(f"removed {removed} cached schema(s) from {cache_dir()}")
+    return 0
+
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bidsbuilder", description="bidsbuilder command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    schema_parser = commands.add_parser("schema", help="manage the interpreted BIDS schema")
+    schema_commands = schema_parser.add_subparsers(dest="schema_command", required=True)
+
+    warm = schema_commands.add_parser("warm-cache", help="interpret the schema and store it in the on-disk cache")
+    warm.add_argument("--schema", default=None, help="schema directory or json file, defaults to the schema bundled with bidsschematools")
+    warm.add_argument("--eager", action="store_true", help="compile every selector up front rather than on first use")
+    warm.set_defaults(func=_warm_cache)
+
+    clear = schema_commands.add_parser("clear-cache", help="remove all cached schemas")
+    clear.set_defaults(func=_clear_cache)
+
+    return parser
+
+def main(argv:Union[Sequence[str], None]=None) -> int:
+    args = _make_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
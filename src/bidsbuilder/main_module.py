@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ContextManager, Union
 from .util.util import checkPath
+from .util.manifest import buildManifest
+from .util.hooks import recheck_scheduler
 from .modules.core.dataset_tree import Directory
+from .modules.core.dataset_core import DatasetCore
 from .modules.file_bases.directories import Subject
+from .modules.file_bases.dataset_reader import read_dataset, READ_WORKERS
+from .modules.file_bases.sidecar_inheritance import sidecarResolver
 from .schema.schema import parse_load_schema
 
 if TYPE_CHECKING:
     from bidsschematools.types.namespace import Namespace
+    from .modules.file_bases.sidecar_inheritance import inheritedMetadata
 
 class BidsDataset():
     """
@@ -25,9 +31,13 @@ class BidsDataset():
     """
     
 
-    def __init__(self, root:str, minimal:bool=False):
+    def __init__(self, root:str, minimal:bool=False, eager_checks:Union[bool, None]=None, lazy:bool=False):
         
+        if eager_checks is not None: # otherwise left as it is, the scheduler is shared, see eager_checks
+            self.eager_checks = eager_checks
+        self.lazy = lazy
         self._frozen = True
+        self._sidecar_resolver:'sidecarResolver' = None
         self.root = Path(root).as_posix()
         self.schema:'Namespace' = parse_load_schema()
         self._tree_reference:Directory = Directory(_name=self.root, _file_link=self, _name_link=None, parent=None)
@@ -45,21 +55,99 @@ class BidsDataset():
     def _frozen(self, val:bool):
         self.__frozen = val
         if val == False:
-            for node in self.tree._iter_tree():
-                if node._file_link:
-                    node._file_link._check_schema(add_callbacks=True)
+            cores = [node._file_link for node in self.tree._iter_tree() if node._file_link]
+            DatasetCore._batch_check_schema(cores, add_callbacks=True)
         elif val != True:
             raise ValueError(f"frozen must be true or false")
 
+    @property
+    def lazy(self) -> bool:
+        """
+        whether read leaves the JSON and TSV files on disk until their metadata or data is first accessed.
+        Files never accessed are kept as they are when building
+        """
+        return self._lazy
+
+    @lazy.setter
+    def lazy(self, val:bool):
+        if not isinstance(val, bool):
+            raise TypeError(f"lazy must be true or false")
+        self._lazy = val
+
+    @property
+    def eager_checks(self) -> bool:
+        """
+        whether schema re-checks run as soon as an entity, suffix, datatype or exists changes, rather than being
+        queued and run once at the end of the operation, see util.hooks.scheduler
+
+        the scheduler is shared by the process, so this is set for every dataset. BidsDataset(eager_checks=...) only
+        changes it when given
+        """
+        return recheck_scheduler.eager
+
+    @eager_checks.setter
+    def eager_checks(self, val:bool):
+        if not isinstance(val, bool):
+            raise TypeError(f"eager_checks must be true or false")
+        if val:
+            recheck_scheduler.flush()
+        recheck_scheduler.eager = val
+
+    def batch(self) -> ContextManager:
+        """
+        defer schema re-checks until the end of the with block, re-checking each affected file only once
+
+            with dataset.batch():
+                sub.sub = "02"
+                sub.sessions[0].ses = "02"
+        """
+        return recheck_scheduler.operation()
+
+    def flush(self):
+        """run any queued schema re-checks"""
+        recheck_scheduler.flush()
+
     @property
     def tree(self):
         return self._tree_reference
 
+    def query(self, reference:bool=True, include_missing:bool=False, **criteria) -> list:
+        """
+        files of the dataset by their entities (full names), suffix, datatype and extension, see FileCollection.query
+
+            dataset.query(subject="01", suffix="eeg", extension=".json")
+        """
+        return self.tree.query(reference=reference, include_missing=include_missing, **criteria)
+
+    @property
+    def sidecars(self) -> 'sidecarResolver':
+        """merged sidecar metadata of the files of the dataset, following the inheritance principle, see sidecar_inheritance"""
+        if self._sidecar_resolver is None:
+            self._sidecar_resolver = sidecarResolver(self.tree)
+        return self._sidecar_resolver
+
+    def resolve_sidecar(self, core:DatasetCore) -> 'inheritedMetadata':
+        """
+        metadata of the JSON sidecars applying to core merged from the root down, deeper files overriding
+
+            dataset.resolve_sidecar(edf)["SamplingFrequency"]
+        """
+        return self.sidecars.resolve(core)
+
     @property
     def dataset_description(self):
         return self.tree.fetch(r"/dataset_description.json")
 
-    def build(self, force=False):
+    def build(self, force=False, workers:int=1, incremental:bool=False):
+        """
+        write the dataset to root. force allows overwriting existing files and folders.
+
+        with workers > 1 the folders are created first, then all files are written by a pool of that many threads;
+        instead of stopping at the first error, failed files are raised together as an ExceptionGroup
+
+        with incremental, files whose content is unchanged since the last incremental build are not rewritten,
+        see util.manifest. Rebuilding in an existing root still needs force for the files which did change
+        """
         #self._removeRedundant() deprecated
         if self.root == None:
             raise FileNotFoundError("Please specify a root directory to build the dataset in")
@@ -76,13 +164,25 @@ class BidsDataset():
                      }]
         if curGeneratedBy is None:
             self.dataset_description["GeneratedBy"] = generatedby
-        elif isinstance(curGeneratedBy, list):
-            self.dataset_description["GeneratedBy"] = curGeneratedBy.append(generatedby)
         else:
-            curGeneratedBy = [curGeneratedBy]
-            self.dataset_description["GeneratedBy"] = curGeneratedBy.append(generatedby)
-
-        self._tree_reference._make(force)
+            if not isinstance(curGeneratedBy, list):
+                curGeneratedBy = [curGeneratedBy]
+            if generatedby[0] not in curGeneratedBy: # i.e. a dataset which was read, and built before
+                self.dataset_description["GeneratedBy"] = curGeneratedBy + generatedby
+
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError(f"workers must be a positive integer, got {workers}")
+
+        self.flush()
+        manifest = buildManifest.load(self.root) if incremental else None
+        try:
+            if workers == 1:
+                self._tree_reference._make(force, manifest)
+            else:
+                self._tree_reference._make_parallel(force, workers, manifest)
+        finally:
+            if manifest is not None and Path(self.root).is_dir(): # keep what was written, even if some files failed
+                manifest.save()
     
     def _removeRedundant(self):
         for child in self.children:
@@ -94,7 +194,7 @@ class BidsDataset():
 
                 self.children.pop(child)
 
-    def _write_BIDS(self, force:bool):
+    def _write_BIDS(self, force:bool, manifest:'buildManifest'=None):
         path = Path(self.root)
         path.mkdir(parents=False, exist_ok=force)
 
@@ -102,16 +202,29 @@ class BidsDataset():
         """placeholder used when tree recursively calls for files to check schema"""
         return
 
-    def read(self, path:str = None):
+    def read(self, path:str = None, workers:int = READ_WORKERS):
+        """
+        read the existing dataset at path (by default root) into this dataset, see file_bases.dataset_reader
+
+        JSON and TSV files are read by a pool of workers threads, and every file checks its schema once, in a batch.
+        Files which can't be read are raised together as an ExceptionGroup once the rest of the dataset is read.
+        When lazy, JSON and TSV files are only read on first access, errors are then raised by that access
+        """
         if path:
-            self.root = path
+            self.root = Path(path).as_posix()
+            self._tree_reference._name = self.root
+            self._tree_reference._invalidate_paths()
 
-        exists, msg = checkPath(self.root)
-        if not exists():
-            raise FileExistsError(msg)
+        if not Path(self.root).is_dir():
+            raise FileNotFoundError(f"no dataset to read at {self.root}")
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError(f"workers must be a positive integer, got {workers}")
 
+        read_dataset(self, workers)
         self.initialised = True
+        return self
     
     def add_subject(self, name:str) -> Subject:
-        sub = Subject.create(name, self.tree)
-        return sub
\ No newline at end of file
+        with self.batch():
+            sub = Subject.create(name, self.tree)
+        return sub
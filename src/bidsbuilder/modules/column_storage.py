@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from functools import lru_cache
+from typing import Any, Mapping, Union
+
+"""
+Storage dtypes of tabular columns, derived from the same rules the column validators are compiled from
+
+tableView keeps every value as a boxed Python object by default ("object" storage). With "typed" storage the
+columns are instead held in pandas extension arrays, and with "arrow" storage in pyarrow backed arrays:
+
+    schema type         typed       arrow
+    integer             Int64       int64[pyarrow]
+    number              Float64     double[pyarrow]
+    string              string      string[pyarrow]
+    string with enum    category    category
+    anything else       object      object
+
+User defined columns with Levels (and no Delimiter) are stored as a category of the levels, everything else
+a user can define is kept as object, as Format doesn't constrain the Python type of values.
+"""
+
+OBJECT_STORAGE = "object"
+STORAGE_BACKENDS = (OBJECT_STORAGE, "typed", "arrow")
+
+def check_storage(storage:str) -> str:
+    if storage not in STORAGE_BACKENDS:
+        raise ValueError(f"storage {storage} is not recognised. Must be one of {STORAGE_BACKENDS}")
+    return storage
+
+@lru_cache(maxsize=None)
+def _storage_dtypes(storage:str) -> dict[str, Any]:
+    if storage == "typed":
+        return {"integer": pd.Int64Dtype(), "number": pd.Float64Dtype(), "string": pd.StringDtype("python")}
+
+    if storage == "arrow":
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("storage='arrow' requires pyarrow, install it with: pip install pyarrow") from e
+        return {"integer": pd.ArrowDtype(pyarrow.int64()),
+                "number": pd.ArrowDtype(pyarrow.float64()),
+                "string": pd.ArrowDtype(pyarrow.string())}
+
+    check_storage(storage)
+    return {}
+
+def rules_dtype(rules:Mapping, storage:str) -> Union[np.dtype, pd.api.extensions.ExtensionDtype]:
+    """dtype to store a column with the given rules (schema.objects.columns[name], with any overrides) in"""
+    dtypes = _storage_dtypes(storage)
+    if not dtypes or rules.get("anyOf", False):
+        return np.dtype(object)
+
+    c_type = rules.get("type", None)
+    if c_type == "string" and (enums := rules.get("enum", None)):
+        return pd.CategoricalDtype(list(enums))
+    return dtypes.get(c_type, np.dtype(object))
+
+def _parse_number(text:str, integer:bool) -> Union[int, float, str]:
+    try:
+        return int(text)
+    except ValueError:
+        if integer:
+            return text
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def parse_text(values:pd.Series, value_type:Union[str, None]) -> pd.Series:
+    """
+    cells of a column read from a tsv as text, as the values of value_type (the schema type or Format of the column).
+    Only integer and number cells are converted, to int or float (int when they are written as one), anything else
+    is kept as written, i.e. "01" stays "01" in a string column. Cells which don't parse are left to the validators
+    """
+    if value_type not in ("integer", "number"):
+        return values
+    integer = value_type == "integer"
+    parsed = [_parse_number(text, integer) if isinstance(text, str) else text for text in values]
+    return pd.Series(parsed, index=values.index, name=values.name, dtype=object) # map would infer 256 as 256.0
+
+def user_column_dtype(levels:Union[Mapping, None], delimited:bool, storage:str) -> Union[np.dtype, pd.api.extensions.ExtensionDtype]:
+    """dtype to store a UserDefinedColumn in"""
+    if not _storage_dtypes(storage) or delimited or not levels:
+        return np.dtype(object)
+    return pd.CategoricalDtype(list(levels.keys()))
+
+__all__ = ["rules_dtype", "user_column_dtype", "parse_text", "check_storage", "OBJECT_STORAGE", "STORAGE_BACKENDS"]
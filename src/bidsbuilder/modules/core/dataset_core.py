@@ -3,11 +3,14 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Union, ClassVar, Self
 from attrs import define, field
 from pathlib import Path
+import shutil
 from abc import ABC, abstractmethod
 from ...util.hooks import *
+from ...util.io import _write_bytes
 
 if TYPE_CHECKING:
     from ...main_module import BidsDataset
+    from ...util.manifest import buildManifest
     from .dataset_tree import FileEntry
     from .filenames import filenameBase
 
@@ -19,6 +22,14 @@ class DatasetCore(ABC):
     _tree_link: Union['FileEntry', None] = field(repr=True, init=False, default=None, alias="_tree_link")
     _level:str = field(repr=True, default="optional", alias="_level")
 
+    # whether the object may have changed since it was last written, set whenever one of its hooked descriptors or
+    # observable containers fires. Objects which can be changed without going through them opt out with _track_dirty
+    _dirty:bool = field(repr=False, init=False, default=True, eq=False)
+    _track_dirty:ClassVar[bool] = True
+
+    # values of the hooked descriptors (exists), kept on the instance rather than in the descriptor, see descriptors._hooked_values
+    _hooked_values:dict = field(init=False, factory=dict, repr=False, eq=False)
+
     @classmethod
     def create(cls,*, _level:str="optional", exists:bool=True, **kwargs) -> Self:
         if _level == "required":
@@ -49,17 +60,36 @@ class DatasetCore(ABC):
     @abstractmethod
     def _check_schema(self, *args, **kwargs):
         ...
+
+    def _schema_check_done(self, modified:bool):
+        """called once all schema changes from a check have been applied"""
+        pass
+
+    @staticmethod
+    def _batch_check_schema(cores:list['DatasetCore'], add_callbacks:bool=False, tags:Union[list, str]=None):
+        """check the schema of many objects at once, sharing selector evaluations between them"""
+        from ...schema.schema_checking import batch_check_schema
+        batch_check_schema(cores, add_callbacks, tags)
     
     @property
     def filename(self) -> 'filenameBase':
         return self._tree_link._name_link
 
-    def _write_BIDS(self, force:bool):
-        if self.exists:
-            self._make_file(force)
+    def _mark_dirty_(self):
+        self._dirty = True
+
+    def _write_BIDS(self, force:bool, manifest:Union['buildManifest', None]=None):
+        if not self.exists:
+            return
+
+        if manifest is not None and self._track_dirty and not self._dirty and manifest.is_unchanged(self._tree_link.path):
+            manifest.skip(self._tree_link.path) # unchanged since the last write, don't even serialise it
+        else:
+            self._make_file(force, manifest)
+        self._dirty = False
 
     @abstractmethod
-    def _make_file(self, force:bool):
+    def _make_file(self, force:bool, manifest:Union['buildManifest', None]=None):
         ...
 
     def _read_BIDS(self):
@@ -75,13 +105,39 @@ class UnknownFile(DatasetCore):
     def _check_schema(self, *args, **kwargs):
         pass
     
-    def _make_file(self, force:bool):
+    def _make_file(self, force:bool, manifest:Union['buildManifest', None]=None):
         filename = Path(self._tree_link.path)  # or .json, .tsv, etc.
         if self._tree_link.is_dir:
             filename.mkdir(parents=False,exist_ok=force)
         else:
-            with open(filename, 'w') as f:
-                pass  # creates the file, nothing is written
+            _write_bytes(filename, b"", True, manifest)  # creates the file, nothing is written
+
+@define(slots=True)
+class SourceFile(UnknownFile):
+    """
+    a file of an existing dataset whose content isn't represented by the object model, i.e. raw data.
+    Left as it is when building in place, copied from its source when building somewhere else
+    """
+    _source:str = field(repr=True, default=None, alias="_source")
+    _track_dirty:ClassVar[bool] = False
+
+    def _make_file(self, force:bool, manifest:Union['buildManifest', None]=None):
+        _copy_source(self, self._source, force)
+
+def _copy_source(core:DatasetCore, source:str, force:bool):
+    """copy source to the path of core, nothing to do if it's already there"""
+    target = Path(core._tree_link.path)
+    source = Path(source)
+    if target.exists():
+        if target.samefile(source):
+            return
+        if not force:
+            raise FileExistsError(f'"{target}" already exists. Please set overwrite to True.')
+
+    if core._tree_link.is_dir:
+        shutil.copytree(source, target, dirs_exist_ok=True)
+    else:
+        shutil.copyfile(source, target)
 
 def _set_dataset_core(dataset:'BidsDataset'):
     DatasetCore._dataset = dataset
\ No newline at end of file
@@ -3,18 +3,40 @@ from __future__ import annotations
 import os
 import posixpath 
 
+from concurrent.futures import ThreadPoolExecutor
 
 from attrs import define, field
 from typing import Union, TYPE_CHECKING, Generator, Self
 from pathlib import Path
 
-from .filenames import filenameBase
+from .filenames import filenameBase, CompositeFilename
 from .dataset_core import DatasetCore
+from .query_index import entityIndex, FACETS
 
 
 if TYPE_CHECKING:
     from .dataset_tree import Directory # to resolve wacky imports (circular imports for FileEntry parent)
     from ...main_module import BidsDataset
+    from ...util.manifest import buildManifest
+
+def _normalise_relpath(relpath:Union[str, os.PathLike]) -> str:
+    """relative path as a key of the path index: posix separators, no leading or trailing slashes"""
+    path = os.fspath(relpath)
+    if os.sep != "/":
+        path = path.replace(os.sep, "/")
+    path = path.strip("/")
+
+    if "//" in path or "." in path.split("/"): # rare, only pay for normpath when needed
+        path = posixpath.normpath(path).strip("/")
+        if path == ".":
+            path = ""
+    return path
+
+def _name_parts(name:str) -> list[str]:
+    """path components of name, as Path(name).parts without the root, but without building a Path for every node"""
+    if os.sep != "/":
+        name = name.replace(os.sep, "/")
+    return [part for part in name.split("/") if part and part != "."]
 
 @define(slots=True)
 class FileEntry:
@@ -23,11 +45,15 @@ class FileEntry:
     _name: str = field(repr=True, alias="_name")
     _file_link: Union['DatasetCore', 'BidsDataset'] = field(repr=False, alias='_file_link')
     _name_link: 'filenameBase' = field(repr=False, alias='_name_link')
-    parent: Union['Directory', None] = field(repr=False, default=None)
+    _parent: Union['Directory', None] = field(repr=False, default=None, alias='parent')
 
     _stat: os.stat_result = field(init=False, repr=False, default=None)
     _lstat: os.stat_result = field(init=False, repr=False, default=None)
 
+    # memoised paths, cleared for the whole subtree by _invalidate_paths whenever a node is renamed or moved
+    _path_cache: Union[str, None] = field(init=False, repr=False, default=None, eq=False)
+    _relpath_cache: Union[str, None] = field(init=False, repr=False, default=None, eq=False)
+
 
     """
     on_setattr (Callable | list[Callable] | None | Literal[attrs.setters.NO_OP]) –
@@ -47,6 +73,9 @@ class FileEntry:
             self._name_link._tree_link = self
             fully_init += 1
 
+        if self._parent is not None:
+            self._index_subtree(add=True)
+
         if fully_init == 2:
             self._file_link.__core_post_init__()   
     
@@ -59,12 +88,80 @@ class FileEntry:
         if new_name in self.parent.children.keys():
             raise KeyError(f"key {new_name} already exists in {self.parent}")
         
+        self._index_subtree(add=False)
         #add new entry to parent dict
         self.parent.children[new_name] = self
         #remove old
         self.parent.children.pop(self.name)
         self._name = new_name
-    
+        self._invalidate_paths()
+        self._index_subtree(add=True)
+
+    @property
+    def parent(self) -> Union['Directory', None]:
+        return self._parent
+
+    @parent.setter
+    def parent(self, new_parent:Union['Directory', None]):
+        if self._parent is not None:
+            self._index_subtree(add=False)
+        self._parent = new_parent
+        self._invalidate_paths()
+        self._invalidate_names() # inherited entities, suffix and datatype come from the new parents
+        if new_parent is not None:
+            self._index_subtree(add=True)
+
+    def _root(self) -> 'FileEntry':
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node
+
+    @property
+    def _index_key(self) -> str:
+        return self.relative_path.strip("/")
+
+    def _index_subtree(self, add:bool):
+        """add or remove this node and everything below it from the path and query indexes of its root"""
+        root = self._root()
+        index = getattr(root, "_path_index", None)
+        query_index = getattr(root, "_query_index", None)
+        if index is None and query_index is None: # not built yet, or a detached node
+            return
+
+        for node in self._iter_tree(-1):
+            if index is not None:
+                key = node._index_key
+                if add:
+                    index[key] = node
+                elif index.get(key) is node:
+                    del index[key]
+            if query_index is not None and not isinstance(node, FileCollection): # only files are queried
+                if add:
+                    query_index.add(node)
+                else:
+                    query_index.remove(node)
+
+    def _is_below(self, ancestor:'FileCollection') -> bool:
+        node = self._parent
+        while node is not None:
+            if node is ancestor:
+                return True
+            node = node._parent
+        return False
+
+    def _invalidate_paths(self):
+        """clear the memoised paths of this node and everything below it"""
+        for node in self._iter_tree(-1):
+            node._path_cache = None
+            node._relpath_cache = None
+
+    def _invalidate_names(self):
+        """clear the memoised filename resolution of this node and everything below it"""
+        for node in self._iter_tree(-1):
+            if node._name_link is not None:
+                node._name_link._invalidate_resolved()
+
     @property
     def is_dir(self):
         return False
@@ -74,15 +171,25 @@ class FileEntry:
 
     @property
     def relative_path(self) -> str:
-        #this method and path may break if FileEntrys can be created without a link to a parent file
-        return self.parent.relative_path + self.name
-    
+        if self._relpath_cache is None:
+            self._relpath_cache = self._build_relative_path()
+        return self._relpath_cache
+
     @property
     def path(self) -> str:
+        if self._path_cache is None:
+            self._path_cache = self._build_path()
+        return self._path_cache
+
+    def _build_relative_path(self) -> str:
+        #this method and path may break if FileEntrys can be created without a link to a parent file
+        return self.parent.relative_path + self.name
+
+    def _build_path(self) -> str:
         return self.parent.path + self.name
 
-    def _make(self, force:bool):
-        self._file_link._write_BIDS(force)
+    def _make(self, force:bool, manifest:Union['buildManifest', None]=None):
+        self._file_link._write_BIDS(force, manifest)
 
     def _iter_tree(self, depth) -> Generator['FileEntry', None, None]:
         """
@@ -99,19 +206,70 @@ class FileCollection(FileEntry):
     """
     children: dict[str, Union['Directory', Self, 'FileEntry']] = field(repr=False, factory=dict)
 
+    # dataset-wide index of normalised relative path -> node, only used on the root. Built on the first lookup,
+    # then kept up to date by FileEntry._index_subtree whenever nodes are added, renamed or moved
+    _path_index: Union[dict[str, FileEntry], None] = field(init=False, default=None, repr=False, eq=False)
+    # files by entity, suffix, datatype and extension, only used on the root, see query_index
+    _query_index: Union[entityIndex, None] = field(init=False, default=None, repr=False, eq=False)
+
     def __attrs_post_init__(self) -> None:
         super().__attrs_post_init__()
 
+    def _lookup(self, relpath:Union[str, os.PathLike]) -> Union[FileEntry, None]:
+        """fetch the node at relpath, relative to this node, from the path index of the root"""
+        key = _normalise_relpath(relpath)
+        if not key:
+            raise ValueError(f"relpath missing value: {relpath}")
+
+        if (own_key := self._index_key):
+            key = f"{own_key}/{key}"
+
+        root = self._root()
+        if root._path_index is None:
+            root._path_index = {node._index_key: node for node in root._iter_tree(-1)}
+        return root._path_index.get(key)
+
+    def _get_query_index(self) -> entityIndex:
+        """the query index of the root, built on first use"""
+        root = self._root()
+        if root._query_index is None:
+            root._query_index = entityIndex.build(node for node in root._iter_tree(-1) if not isinstance(node, FileCollection))
+        return root._query_index
+
+    def query(self, reference:bool=True, include_missing:bool=False, **criteria) -> list[Union['DatasetCore', FileEntry]]:
+        """
+        files below this node by their entities (full names), suffix, datatype and extension, in path order
+
+            tree.query(subject="01", suffix="eeg", extension=".json")
+            tree.query(task="rest", run=["1", "2"]) # any of the values
+
+        answered from an index of the root rather than a walk of the tree, see query_index. Files which don't
+        exist are left out unless include_missing, reference tells whether to return the linked DatasetCore instances
+        """
+        for facet in criteria:
+            if facet not in CompositeFilename._entity_order and facet not in FACETS:
+                raise ValueError(f"can't query by {facet}, expected an entity name or one of {FACETS}")
+
+        root = self._root()
+        nodes = root._get_query_index().query(criteria)
+
+        if self is not root:
+            nodes = [node for node in nodes if node._is_below(self)]
+        if not include_missing:
+            nodes = [node for node in nodes if node._file_link is None or node._file_link.exists]
+        nodes.sort(key=lambda node: node.relative_path)
+
+        if reference:
+            return [node._file_link for node in nodes]
+        return nodes
+
     def add_tree_node(self, name_ref: 'FileEntry'):
         assert type(name_ref) == FileEntry, 'Collection add_tree_node expects strictly a FileEntry'
         self.children[name_ref.name] = name_ref
 
     def add_child(self, name_ref: 'filenameBase', file_ref: 'DatasetCore') -> 'FileEntry':
         
-        relpath:Path = Path(name_ref.local_name)
-        parts = relpath.parts
-        if relpath.root:
-            parts = parts[1:]
+        parts = _name_parts(name_ref.local_name)
         assert len(parts) == 1, f"given file {name_ref} has no name"
         #DEPENDS ON SCHEMA SYNTAX, IF A LEADING "/" ALWAYS MEANS ITS AT THE DATASET ROOT WE CAN CHECK THAT PARENT IS NONE
         
@@ -124,17 +282,9 @@ class FileCollection(FileEntry):
     def fetch(self, relpath: str, reference:bool=True) -> Union[None, 'DatasetCore', FileEntry]:
         #reference tells whether to return the UserFileEntry|FileTree instance or its linked DatasetCore instance 
         
-        relpath = Path(relpath)
-        #remove the "\\" or "/" from path parts
-
-        if relpath.root:
-            parts = relpath.parts
-            parts = parts[1:]
-
-            if not len(parts) == 1:
-                raise ValueError(f"relpath {relpath} is not a child of {self} - {self.name}")
-
-            relpath = str(parts[0])       
+        relpath = _normalise_relpath(relpath)
+        if "/" in relpath:
+            raise ValueError(f"relpath {relpath} is not a child of {self} - {self.name}")
         # two options, either directly a child, or merged with current name
 
         child = self.children.get(relpath, None)
@@ -152,8 +302,7 @@ class FileCollection(FileEntry):
     def is_dir(self):
         return False
 
-    @property
-    def relative_path(self) -> str:
+    def _build_relative_path(self) -> str:
         """The path of the current FileTree, relative to the root.
 
         Follows parents up to the root and joins with POSIX separators (/).
@@ -164,17 +313,16 @@ class FileCollection(FileEntry):
 
         return posixpath.join(self.parent.relative_path,f'{self.name}') 
     
-    @property
-    def path(self) -> str:
+    def _build_path(self) -> str:
 
         if self.parent is None:
             return self.name
 
         return posixpath.join(self.parent.path,f'{self.name}')
 
-    def _make(self, force:bool):
+    def _make(self, force:bool, manifest:Union['buildManifest', None]=None):
         for child in self.children.values():
-            child._make(force)
+            child._make(force, manifest)
 
     def _iter_tree(self, depth:int=-1) -> Generator['FileEntry', None, None]:
         """
@@ -199,6 +347,9 @@ class Directory(FileCollection):
 
     def add_tree_node(self, name_ref: Union[Self, 'FileCollection', 'FileEntry']):
         assert isinstance(name_ref, FileEntry), 'Directory add_tree_node expects a FileEntry or subclass'
+        old_parent = name_ref.parent
+        if old_parent is not None and old_parent is not self and old_parent.children.get(name_ref.name) is name_ref:
+            old_parent.children.pop(name_ref.name) # moving a node, not copying it
         self.children[name_ref.name] = name_ref
         name_ref.parent = self
 
@@ -211,10 +362,7 @@ class Directory(FileCollection):
         }
         ret_class:FileEntry = child_type[type_flag.lower()]
         
-        relpath:Path = Path(name_ref.local_name)
-        parts = relpath.parts
-        if relpath.root:
-            parts = parts[1:]
+        parts = _name_parts(name_ref.local_name)
         assert len(parts) == 1, f"given file {name_ref} has no name"
         
         new_entry = ret_class(_name=parts[0], _file_link=file_ref, _name_link=name_ref, parent=self)
@@ -230,47 +378,31 @@ class Directory(FileCollection):
         """
 
     def fetch(self, relpath: os.PathLike, reference:bool=True) -> Union[None, 'DatasetCore', FileEntry]:
-        #reference tells whether to return the UserFileEntry|FileTree instance or its linked DatasetCore instance 
-        og_path = relpath
-        relpath = Path(relpath)
-        parts = relpath.parts
-        if len(parts) == 0:
-            raise ValueError(f"relpath missing value: {relpath}")
-        
-        #remove the "\\" or "/" from path parts
-        if relpath.root:
-            parts = parts[1:]
-        
-        child = self.children.get(parts[0])
+        """
+        fetch a file or folder by its path relative to this directory, a leading "/" is ignored.
+        Files in collections are fetched by their full name, i.e. "participants.tsv"
+
+        reference tells whether to return the linked DatasetCore instance or the tree node itself
+        """
+        child = self._lookup(relpath)
         if child is None:
-            # try data collection: i.e. split by .
-            head, _ = parts[0].split('.', 1)
-            child = self.children.get(head)
-            if child is None:
-                raise KeyError(f"given relpath {relpath} not found in {self}")
-            else:
-                return child.fetch(og_path, reference)
+            raise KeyError(f"given relpath {relpath} not found in {self}")
 
-        
-        if len(parts) == 1:
-            if reference:
-                return child._file_link
-            return child
-        return child.fetch(posixpath.join(*parts[1:]), reference)
+        if reference:
+            return child._file_link
+        return child
 
     def __contains__(self, relpath: os.PathLike) -> bool:
-        parts = Path(relpath).parts
-        if len(parts) == 0:
+        try:
+            return self._lookup(relpath) is not None
+        except ValueError:
             return False
-        child = self.children.get(parts[0], False)
-        return child and (len(parts) == 1 or posixpath.join(*parts[1:]) in child)
 
     @property
     def is_dir(self):
         return True
 
-    @property
-    def relative_path(self) -> str:
+    def _build_relative_path(self) -> str:
         """The path of the current Dir, relative to the root.
 
         Follows parents up to the root and joins with POSIX separators (/).
@@ -281,8 +413,7 @@ class Directory(FileCollection):
 
         return posixpath.join(self.parent.relative_path,f'{self.name}/')
     
-    @property
-    def path(self) -> str:
+    def _build_path(self) -> str:
 
         if self.parent is None:
             return f"{self.name}/"   #need to add the trailing / as fileEntry just does parent.path + self.name
@@ -291,9 +422,36 @@ class Directory(FileCollection):
 
         return posixpath.join(self.parent.path,f'{self.name}/')
 
-    def _make(self, force:bool):
-        self._file_link._write_BIDS(force)
+    def _make(self, force:bool, manifest:Union['buildManifest', None]=None):
+        self._file_link._write_BIDS(force, manifest)
         for child in self.children.values():
-            child._make(force)
+            child._make(force, manifest)
+
+    def _make_parallel(self, force:bool, workers:int, manifest:Union['buildManifest', None]=None):
+        """
+        make the tree in two passes: the directory skeleton in tree order, then every file through a thread pool.
+
+        Files are only written once all directories exist, so they don't depend on each other. Every file is
+        attempted, failures are raised together afterwards as an ExceptionGroup, in tree order.
+        """
+        leaves: list[FileEntry] = []
+        for node in self._iter_tree(-1):
+            if node.is_dir:
+                node._file_link._write_BIDS(force, manifest)
+            elif not isinstance(node, FileCollection): # collections aren't written, only their files
+                node.path # fill the path caches up front, rather than from the workers
+                leaves.append(node)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(leaf._make, force, manifest) for leaf in leaves]
+
+        errors = []
+        for leaf, future in zip(leaves, futures):
+            if (exc := future.exception()) is not None:
+                exc.add_note(f"while writing {leaf.path}")
+                errors.append(exc)
+
+        if errors:
+            raise ExceptionGroup(f"failed to write {len(errors)} of {len(leaves)} files", errors)
 
 __all__ = ["Directory","FileCollection","FileEntry"]
\ No newline at end of file
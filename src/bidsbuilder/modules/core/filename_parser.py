@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import os
+import re
+
+from attrs import define, field
+from typing import TYPE_CHECKING, Iterable, Iterator, Union
+
+from ...util.regex_cache import compile_pattern
+
+if TYPE_CHECKING:
+    from bidsschematools.types.namespace import Namespace
+
+"""
+Parsing filenames back into entities, suffix and extension, the reverse of CompositeFilename._construct_name
+
+A filenameParser is compiled once per schema, see _set_filenames_schema, into lookup tables:
+
+    short key -> (position in schema.rules.entities, entity name, compiled pattern of its format)
+    the sets of schema.objects.suffixes and extensions
+
+A name is split once at its first "." and then at "_", each key-value part looked up in the table, its value checked
+by the format pattern and its position compared to the previous part's, so the order of the entities is checked in
+the same single pass, linear in the length of the name. Parts are memoised once checked, names of a dataset share
+most of them (sub-01, task-rest, run-1...), so each part usually costs a dict lookup.
+
+A single regex of every entity as an optional group was slower in CPython than splitting, as the engine tries each
+of the groups on every name, so regexes are only used to check values the first time they're seen.
+"""
+
+PART_CACHE_SIZE = 100_000 # distinct key-value parts memoised, cleared once exceeded
+
+@define(slots=True)
+class parsedFilename():
+    """a filename split into its entities (by full name, in schema order), suffix and extension"""
+    name:str
+    entities:dict[str, str] = field(factory=dict)
+    suffix:Union[str, None] = None
+    extension:str = ""
+
+    @property
+    def stem(self) -> str:
+        return self.name[:len(self.name) - len(self.extension)]
+
+class filenameParser():
+    """compiled parser of the filenames of one schema, see module docstring"""
+
+    def __init__(self, order:list[str], short_keys:dict[str, str], value_patterns:dict[str, str],
+                 suffixes:Iterable[str], extensions:Iterable[str]):
+        self.order:list[str] = list(order)
+        self.short_keys:dict[str, str] = dict(short_keys) # entity -> short key
+        self.entities:dict[str, tuple[int, str, re.Pattern]] = {
+            self.short_keys[name]: (pos, name, compile_pattern(value_patterns[name])) for pos, name in enumerate(self.order)
+        }
+        self.suffixes:frozenset = frozenset(suffixes)
+        self.extensions:frozenset = frozenset(extensions)
+        self.any_extension:bool = ".*" in self.extensions
+        self._parts:dict[str, tuple[int, str, str]] = {} # memoised key-value parts: (position, entity, value)
+
+    @classmethod
+    def from_schema(cls, schema:'Namespace') -> 'filenameParser':
+        entities = schema.objects.entities
+        formats = schema.objects.formats
+        order = list(schema.rules.entities)
+        return cls(
+            order=order,
+            short_keys={name: entities[name].name for name in order},
+            value_patterns={name: formats[entities[name].format].pattern for name in order},
+            suffixes=(suffix.value for suffix in schema.objects.suffixes.values()),
+            extensions=(ext.value for ext in schema.objects.extensions.values()),
+        )
+
+    def _known_extension(self, ext:str) -> bool:
+        return not ext or self.any_extension or ext in self.extensions or ext + "/" in self.extensions
+
+    def _part(self, part:str) -> Union[tuple[int, str, str], str]:
+        """(position, entity, value) of a key-value part, or why it isn't valid"""
+        key, sep, value = part.partition("-")
+        if not sep or (info := self.entities.get(key)) is None:
+            return f"unknown entity '{part}'"
+        pos, name, pattern = info
+        if not pattern.fullmatch(value):
+            return f"'{value}' is not a valid value of '{key}'"
+
+        if len(self._parts) >= PART_CACHE_SIZE:
+            self._parts.clear()
+        ret = self._parts[part] = (pos, name, value)
+        return ret
+
+    def _parse(self, name:str) -> Union[parsedFilename, str]:
+        stem, dot, ext = name.partition(".")
+        ext = dot + ext
+        if ext and not self._known_extension(ext):
+            return f"unknown extension '{ext}'"
+
+        parts = stem.split("_")
+        suffix = None
+        if "-" not in parts[-1]:
+            suffix = parts.pop()
+            if suffix not in self.suffixes:
+                return f"unknown suffix '{suffix}'" if suffix else "no suffix after the last '_'"
+
+        entities = {}
+        memo, last = self._parts, -1
+        for part in parts:
+            if (info := memo.get(part)) is None:
+                info = self._part(part)
+                if isinstance(info, str):
+                    return info
+            pos, entity, value = info
+            if pos <= last:
+                if entity in entities:
+                    return f"entity '{self.short_keys[entity]}' given twice"
+                return f"entity '{self.short_keys[entity]}' must come before '{self.short_keys[self.order[last]]}'"
+            last = pos
+            entities[entity] = value
+        return parsedFilename(name, entities, suffix, ext)
+
+    def parse(self, name:str, strict:bool=False) -> Union[parsedFilename, None]:
+        """
+        entities, suffix and extension of name, None if it isn't a valid filename of the schema
+        (or a ValueError saying why with strict)
+        """
+        parsed = self._parse(name)
+        if not isinstance(parsed, str):
+            return parsed
+        if strict:
+            raise ValueError(f"'{name}' is not a valid filename: {parsed}")
+        return None
+
+    def parse_many(self, names:Iterable[str]) -> list[Union[parsedFilename, None]]:
+        """parse every name, None for those which aren't valid filenames"""
+        parse = self._parse
+        return [parsed if not isinstance(parsed := parse(name), str) else None for name in names]
+
+    def walk(self, root:Union[str, os.PathLike]) -> Iterator[tuple[str, Union[parsedFilename, None]]]:
+        """(path, parsed filename) of every file below root, None for those which aren't valid filenames"""
+        for dirpath, _, filenames in os.walk(root):
+            for name, parsed in zip(filenames, self.parse_many(filenames)):
+                yield os.path.join(dirpath, name), parsed
+
+__all__ = ["filenameParser", "parsedFilename", "PART_CACHE_SIZE"]
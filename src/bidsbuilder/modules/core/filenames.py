@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from attrs import define, field
 from ..schema_objects import Entity, raw_Datatype, Suffix
+from .filename_parser import filenameParser, parsedFilename
 from ...util.hooks import *
 
 from abc import ABC, abstractmethod
-from typing import Union, ClassVar, TYPE_CHECKING, Self, Optional, Type, Any
+from types import MappingProxyType
+from typing import Union, ClassVar, TYPE_CHECKING, Self, Optional, Type, Any, Iterable
 
 if TYPE_CHECKING:
     from bidsschematools.types.namespace import Namespace
@@ -31,6 +33,10 @@ class filenameBase(ABC):
         else: 
             None
 
+    def _invalidate_resolved(self):
+        """clear anything memoised from the parent chain, see CompositeFilename"""
+        pass
+
 @define(slots=True)
 class agnosticFilename(filenameBase):
     
@@ -55,11 +61,14 @@ def _update_children_cback(instance:'CompositeFilename', tags:Union[str, list]=N
     Callback method which calls on self and all child instances to check their schema 
     add tags to specify which selectors to re-check
     """
+    instance._tree_link._invalidate_names() # children inherit from instance, so their resolution is stale too
     instance._tree_link.name = instance.local_name # change the name
 
     # no need to do: instance._file_link._check_schema - _iter_tree will yield the instance itself
-    for child in instance._tree_link._iter_tree():
-        child._file_link._check_schema(tags=tags)
+    with recheck_scheduler.operation():
+        for child in instance._tree_link._iter_tree():
+            if child._file_link is not None: # collections only group their files
+                recheck_scheduler.schedule(child._file_link._check_schema, tags)
 
 @define(slots=True)
 class CompositeFilename(filenameBase):
@@ -70,10 +79,17 @@ class CompositeFilename(filenameBase):
     name (str): Name of the current filename component
     """
     schema: ClassVar[list] #should point to schema.rules.entities which is an ordered list
+    _entity_order: ClassVar[dict[str, tuple[int, str]]] = {} # entity name -> (position in schema, short key), see _set_filenames_schema
+    _parser: ClassVar[Optional[filenameParser]] = None # reverse of _construct_name, see filename_parser
     entities: ClassVar[dict[str, Optional[Entity]]]
     suffix: ClassVar[Optional[Suffix]]
     datatype: ClassVar[Optional[raw_Datatype]]
 
+    # memoised resolved_* and names, cleared by _invalidate_resolved for the whole subtree whenever
+    # the entities, suffix or datatype of this file or one of its parents change, or the file is moved
+    _resolved: dict[str, Any] = field(init=False, factory=dict, repr=False, eq=False)
+    _hooked_values: dict = field(init=False, factory=dict, repr=False, eq=False) # entities, suffix and datatype, see descriptors._hooked_values
+
     @classmethod
     def create(cls, entities:Optional[dict]=None, suffix:Optional[str]=None, datatype:Optional[str]=None):
         
@@ -96,7 +112,7 @@ class CompositeFilename(filenameBase):
 
         instance = cls()
         # initialise values without triggering callbacks
-        cls.entities._set_quiet(instance, entities)
+        cls.entities._set_quiet(instance, entities if entities else {}) # datatype folders have no entities
         cls.suffix._set_quiet(instance, suffix)
         cls.datatype._set_quiet(instance, datatype)
 
@@ -107,26 +123,42 @@ class CompositeFilename(filenameBase):
         """
         Construct the full filename by combining parent names and current name.
         """
-        return self._construct_name(self.resolved_entities, self.resolved_suffix, self.resolved_datatype)
+        try:
+            return self._resolved["name"]
+        except KeyError:
+            pass
+        ret = self._resolved["name"] = self._construct_name(self.resolved_entities, self._resolve_inherited("suffix"), self._resolve_inherited("datatype"))
+        return ret
     
     @property
     def local_name(self) -> str:
         """
         construct instance name from attributes unique to the instance.
         """
-        return self._construct_name(self.entities, self.suffix, self.datatype)
+        try:
+            return self._resolved["local_name"]
+        except KeyError:
+            pass
+        ret = self._resolved["local_name"] = self._construct_name(self.entities, self.suffix, self.datatype)
+        return ret
+
+    def _invalidate_resolved(self):
+        self._resolved.clear()
 
     @classmethod
     def _construct_name(cls, n_entities:dict={}, n_suffix:Suffix=None, n_datatype:raw_Datatype=None, extension:str=None) -> str:
         
+        # only touch the entities which are present, ordered by their position in schema.rules.entities
+        order = cls._entity_order
         ret_pairs = []
-        for pos_entity in cls.schema:
-            if (t_entity := n_entities.get(pos_entity, False)):
-                ret_pairs.append(f"{t_entity.str_name}-{t_entity.val}") #str name is the correct display name for bids filenames
-        entity_string = '_'.join(ret_pairs)
+        for key, t_entity in n_entities.items():
+            if t_entity and (pos := order.get(key)) is not None:
+                ret_pairs.append((pos[0], f"{pos[1]}-{t_entity.val}")) # short key is the correct display name for bids filenames
+        ret_pairs.sort()
+        entity_string = '_'.join([pair for _, pair in ret_pairs])
 
         if n_suffix is not None:
-            entity_string += f"_{n_suffix.name}"
+            entity_string = f"{entity_string}_{n_suffix.name}" if entity_string else n_suffix.name
         elif n_datatype is not None:
             if entity_string:
                 entity_string += f"_{n_datatype.name}"
@@ -138,6 +170,26 @@ class CompositeFilename(filenameBase):
             entity_string += extension
 
         return entity_string
+
+    @classmethod
+    def parse_name(cls, name:str, strict:bool=False) -> Optional[parsedFilename]:
+        """entities, suffix and extension of name, None if it isn't a valid filename (or a ValueError with strict)"""
+        return cls._parser.parse(name, strict)
+
+    @classmethod
+    def parse_names(cls, names:Iterable[str]) -> list[Optional[parsedFilename]]:
+        """parse_name for many names at once, i.e. a whole os.walk listing"""
+        return cls._parser.parse_many(names)
+
+    @classmethod
+    def build_names(cls, filenames:Iterable['CompositeFilename'], local:bool=False) -> list[str]:
+        """
+        names for many filename objects at once, i.e. to list the files of a dataset
+
+        shares the memoised resolution of common parents, so each file costs little more than a lookup
+        """
+        attr = "local_name" if local else "name"
+        return [getattr(filename, attr) for filename in filenames]
     
     def update_entity(self, key:str, value:Any):
         """Update an entity value, triggering schema checks"""
@@ -145,7 +197,7 @@ class CompositeFilename(filenameBase):
             raise KeyError(f"Entity {key} not found in entities for {self}")
 
         self.entities[key].val = value
-        # trigger callback to update children
+        # trigger callback to update children, which also clears the memoised names
         _update_children_cback(self, tags="entities")
 
     @staticmethod
@@ -199,50 +251,60 @@ class CompositeFilename(filenameBase):
     # this was overkill on my part and would've been better handled by simple setters and getters... but hindsight...
     # the only safe way to modify is via update_entity method for now...
     
+    def _resolve_inherited(self, key:str) -> Union[Suffix, raw_Datatype, None]:
+        """the suffix or datatype object of the instance if set, otherwise of the closest parent which sets it"""
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
+        cur_val = getattr(self, key)
+        if cur_val is None and isinstance(self.parent, CompositeFilename):
+            cur_val = self.parent._resolve_inherited(key)
+
+        self._resolved[key] = cur_val
+        return cur_val
+
     @property
     def resolved_suffix(self) -> str: 
         """The current instance's suffix if specified, otherwise inherited from parent folders"""
-        cur_val = self.suffix._name
-        if cur_val is not None:
-            return cur_val
-        elif self.parent is not None:
-            return self.parent.resolved_suffix
-        else:
-            return None
+        suffix = self._resolve_inherited("suffix")
+        return None if suffix is None else suffix.name
         
     @property
     def resolved_datatype(self) -> str: 
         """The current instance's datatype if specified, otherwise inherited from parent folders"""
-        cur_val = self.datatype._name
-        if cur_val is not None:
-            return cur_val
-        elif self.parent is not None:
-            return self.parent.resolved_datatype
-        else:
-            return None
+        datatype = self._resolve_inherited("datatype")
+        return None if datatype is None else datatype.name
         
     @property
-    def resolved_entities(self) -> dict:
-        """The current instance's entities as well as those inherited from parents (i.e. session or subject)"""
+    def resolved_entities(self) -> MappingProxyType:
+        """The current instance's entities as well as those inherited from parents (i.e. session or subject)
         
-        # can consider making this a seperate function and caching it depending on the input observableDict
-        def _clean_entities() -> dict:
-            clean_entities = dict()
-            for key, value in self.entities.items():
-                cat, val = value.level, value.val
-                if val is not None:
-                    clean_entities[key] = value
-            return clean_entities
-
-        if self.parent is None:
-            cur_entities = dict()
+        memoised, so returned as a read only mapping
+        """
+        try:
+            return self._resolved["entities"]
+        except KeyError:
+            pass
+
+        if isinstance(self.parent, CompositeFilename):
+            cur_entities = dict(self.parent.resolved_entities)
         else:
-            cur_entities = self.parent.resolved_entities
+            cur_entities = dict()
+
+        for key, value in self.entities.items(): # overwrite parent values with cur values
+            if value.val is not None:
+                cur_entities[key] = value
 
-        cur_entities.update(_clean_entities()) # overwrite parent values with cur values
-        return cur_entities
+        ret = self._resolved["entities"] = MappingProxyType(cur_entities)
+        return ret
     
 def _set_filenames_schema(schema:'Namespace'):
     CompositeFilename.schema = schema.rules.entities
+    CompositeFilename._entity_order = {
+        name: (pos, schema.objects.entities[name].name) for pos, name in enumerate(schema.rules.entities)
+    }
+    CompositeFilename._parser = filenameParser.from_schema(schema)
 
 __all__ = ["agnosticFilename", "CompositeFilename"]
\ No newline at end of file
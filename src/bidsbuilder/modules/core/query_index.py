@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Union
+
+from .filenames import CompositeFilename
+
+if TYPE_CHECKING:
+    from .dataset_tree import FileEntry
+
+"""
+Inverted index of the files of a dataset by their entities, suffix, datatype and extension, see FileCollection.query
+
+Every file (leaf node of the tree) is indexed under one key per facet:
+
+    (entity name, value)    from the resolved entities of its filename, or of its collection's
+    ("suffix", suffix)      resolved suffix and datatype, inherited from the folders above it
+    ("datatype", datatype)
+    ("extension", ext)      everything from the first "." of its name, i.e. ".nii.gz"
+
+each key holding the files under it, so a query is the intersection of a few postings rather than a walk of the
+tree, starting from the smallest. The index lives on the root next to the path index and, like it, is built on the
+first query then kept up to date by FileEntry._index_subtree whenever nodes are added, moved or renamed. Changing an
+entity, suffix or datatype renames its node through _update_children_cback, which re-indexes everything below it.
+
+Nodes are attrs classes compared by value, so they're held by id.
+"""
+
+FACETS = ("suffix", "datatype", "extension")
+
+def _file_keys(node:'FileEntry') -> tuple[tuple[str, str], ...]:
+    filename = node._name_link
+    if not isinstance(filename, CompositeFilename): # a file of a collection, named by its extension
+        parent = node._parent
+        filename = parent._name_link if parent is not None and not parent.is_dir else None
+
+    keys = []
+    if isinstance(filename, CompositeFilename):
+        keys.extend((key, str(entity.val)) for key, entity in filename.resolved_entities.items())
+        if (suffix := filename.resolved_suffix) is not None:
+            keys.append(("suffix", suffix))
+        if (datatype := filename.resolved_datatype) is not None:
+            keys.append(("datatype", datatype))
+
+    _, dot, ext = node.name.partition(".")
+    keys.append(("extension", dot + ext))
+    return tuple(keys)
+
+def _as_values(value:Any) -> tuple[str, ...]:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(str(val) for val in value)
+    return (str(value),)
+
+class entityIndex():
+    """(facet, value) -> files, see module docstring"""
+
+    def __init__(self):
+        self._postings:dict[tuple[str, str], dict[int, 'FileEntry']] = {}
+        self._files:dict[int, tuple['FileEntry', tuple]] = {} # id -> (node, the keys it is indexed under)
+        self.version:int = 0 # bumped whenever a file is added, removed or re-keyed, for caches built from queries
+
+    @classmethod
+    def build(cls, files:Iterable['FileEntry']) -> 'entityIndex':
+        index = cls()
+        for node in files:
+            index.add(node)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def add(self, node:'FileEntry'):
+        """index node under its current keys, replacing those it was indexed under"""
+        node_id = id(node)
+        keys = _file_keys(node)
+        if (indexed := self._files.get(node_id)) is not None:
+            if indexed[1] == keys:
+                return
+            self._discard(node_id, indexed[1])
+
+        self.version += 1
+        self._files[node_id] = (node, keys)
+        for key in keys:
+            self._postings.setdefault(key, {})[node_id] = node
+
+    def remove(self, node:'FileEntry'):
+        if (indexed := self._files.pop(id(node), None)) is not None:
+            self.version += 1
+            self._discard(id(node), indexed[1])
+
+    def _discard(self, node_id:int, keys:tuple):
+        for key in keys:
+            posting = self._postings[key]
+            del posting[node_id]
+            if not posting:
+                del self._postings[key]
+
+    def values(self, facet:str) -> set[str]:
+        """the values of facet across the dataset, i.e. every subject label"""
+        return {value for key, value in self._postings if key == facet}
+
+    def query(self, criteria:dict[str, Any]) -> list['FileEntry']:
+        """
+        files matching every criterion, a list of values matching any of them. Unordered
+        """
+        if not criteria:
+            return [node for node, _ in self._files.values()]
+
+        matches = []
+        for facet, value in criteria.items():
+            values = _as_values(value)
+            if len(values) == 1:
+                matches.append(self._postings.get((facet, values[0]), {}).keys())
+            else:
+                matches.append(set().union(*(self._postings.get((facet, val), {}).keys() for val in values)))
+
+        matches.sort(key=len) # intersect from the smallest
+        ids = set(matches[0])
+        for match in matches[1:]:
+            if not ids:
+                break
+            ids &= match
+        return [self._files[node_id][0] for node_id in ids]
+
+__all__ = ["entityIndex", "FACETS"]
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import os
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Union
+from mne.utils import logger
+
+from ...util.io import _read_JSON, _read_tsv
+from ...util.manifest import MANIFEST_DIR
+from ..core.dataset_core import DatasetCore, SourceFile
+from ..core.dataset_tree import Directory, FileCollection, FileEntry
+from ..core.filenames import CompositeFilename, agnosticFilename
+from ..core.filename_parser import parsedFilename
+from .directories import Subject, folderBase
+from .json_files import JSONfile, sidecar_JSONfile
+from .tabular_files import tabularFile
+
+if TYPE_CHECKING:
+    from ...main_module import BidsDataset
+
+"""
+Reading an existing dataset into the object model, see BidsDataset.read
+
+The root is scanned with os.scandir. sub-* folders become Subjects, their ses-* folders Sessions and folders named
+after a datatype Datatypes. Files are grouped by stem into collections, named by a CompositeFilename parsed from the
+stem by the compiled parser of filename_parser, holding one file per extension:
+
+    .json               sidecar_JSONfile, its values loaded through _read_JSON
+    .tsv, .tsv.gz       tabularFile, its rows loaded through _read_tsv
+    anything else       SourceFile, the bytes on disk are kept as they are
+
+The dataset stays frozen while the tree is built, so no file checks its schema on creation, all files are then
+checked in one batch when the dataset unfreezes. Only then are the JSON and TSV files which the schema gave metadata
+or a table read, by a thread pool, their contents added as they come in. The rules selecting on sidecar values are
+then checked again: the JSON files in a second batch, the files depending on them through their metadata callbacks.
+With BidsDataset(lazy=True) they aren't read at all, each keeps the path of its file and loads it the first time its
+metadata or data is accessed.
+
+Files the object model can't represent yet are kept as a SourceFile: stems which don't parse back to the same
+name, other folders (code/, derivatives/, a .ds MEG recording...), JSON files no schema rule applies to and
+tables without a schema.
+"""
+
+READ_WORKERS = 8
+TSV_EXTENSIONS = (".tsv", ".tsv.gz")
+
+def _split_extension(name:str) -> tuple[str, str]:
+    stem, dot, ext = name.partition(".")
+    return stem, dot + ext
+
+def _keep_source(node:FileEntry, path:str) -> SourceFile:
+    """replace the file linked to node by a SourceFile of path"""
+    old = node._file_link
+    core = SourceFile.create(_level=getattr(old, "_level", "optional"), _source=path)
+    node._file_link = core
+    core._tree_link = node
+    return core
+
+def _scan(path:str) -> list[os.DirEntry]:
+    with os.scandir(path) as it:
+        return sorted(it, key=lambda entry: entry.name)
+
+class datasetReader():
+    """builds the tree of a dataset from its root, see module docstring"""
+
+    def __init__(self, dataset:'BidsDataset', workers:int=READ_WORKERS):
+        self.dataset = dataset
+        self.tree:Directory = dataset.tree
+        self.workers = workers
+        self.datatypes = set(dataset.schema.objects.datatypes.keys())
+
+        self.json_files:list[tuple[FileEntry, str]] = []
+        self.tsv_files:list[tuple[FileEntry, str]] = []
+        self.found:set[int] = set() # ids of the skeleton nodes which exist on disk
+        self.errors:list[Exception] = []
+        self.n_files = 0
+
+    def read(self):
+        dataset = self.dataset
+        skeleton = [node for node in self.tree._iter_tree(2) if node is not self.tree] # the files of its collections too
+        with dataset.batch(): # exists changes of the skeleton files re-check their dependents once, at the end
+            dataset._frozen = True
+            for entry in _scan(dataset.root):
+                self._read_root_entry(entry)
+
+            dataset._frozen = False # one batched check of every file
+            # only read what the schema gave a place to, the rest is kept as it is on disk
+            json_files = self._representable(self.json_files, lambda core: bool(core._cur_labels))
+            tsv_files = self._representable(self.tsv_files, lambda core: core._data is not None)
+
+            if dataset.lazy: # loaded on first access instead
+                for node, path in json_files + tsv_files:
+                    node._file_link._source = path
+                if dataset._sidecar_resolver is not None: # merged while the files were empty
+                    dataset._sidecar_resolver.clear()
+            else:
+                self._load_all(json_files, tsv_files)
+                # checked before their contents were read, their own rules may select on them (i.e. sidecar.M0Type)
+                loaded = [node._file_link for node, _ in json_files]
+                DatasetCore._batch_check_schema([core for core in loaded if isinstance(core, JSONfile)])
+
+            for node in skeleton:
+                if id(node) not in self.found and node._file_link is not None:
+                    node._file_link.exists = False # required files are kept, see DatasetCore._validate_exists
+
+        logger.info(f"read {self.n_files} files from '{dataset.root}'")
+        if self.errors:
+            raise ExceptionGroup(f"failed to read {len(self.errors)} files of {dataset.root}", self.errors)
+
+    def _error(self, exc:Exception, path:str):
+        exc.add_note(f"while reading {path}")
+        self.errors.append(exc)
+
+    # ---- building the tree ----
+
+    def _read_root_entry(self, entry:os.DirEntry):
+        name = entry.name
+        if name == MANIFEST_DIR:
+            return
+
+        if entry.is_dir():
+            node = self.tree.children.get(name)
+            if node is not None:
+                self._found(node, entry.path)
+            elif name.startswith("sub-"):
+                self._read_subject(entry)
+            else:
+                self._add_source(self.tree, entry)
+            return
+
+        stem, ext = _split_extension(name)
+        node = self.tree.children.get(name)
+        if node is None and isinstance(collection := self.tree.children.get(stem), FileCollection):
+            node = collection.children.get(ext)
+            self.found.add(id(collection))
+        if node is None:
+            node = self._match_agnostic(stem, ext)
+
+        if node is not None:
+            self.n_files += 1
+            self._found(node, entry.path)
+        else:
+            self._read_files(self.tree, [entry])
+
+    def _match_agnostic(self, stem:str, ext:str) -> Union[FileEntry, None]:
+        """skeleton file of the same stem which allows ext, i.e. README.md for README, switched to ext"""
+        for node in self.tree.children.values():
+            filename = node._name_link
+            if isinstance(filename, agnosticFilename) and filename._stem == stem and ext in filename._valid_extensions:
+                filename._change_ext(ext)
+                node.name = filename.name
+                return node
+        return None
+
+    def _found(self, node:FileEntry, path:str):
+        self.found.add(id(node))
+        core = node._file_link
+        if isinstance(core, JSONfile):
+            self.json_files.append((node, path))
+        elif isinstance(core, tabularFile):
+            self.tsv_files.append((node, path))
+        else:
+            core = _keep_source(node, path)
+        core.exists = True
+
+    def _read_subject(self, entry:os.DirEntry):
+        try:
+            sub = Subject.create(entry.name[len("sub-"):], self.tree)
+        except (ValueError, AssertionError) as e: # not a valid subject label, kept as it is
+            logger.warning(f"keeping '{entry.path}' as it is, it isn't a valid subject folder: {e}")
+            self._add_source(self.tree, entry)
+            return
+
+        entries = _scan(entry.path)
+        for child in entries: # sessions first, a subject with sessions can't hold datatype folders
+            if child.is_dir() and child.name.startswith("ses-"):
+                self._read_folder(sub.add_session(child.name[len("ses-"):]), child.path)
+        self._read_folder(sub, entry.path, [child for child in entries if not child.name.startswith("ses-") or not child.is_dir()])
+
+    def _read_folder(self, folder:folderBase, path:str, entries:list[os.DirEntry]=None):
+        if entries is None:
+            entries = _scan(path)
+
+        files = []
+        for entry in entries:
+            if not entry.is_dir():
+                files.append(entry)
+            elif entry.name in self.datatypes and hasattr(folder, "add_datatype"):
+                self._read_folder(folder.add_datatype(entry.name), entry.path)
+            else:
+                self._add_source(folder._tree_link, entry)
+        self._read_files(folder._tree_link, files)
+
+    def _add_source(self, parent:Directory, entry:os.DirEntry):
+        """a file or folder kept as it is"""
+        self.n_files += 1
+        stem, ext = _split_extension(entry.name)
+        type_flag = "directory" if entry.is_dir() else "file"
+        parent.add_child(agnosticFilename(stem, [ext], ext), SourceFile.create(_source=entry.path), type_flag)
+
+    def _read_files(self, parent:Directory, entries:list[os.DirEntry]):
+        stems:dict[str, list[tuple[str, os.DirEntry]]] = {}
+        for entry in entries:
+            stem, ext = _split_extension(entry.name)
+            stems.setdefault(stem, []).append((ext, entry))
+
+        for stem, parsed in zip(stems, CompositeFilename.parse_names(stems)):
+            files = stems[stem]
+            filename = self._parse_filename(stem, parsed)
+            if filename is None:
+                for _, entry in files:
+                    self._add_source(parent, entry)
+                continue
+
+            collection = parent.add_child(filename, None, "collection")
+            for ext, entry in files:
+                self.n_files += 1
+                if ext == ".json":
+                    node = collection.add_child(agnosticFilename('', [ext], ext), sidecar_JSONfile.create())
+                    self.json_files.append((node, entry.path))
+                elif ext in TSV_EXTENSIONS:
+                    node = collection.add_child(agnosticFilename('', [ext], ext), tabularFile.create())
+                    self.tsv_files.append((node, entry.path))
+                else:
+                    collection.add_child(agnosticFilename('', [ext], ext), SourceFile.create(_source=entry.path))
+
+    @staticmethod
+    def _parse_filename(stem:str, parsed:Union[parsedFilename, None]) -> Union[CompositeFilename, None]:
+        """the filename of stem, None if it doesn't parse back to the same name"""
+        if parsed is None:
+            return None
+
+        try:
+            filename = CompositeFilename.create({key: ("optional", val) for key, val in parsed.entities.items()}, parsed.suffix)
+        except (ValueError, KeyError, AssertionError): # a value the entity's rules don't allow
+            return None
+        return filename if filename.local_name == stem else None
+
+    # ---- loading contents ----
+
+    @staticmethod
+    def _representable(files:list[tuple[FileEntry, str]], check) -> list[tuple[FileEntry, str]]:
+        kept = []
+        for node, path in files:
+            if check(node._file_link):
+                kept.append((node, path))
+            else:
+                _keep_source(node, path)
+        return kept
+
+    def _load_all(self, json_files:list[tuple[FileEntry, str]], tsv_files:list[tuple[FileEntry, str]]):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            json_reads = [pool.submit(_read_JSON, path) for _, path in json_files]
+            tsv_reads = [pool.submit(_read_tsv, path) for _, path in tsv_files]
+            for (node, path), future in zip(json_files, json_reads): # loaded as they are read
+                self._load(node, path, future, JSONfile._load_values)
+            for (node, path), future in zip(tsv_files, tsv_reads):
+                self._load(node, path, future, tabularFile._load_rows)
+
+    def _load(self, node:FileEntry, path:str, future:Future, load:Callable[[DatasetCore, Any], None]):
+        try:
+            content = future.result()
+        except Exception as e: # unreadable, kept as it is
+            _keep_source(node, path)
+            self._error(e, path)
+            return
+
+        try:
+            load(node._file_link, content)
+        except Exception as e:
+            self._error(e, path)
+
+def read_dataset(dataset:'BidsDataset', workers:int=READ_WORKERS) -> 'BidsDataset':
+    datasetReader(dataset, workers).read()
+    return dataset
+
+__all__ = ["read_dataset", "READ_WORKERS"]
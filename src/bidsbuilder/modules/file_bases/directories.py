@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from attrs import define, field
-from typing import ClassVar, TYPE_CHECKING, Self
+from typing import ClassVar, TYPE_CHECKING, Self, Union
 from ..core.dataset_core import DatasetCore
 from ..schema_objects import Entity, Suffix
 from ..core.filenames import CompositeFilename
 from ..core.dataset_tree import Directory
+from ...util.hooks import recheck_scheduler
 
 from pathlib import Path
 
@@ -61,7 +62,7 @@ class folderBase(DatasetCore):
         """
         ...
 
-    def _make_file(self, force:bool):
+    def _make_file(self, force:bool, manifest=None):
         path = Path(self._tree_link.path)
         path.mkdir(parents=False, exist_ok=force)
 
@@ -83,8 +84,10 @@ class Subject(folderBase):
     """
     _n_subjects: ClassVar[int] = 0 # to anonymise / give label if no name is given
     _pair_session_count: ClassVar[int] = 0 # if 0, will omit creating the session subdir
+    _pending_rows: ClassVar[dict[str, tuple['Subject', Union[str, None]]]] = {} # participants rows appended in a batch, see _flush_rows
 
     _n_sessions:int = field(default=0, init=False, repr=False)
+    _counted:bool = field(default=False, init=False, repr=False) # in _n_subjects
 
     @property
     def val(self) -> str:
@@ -94,8 +97,9 @@ class Subject(folderBase):
         # --- checking valid val ---
         
         self._check_name(self.val) # check duplicates
-        self.participants.addRow(f"sub-{self.val}")
+        self._add_row(self.val)
         Subject._n_subjects += 1
+        self._counted = True
         self.n = Subject._n_subjects
         super().__core_post_init__()
 
@@ -107,9 +111,58 @@ class Subject(folderBase):
     def val(self, new_val:str):
 
         new_val = self._check_name(new_val) # check for duplicates
-        self.participants.delRow(f"sub-{self.val}")
-        self.participants.addRow(f"sub-{new_val}")
-        self._tree_link._name_link.update_entity(self._cur_entity[0], new_val) # entity itself checks for format
+        old_val = self.val
+        with recheck_scheduler.operation(): # the files below are re-checked once, after both changes
+            self._tree_link._name_link.update_entity(self._cur_entity[0], new_val) # entity itself checks for format
+            self.participants.delRow(f"sub-{old_val}") # validates the rows appended before it
+            Subject._pending_rows.pop(f"sub-{old_val}", None)
+            self._add_row(new_val, old_val)
+
+    def _add_row(self, val:str, old_val:Union[str, None]=None):
+        """
+        add the participants row of val, for a new subject or one renamed from old_val.
+
+        Within a batch (BidsDataset.batch, which reading a dataset and add_subject use) the row is appended and the
+        rows of the whole batch validated together when it ends, see _flush_rows. Otherwise it is validated straight away
+        """
+        key = f"sub-{val}"
+        if not recheck_scheduler.deferring:
+            self.participants.addRow(key)
+            return
+        self.participants.appendRow(key)
+        Subject._pending_rows[key] = (self, old_val)
+        recheck_scheduler.schedule(Subject._flush_rows)
+
+    @classmethod
+    def _flush_rows(cls, tags=None):
+        """validate the rows appended in a batch in one merge, undoing the subjects (or renames) whose row failed"""
+        pending, cls._pending_rows = cls._pending_rows, {}
+        if not pending:
+            return
+
+        table = next(iter(pending.values()))[0].participants._data # not loading a lazily read participants.tsv
+        try:
+            table.flush()
+        finally: # also when the table was flushed by another of its operations, which raised the errors then
+            for key, (subject, old_val) in pending.items():
+                if not table.isRow(key):
+                    subject._rollback(old_val)
+
+    def _rollback(self, old_val:Union[str, None]):
+        """undo the creation (old_val None) or the rename of a subject whose participants row failed validation"""
+        if old_val is not None:
+            self._tree_link._name_link.update_entity(self._cur_entity[0], old_val)
+            self.participants.addRow(f"sub-{old_val}")
+            return
+
+        node = self._tree_link
+        if node.parent is not None:
+            if node.parent.children.get(node.name) is node:
+                node.parent.children.pop(node.name)
+            node.parent = None # out of the indexes, with its sessions and files
+        if self._counted:
+            Subject._n_subjects -= 1
+            self._counted = False
 
 
     def add_session(self, ses:str=None):
@@ -140,7 +193,7 @@ class Subject(folderBase):
         for child in self.children:
             if not isinstance(child, Datatype):
                 raise TypeError(f"Failed to migrate {self}'s subfolders to session dir, expected {child} to be of type: Datatype")
-            child._tree_link.parent = ses_parent._tree_link
+            ses_parent._tree_link.add_tree_node(child._tree_link) # moves the folder, keeping the path index in sync
 
         #reset children
         ses_parent.children = self.children
@@ -150,6 +203,7 @@ class Subject(folderBase):
         for child in self.children:
             if child.val == new_name:
                 raise ValueError(f"Cannot add folder {new_name} with duplicate names/type for {self}")
+        return new_name
         
     def add_datatype(self, d_type:str):
         self._validate_child_name(d_type)
@@ -157,8 +211,9 @@ class Subject(folderBase):
         if self._n_sessions > 0:
             raise RuntimeError(f"Can't add datatype folder to a subject already containing sessions, please assign it to one of its sessions")
         
-        to_add = Datatype.create(d_type)
+        to_add = Datatype.create(d_type, self._tree_link)
         self.children.append(to_add)
+        return to_add
 
     def _check_name(self, new_val:str|None) -> str:
 
@@ -174,7 +229,8 @@ class Subject(folderBase):
     def __del__(self):
         # have to be careful with anonymise here, when _n_subjects decrements it could lead to different subjects getting the same
         # n label. Need a better system to manage this... i.e. decrement all n values above this one? -> need a store of the subjects
-        Subject._n_subjects -= 1
+        if getattr(self, "_counted", False): # not if its creation failed or was rolled back
+            Subject._n_subjects -= 1
 
         to_inc = max(0, (self._n_sessions - 1)) # use max in case self._n_sessions is 0, in which case it would result in -1
         Subject._pair_session_count -= to_inc
@@ -202,12 +258,14 @@ class Session(folderBase):
         for child in self.children:
             if child.val == new_name:
                 raise ValueError(f"Cannot add folder {new_name} with duplicate names/type for {self}")
+        return new_name
         
     def add_datatype(self, d_type:str):
         self._validate_child_name(d_type)
         #subject has either got only sessions, or only datatype folders
-        to_add = Datatype.create(d_type)
+        to_add = Datatype.create(d_type, self._tree_link)
         self.children.append(to_add)
+        return to_add
     
 class Datatype(folderBase):
 
@@ -220,7 +278,7 @@ class Datatype(folderBase):
         try:
             Suffix(name)
             is_suffix = True
-        except KeyError as e:
+        except (KeyError, ValueError) as e: # i.e. anat, which is only a datatype
             is_suffix = False
 
         kwargs = {"datatype":name}
@@ -244,7 +302,7 @@ class Datatype(folderBase):
         try:
             Suffix(new_val)
             is_suffix = True
-        except KeyError as e:
+        except (KeyError, ValueError) as e:
             is_suffix = False
         if is_suffix:
             self._tree_link._name_link.suffix = new_val
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import weakref
+
 from attrs import define, field
 from typing import TYPE_CHECKING, ClassVar, Any, Union, Self, Generator
 
-from ...util.io import _write_json
-from ..core.dataset_core import DatasetCore
+from ...util.io import _write_json, _read_JSON
+from ..core.dataset_core import DatasetCore, _copy_source
 from ...schema.schema_checking import schema_checker_OLD
 from ...util.hooks import HookedDescriptor, DescriptorProtocol, MinimalDict
 from ..schema_objects import Metadata
 
 if TYPE_CHECKING:
     from bidsschematools.types.namespace import Namespace
+    from ...util.manifest import buildManifest
 
 class JSON_shema_checker(schema_checker_OLD):
 
@@ -24,9 +27,10 @@ class JSON_shema_checker(schema_checker_OLD):
                 if isinstance(fields[key], str): # the value is a requirement
                     processed[key] = Metadata(key, fields[key])
                 else:
-                    level = fields[key].pop("level")
+                    override = dict(fields[key].items()) # copy, the rule is shared by the cached schema
+                    level = override.pop("level")
                     met_instance = Metadata(key, level)
-                    Metadata._override[met_instance] = fields[key]
+                    Metadata._override[met_instance] = override
                     processed[key] = met_instance
             return processed
 
@@ -35,7 +39,7 @@ class JSON_shema_checker(schema_checker_OLD):
         """convert the fields namespace into a list of keys to delete
         """
         fields = all_fields["fields"]
-        processed = fields["fields"].keys()
+        processed = fields.keys()
         return processed
 
 def JSON_check_schema(*args, **kwargs) -> Generator[tuple, None, None]:
@@ -49,12 +53,11 @@ class metadataDict(MinimalDict):
     def del_metadata(self, to_remove: list) -> dict:
         ret_dict = {}
 
-        self._frozen = True
-        for key in to_remove:
-            removed = self.pop(key)
-            ret_dict[key] = removed.val
-        self._frozen = True
-        self._check_callback_()
+        with self.batch(): # a single callback rather than one per removed key
+            for key in to_remove:
+                removed = self.pop(key)
+                ret_dict[key] = removed.val
+            self._check_callback_()
 
         return ret_dict
  
@@ -62,13 +65,51 @@ class metadataDict(MinimalDict):
 class JSONfile(DatasetCore):
     
     _schema:ClassVar['Namespace']
+    _schema_checker:ClassVar[type[JSON_shema_checker]] = JSON_shema_checker
     metadata:ClassVar[dict[str, 'Metadata']]
 
-    _removed_key:dict[str, Any] = field(init=False, factory=dict) #for overflow values passed to json which doesn't have a valid key representing it
+    _removed_key:dict[str, Any] = field(init=False, factory=dict) # values of keys a schema label stopped giving, restored if it applies again
+    _extra_keys:dict[str, Any] = field(init=False, factory=dict) # custom keys, read from disk or set with json[key] = val, which the schema doesn't give
     _cur_labels:set = field(init=False, factory=set)
+    _source:Union[str, None] = field(init=False, default=None, repr=False) # file on disk not loaded yet, see BidsDataset(lazy=True)
         
-    def _make_file(self, force:bool):
-        _write_json(self._tree_link.path, self.rawMetadata, force)
+    def _make_file(self, force:bool, manifest:Union['buildManifest', None]=None):
+        if self._source is not None: # never accessed, the file on disk is kept as it is
+            _copy_source(self, self._source, force)
+            return
+        _write_json(self._tree_link.path, self.rawMetadata, force, manifest)
+
+    def _load_values(self, values:dict[str, Any]):
+        """
+        set the values read from a file, those of keys the schema didn't give this file are kept in _extra_keys.
+        The files depending on this one's metadata (see fields_funcs.sidecar) are re-checked once, for all of them
+        """
+        metadata = self._metadata
+        errors = []
+        for key, val in values.items():
+            if key not in metadata:
+                self._extra_keys[key] = val
+                continue
+            try:
+                metadata[key].val = val
+            except (ValueError, TypeError, AssertionError) as e:
+                e.add_note(f"for key {key}")
+                errors.append(e)
+        if values:
+            type(self).metadata._trigger_callback(self)
+        if errors:
+            raise ExceptionGroup(f"invalid values in {self._tree_link.path}", errors)
+
+    def _mark_dirty_(self):
+        super()._mark_dirty_()
+        # merged sidecar values using this file are stale, see sidecar_inheritance
+        if (resolver := getattr(getattr(self, "_dataset", None), "_sidecar_resolver", None)) is not None:
+            resolver.invalidate(self)
+
+    def _load_source(self):
+        path, self._source = self._source, None
+        self._load_values(_read_JSON(path))
+        self._check_schema() # its own rules may select on its contents, i.e. sidecar.M0Type
 
     def __getitem__(self, key:str):
         return self.metadata[key].val
@@ -83,12 +124,21 @@ class JSONfile(DatasetCore):
         try:
             self.metadata[key].val = value
         except KeyError:
-            self._removed_key[key] = value
+            self._extra_keys[key] = value
+            self._mark_dirty_()
+        else: # Metadata values aren't hooked, re-check the files depending on them
+            type(self).metadata._trigger_callback(self)
     
     @property
     def rawMetadata(self):
+        """
+        the values to write, those of the schema's fields followed by the custom keys it doesn't give this file (read
+        from disk or set with json[key] = val), which are valid BIDS and kept rather than dropped. The values of fields
+        a label stopped giving are only held to be restored, not written
+        """
         final_json = {}
-        for key, value in self.metadata.items():
+        metadata = self.metadata
+        for key, value in metadata.items():
             cat, val = value.level, value.val
             if val is None:
                 match cat:
@@ -100,6 +150,10 @@ class JSONfile(DatasetCore):
                         pass
             else:
                 final_json[key] = val
+
+        for key, val in self._extra_keys.items(): # not those of _removed_key, which the schema no longer gives
+            if key not in metadata and val is not None:
+                final_json[key] = val
         return final_json
 
     @staticmethod
@@ -113,13 +167,24 @@ class JSONfile(DatasetCore):
         else:
             return val
 
-    metadata:ClassVar[metadataDict[str, 'Metadata']] = HookedDescriptor(metadataDict, fval=_metadata_validator) # considered making rawMetadata the getter
+    @staticmethod
+    def _metadata_getter(self:Self, value:metadataDict, descriptor:DescriptorProtocol) -> metadataDict:
+        if self._source is not None: # first access of a lazily read file
+            self._load_source()
+        return value
+
+    metadata:ClassVar[metadataDict[str, 'Metadata']] = HookedDescriptor(metadataDict, fval=_metadata_validator, fget=_metadata_getter) # considered making rawMetadata the getter
     # but this leads to all sorts of confusion if people did something like myJson.metadata[key] = value. As it would then not
     # actually modify the structure, but the "raw" dict spat out by rawMetadata
 
     def __contains__(self, key):
         return key in self.metadata
 
+    @property
+    def _metadata(self) -> metadataDict:
+        """metadata without loading a lazily read file, for the schema checks"""
+        return type(self).metadata._get_container(self)
+
     def _check_schema(self, add_callbacks:bool=False, tags:Union[list,str] = None):
         """
         check the schema for the given object. 
@@ -131,23 +196,39 @@ class JSONfile(DatasetCore):
         modified = False
         for flag, label, items in JSON_check_schema(self, self._schema,self._cur_labels, add_callbacks, tags):
             modified = True
-            if flag == "add":
-                self._cur_labels.add(label)
-                self.metadata.set_metadata(items)
-            elif flag == "del":
-                self._cur_labels.remove(label)
-                deleted_keys = self.metadata.del_metadata(items)
-                self._removed_key.update(deleted_keys)
-            else:
-                raise RuntimeError(f"unknown flag: {flag} given in {self}._check_schema")
-        
+            self._apply_schema_change(flag, label, items)
+
+        self._schema_check_done(modified)
+
+    def _apply_schema_change(self, flag:str, label:str, items:Any):
+        if flag == "add":
+            self._cur_labels.add(label)
+            metadata = self._metadata
+            owner = weakref.ref(self)
+            for key, met in items.items():
+                if (old := metadata.get(key)) is not None and old.val is not None: # also given by another label
+                    met.val = old.val
+                met._owner = owner # see Metadata._owner
+            metadata.set_metadata(items)
+        elif flag == "del":
+            self._cur_labels.remove(label)
+            deleted_keys = self._metadata.del_metadata(items)
+            self._removed_key.update(deleted_keys)
+        else:
+            raise RuntimeError(f"unknown flag: {flag} given in {self}._check_schema")
+
+    def _schema_check_done(self, modified:bool):
         if modified:
             self._check_removed()
 
     def _check_removed(self):
+        """restore the values of keys given (again) by the schema, custom keys becoming fields of the file"""
+        metadata = self._metadata
         for key, val in self._removed_key.items():
-            if key in self.metadata:
-                self.metadata[key].val = val
+            if key in metadata:
+                metadata[key].val = val
+        for key in [key for key in self._extra_keys if key in metadata]:
+            metadata[key].val = self._extra_keys.pop(key)
 
 @define(slots=True)
 class sidecar_JSONfile(JSONfile):
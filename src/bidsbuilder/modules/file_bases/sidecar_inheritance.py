@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Iterator, Union
+
+from ...util.io import _read_JSON
+from ..core.dataset_core import DatasetCore, SourceFile
+from ..core.filenames import CompositeFilename
+from .json_files import JSONfile
+
+if TYPE_CHECKING:
+    from ..core.dataset_tree import Directory, FileEntry
+    from ..core.query_index import entityIndex
+
+"""
+The inheritance principle: the sidecar metadata of a file is the merge of the JSON files which apply to it, from the
+root down to its own folder, values of deeper files overriding those above them
+
+A JSON file applies to a data file if it's in the same folder or one above it, has the same suffix, and its entities
+are a subset of the data file's, i.e. /task-rest_eeg.json applies to /sub-01/eeg/sub-01_task-rest_run-1_eeg.edf.
+Of the JSON files of one folder which apply, the one with the most entities is used.
+
+sidecarResolver caches at two levels:
+
+    per suffix, the JSON files of each folder with their entities, found through the query index
+    per chain of applied JSON files, the merged values. A chain extends the chain of the folders above it, so files
+    sharing ancestors reuse their merges rather than re-merging the whole chain. Chains are keyed by the linked
+    DatasetCore instances, so replacing the file of a node (i.e. the reader keeping it as a SourceFile) starts a new one
+
+The JSON files of a suffix are found again whenever the query index changes (files added, renamed or moved).
+Merges using a JSON file are dropped when its metadata changes: the metadata descriptor callbacks and the values of
+its Metadata fields (see Metadata._owner) flag the file through JSONfile._mark_dirty_.
+"""
+
+class inheritedMetadata(Mapping):
+    """
+    read only merged sidecar values, with the JSON files they were merged from (root first) as sources.
+    Keys which aren't set are null (None), as in the schema's expressions
+    """
+    __slots__ = ("_values", "sources")
+
+    def __init__(self, values:dict[str, Any], sources:tuple[DatasetCore, ...]):
+        self._values = values
+        self.sources = sources
+
+    def __getitem__(self, key:str) -> Any:
+        return self._values.get(key)
+
+    def get(self, key:str, default:Any=None) -> Any:
+        return self._values.get(key, default)
+
+    def __contains__(self, key:object) -> bool:
+        return key in self._values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._values!r})"
+
+def _filename_of(node:'FileEntry') -> Union[CompositeFilename, None]:
+    filename = node._name_link
+    if isinstance(filename, CompositeFilename):
+        return filename
+    parent = node._parent # a file of a collection, named by its extension
+    if parent is not None and not parent.is_dir and isinstance(parent._name_link, CompositeFilename):
+        return parent._name_link
+    return None
+
+def _entity_set(filename:CompositeFilename) -> frozenset:
+    return frozenset((key, str(entity.val)) for key, entity in filename.resolved_entities.items())
+
+def _values_of(core:DatasetCore) -> dict[str, Any]:
+    if isinstance(core, JSONfile):
+        return {key: meta.val for key, meta in core.metadata.items() if meta.val is not None}
+    if isinstance(core, SourceFile): # a JSON file no schema rule gave metadata, kept as it is on disk
+        return _read_JSON(core._source)
+    return {}
+
+class sidecarResolver():
+    """merged sidecar metadata of the files of a tree, see module docstring"""
+
+    def __init__(self, tree:'Directory'):
+        self.tree = tree
+        self._index_version:Union[int, None] = None
+        self._levels:dict[str, dict[int, list[tuple[frozenset, 'FileEntry']]]] = {} # suffix -> folder id -> JSON files
+        self._merged:dict[tuple[int, ...], tuple] = {(): ((), {})} # ids of the applied JSON files -> (files, merged values)
+        self._dependents:dict[int, list[tuple[int, ...]]] = {} # id of a JSON file -> the merged chains using it
+
+    def clear(self):
+        self._levels.clear()
+        self._merged = {(): ((), {})}
+        self._dependents.clear()
+
+    def invalidate(self, json_core:DatasetCore):
+        """drop the merges using json_core, its values changed"""
+        for chain in self._dependents.pop(id(json_core), ()):
+            self._merged.pop(chain, None)
+
+    def _sync(self) -> 'entityIndex':
+        index = self.tree._get_query_index()
+        if index.version != self._index_version: # the JSON files of a folder may have changed
+            self.clear()
+            self._index_version = index.version
+        return index
+
+    def _sidecars_of(self, index:'entityIndex', suffix:str) -> dict[int, list[tuple[frozenset, 'FileEntry']]]:
+        if (levels := self._levels.get(suffix)) is not None:
+            return levels
+
+        levels = self._levels[suffix] = {}
+        nodes = sorted(index.query({"extension": ".json", "suffix": suffix}), key=lambda node: node.relative_path)
+        for node in nodes:
+            if (filename := _filename_of(node)) is None:
+                continue
+            folder = node._parent if node._parent.is_dir else node._parent._parent
+            levels.setdefault(id(folder), []).append((_entity_set(filename), node))
+        return levels
+
+    def applied(self, node:'FileEntry') -> Union[tuple['FileEntry', ...], None]:
+        """the JSON files which apply to node, root first, None if it isn't named by entities and a suffix"""
+        filename = _filename_of(node)
+        if filename is None or (suffix := filename.resolved_suffix) is None:
+            return None
+
+        levels = self._sidecars_of(self._sync(), suffix)
+        entities = _entity_set(filename)
+        folders = []
+        parent = node._parent
+        while parent is not None:
+            if parent.is_dir:
+                folders.append(parent)
+            parent = parent._parent
+
+        chain = []
+        for folder in reversed(folders):
+            best = None
+            for sidecar_entities, sidecar in levels.get(id(folder), ()):
+                if sidecar_entities <= entities and (best is None or len(sidecar_entities) > len(best[0])):
+                    best = (sidecar_entities, sidecar)
+            if best is not None:
+                chain.append(best[1])
+        return tuple(chain)
+
+    def _merge(self, sources:tuple[DatasetCore, ...]) -> dict[str, Any]:
+        key = tuple(id(core) for core in sources)
+        if (cached := self._merged.get(key)) is not None:
+            return cached[1]
+
+        merged = dict(self._merge(sources[:-1])) # the folders above, shared with every file below them
+        merged.update(_values_of(sources[-1]))
+        self._merged[key] = (sources, merged) # holding the sources keeps their ids from being reused
+        for core_id in key:
+            self._dependents.setdefault(core_id, []).append(key)
+        return merged
+
+    def resolve(self, core:DatasetCore) -> Union[inheritedMetadata, None]:
+        """merged sidecar metadata of core, None if it isn't named by entities and a suffix"""
+        chain = self.applied(core._tree_link)
+        if chain is None:
+            return None
+        sources = tuple(node._file_link for node in chain)
+        return inheritedMetadata(self._merge(sources), sources)
+
+__all__ = ["sidecarResolver", "inheritedMetadata"]
@@ -5,14 +5,16 @@ import pandera.pandas as pa
 from attrs import define, field
 from typing import TYPE_CHECKING, ClassVar, Any, Union, Self
 
-from ...util.io import _write_json, _write_tsv
-from ..core.dataset_core import DatasetCore
+from ...util.io import _write_json, _write_tsv, _read_tsv
+from ..core.dataset_core import DatasetCore, _copy_source
 from ...util.hooks import *
 from ..schema_objects import Column, UserDefinedColumn
-from ...schema.schema_checking import check_schema
+from ..column_storage import check_storage, parse_text, OBJECT_STORAGE
+from ...schema.schema_checking import check_schema, schema_checker
 
 if TYPE_CHECKING:
     from bidsschematools.types.namespace import Namespace
+    from ...util.manifest import buildManifest
 
 @define(slots=True)
 class columnView(MinimalSet):
@@ -63,9 +65,15 @@ class tableView():
     data_schema:pa.DataFrameSchema = field(repr=False) # validator to check input data
     additional_columns_flag = field(repr=True) # allowed, allowed_if_defined, not_allowed
     columns:dict = field(repr=False)
+    storage:str = field(default=OBJECT_STORAGE, repr=True) # see column_storage
+
+    # rows added by appendRow, validated and merged together by flush()
+    _pending:list[tuple[Any, dict]] = field(init=False, factory=list, repr=False)
+    _pending_keys:set = field(init=False, factory=set, repr=False)
 
     @classmethod
-    def _create(cls, columns:dict[str, Column], additional_columns_flag:str, initial_columns:list=[], index_columns:list=[]) -> Self:
+    def _create(cls, columns:dict[str, Column], additional_columns_flag:str, initial_columns:list=[], index_columns:list=[],
+                storage:str=OBJECT_STORAGE) -> Self:
         """
         columns: - dict with values that may be found in objects.columns
         
@@ -74,6 +82,9 @@ class tableView():
         initial_columns: - An optional list of columns that must be the first N columns of a file
 
         index_columns: - An optional list of columns that uniquely identify a row.
+
+        storage: - How values are held, one of column_storage.STORAGE_BACKENDS. "object" keeps Python objects,
+            "typed" and "arrow" keep typed arrays with dtypes derived from the column schema
         """
         flag_converter = {
             "allowed":ALLOWED,
@@ -89,7 +100,8 @@ class tableView():
         
         # create schema
         ds = pa.DataFrameSchema(cls._create_col_schema(columns,init_cols=set(initial_columns)))
-        ds = ds.set_index(index_columns, drop=False)
+        if index_columns: # an empty list would be an empty MultiIndex, which no RangeIndex frame validates against
+            ds = ds.set_index(index_columns, drop=False)
         
         # create original dataframe        
         df = pd.DataFrame(columns=initial_columns)
@@ -98,7 +110,13 @@ class tableView():
                 index_columns = index_columns[0]
             df.set_index(index_columns, inplace=True, drop=False)
         
-        return cls(data=df, data_schema=ds, additional_columns_flag=flag_val, columns=columns)
+        view = cls(data=df, data_schema=ds, additional_columns_flag=flag_val, columns=columns, storage=storage)
+        view.data = view._to_storage(df)
+        return view
+
+    @storage.validator
+    def _check_storage(self, attribute, value):
+        check_storage(value)
 
     @property
     def _index_col(self):
@@ -106,7 +124,27 @@ class tableView():
     
     @property
     def _template_df(self):
-        return self.data.iloc[0:0].copy()
+        return self.data.iloc[0:0].astype(object) # values are always set and validated as Python objects
+
+    def _column_dtype(self, name:str, column:Union[Column, UserDefinedColumn]=None):
+        if self.storage == OBJECT_STORAGE:
+            return object
+        if column is None:
+            column = self.columns.get(name)
+        return object if column is None else column.storage_dtype(self.storage)
+
+    def _to_storage(self, df:pd.DataFrame) -> pd.DataFrame:
+        """cast validated (object) columns to the dtypes of the current storage"""
+        if self.storage == OBJECT_STORAGE:
+            return df
+        return df.astype({col: self._column_dtype(col) for col in df.columns})
+
+    def set_storage(self, storage:str):
+        """change how the values are held, converting the current data"""
+        self.flush()
+        self.storage = storage
+        self.data = self._to_storage(self.data.astype(object))
+        return self
 
     @staticmethod
     def _create_col_schema(columns:dict[str, Union[Column, UserDefinedColumn]], init_cols:set=set()):
@@ -116,10 +154,11 @@ class tableView():
                 req = True
             else:
                 req = False
-            check_data[key] = pa.Column(object, pa.Check(val.vectorized_val_checker), required=req)
+            check_data[key] = pa.Column(object, pa.Check(val.vectorized_val_checker), required=req, nullable=True) # n/a cells
         return check_data    
 
     def _update_meta(self, columns:dict):  
+        self.flush()
         self.columns.update(columns)
 
         # IF THIS IS UPDATED PLEASE UPDATE addColumn()
@@ -127,12 +166,13 @@ class tableView():
         self.data_schema = self.data_schema.add_columns(s_cols)
 
     def _remove_meta(self, columns:list):
+        self.flush()
         for col in columns:
             del self.columns[col]
         self.data_schema.remove_columns(columns)
         raise NotImplementedError("NEED TO ACTUALLY REMOVE DATAFRAME COLUMNS")
 
-    def _merge_validated(self, candidate: pd.DataFrame):
+    def _merge_validated(self, candidate: pd.DataFrame, lazy:bool=False):
         """
         Internal method:
         - Validates candidate dataframe against schema.
@@ -142,11 +182,13 @@ class tableView():
         # by taking the correct dataframe template from self.data
         # instead moved this bit into addDataframe explicitly
 
-        # enforce schema
-        candidate = self.data_schema.validate(candidate)
+        # enforce schema, the validators work on the Python values whatever the storage
+        if (candidate.dtypes != object).any():
+            candidate = candidate.astype(object)
+        candidate = self.data_schema.validate(candidate, lazy=lazy)
        
         # reorder candidate columns to match self.data
-        candidate = candidate[self.data.columns]
+        candidate = self._to_storage(candidate[self.data.columns])
 
         # updates: overlap in index
         updates = candidate.loc[candidate.index.isin(self.data.index)]
@@ -164,6 +206,7 @@ class tableView():
         """
         Add dataframe to current data
         """
+        self.flush()
         
         # set index if needed
         if name := self._index_col:
@@ -174,9 +217,9 @@ class tableView():
 
         # ensure incoming dataframe has correct columns
         extra = df.columns.difference(self.data.columns)
-        if extra:
+        if not extra.empty:
             # add more helpful check to see if its an incorrect column or one that needs to be added
-            raise ValueError(f"Column mismatch between given dataframe and existing dataframe. Please first addColumn to resolve.\nCurrent columns are:{self.cur_cols}")
+            raise ValueError(f"Column mismatch between given dataframe and existing dataframe. Please first addColumn to resolve.\nCurrent columns are:{self.data.columns.to_list()}")
 
         missing_cols = self.data.columns.difference(df.columns)
         na_values = [pd.NA] * len(df)
@@ -190,7 +233,10 @@ class tableView():
         Add a single row, (with values if specified, defaults to NA)
         pk: primary key value for the new row. If the dataframe uses a RangeIndex, this can be left as None.
             i.e. for participants.tsv, where participantID is the primary key, this should be the value of that participantID whose values you want to add
+
+        Each call validates and merges the row on its own, use appendRow to add many rows
         """
+        self.flush()
         if type(self.data.index) != pd.RangeIndex:
             if pk is None:
                 raise ValueError(f"for dataframe with primary key index {self.data.index}, you must provide a primary key when using addRow")
@@ -218,15 +264,86 @@ class tableView():
 
         return self._merge_validated(df)
 
+    def appendRow(self, pk:Any=None, values: Union[dict, list]=None):
+        """
+        Buffer a row, same arguments as addRow. Buffered rows are validated and merged together by flush(),
+        which happens before any other change to the table and before it is written.
+        """
+        if type(self.data.index) != pd.RangeIndex:
+            if pk is None:
+                raise ValueError(f"for dataframe with primary key index {self.data.index}, you must provide a primary key when using appendRow")
+        else:
+            pk = len(self.data) + len(self._pending) + 1
+
+        columns = self.data.columns
+        if isinstance(values, dict):
+            for key in values.keys():
+                if key not in columns:
+                    raise KeyError(f"Column {key} not found in dataframe columns {columns.tolist()}")
+            row = dict(values)
+            if self._index_col is not None:
+                row[self._index_col] = pk
+        elif isinstance(values, list):
+            if len(values) + 1 != len(columns):
+                raise ValueError(f"values length {len(values) + 1} does not match number of columns {len(columns)}\nIf you want to specify fewer columns, use a dict and specify which columns data belongs to")
+            row = dict(zip(columns, [pk] + values))
+        elif values is None:
+            row = {columns[0]: pk}
+        else:
+            raise TypeError(f"values must be a dict or list, got {type(values)}")
+
+        self._pending.append((pk, row))
+        self._pending_keys.add(pk)
+        return self
+
+    def flush(self):
+        """
+        Validate and merge the rows buffered by appendRow in a single pass.
+
+        Valid rows are always merged. If some rows fail, they are left out and raised as an ExceptionGroup, with the
+        same error addRow would have raised for each of them
+        """
+        if not self._pending:
+            return self
+
+        pks, rows = zip(*self._pending)
+        self._pending = []
+        self._pending_keys = set()
+
+        index = pd.Index(pks, name=self.data.index.name)
+        candidate = pd.DataFrame(list(rows), columns=self.data.columns, index=index, dtype=object)
+        candidate = candidate[~candidate.index.duplicated(keep="last")] # as with addRow, the last values for a key win
+
+        try:
+            return self._merge_validated(candidate, lazy=True)
+        except pa.errors.SchemaErrors as e:
+            bad_rows = e.failure_cases["index"]
+            if bad_rows.isna().any(): # a failure which isn't down to a row, i.e. a missing column
+                raise
+
+            bad = candidate.index.isin(bad_rows)
+            if not bad.all():
+                self._merge_validated(candidate.loc[~bad])
+
+            errors = []
+            for pk in candidate.index[bad]:
+                try:
+                    self.data_schema.validate(candidate.loc[[pk]])
+                except pa.errors.SchemaError as row_error:
+                    row_error.add_note(f"while adding row {pk}")
+                    errors.append(row_error)
+            raise ExceptionGroup(f"{bad.sum()} of {len(candidate)} appended rows failed validation and were not added", errors) from None
+
     def addValues(self, pk, values: dict):
         """
         Update values for a given primary key.
         """
+        self.flush()
         if pk not in self.data.index:
             raise KeyError(f"Primary key {pk} not found.")
 
         values[self._index_col] = pk
-        candidate = self.data.loc[[pk]].copy()
+        candidate = self.data.loc[[pk]].astype(object)
         for col, val in values.items():
             candidate.at[pk, col] = val
 
@@ -237,6 +354,7 @@ class tableView():
         Remove a row by primary key.
         No validation is performed.
         """
+        self.flush()
         if pk not in self.data.index:
             raise KeyError(f"Primary key {pk} not found.")
         self.data.drop(pk, inplace=True)
@@ -247,6 +365,7 @@ class tableView():
         Set specified columns in a row to NA/null.
         No validation is performed (handled downstream).
         """
+        self.flush()
         if pk not in self.data.index:
             raise KeyError(f"Primary key {pk} not found.")
 
@@ -261,6 +380,7 @@ class tableView():
 
     def addColumn(self, columnName:str, schema:Union[Column, dict]=None):
      
+        self.flush()
         if self.additional_columns_flag == NOT_ALLOWED:
             raise TypeError(f"Tabular file {self} does not allow adding columns")
         elif self.additional_columns_flag == ALLOWED_IF_DEFINED and columnName not in self.columns:
@@ -273,56 +393,98 @@ class tableView():
                 s_cols = self._create_col_schema({columnName:schema})
                 self.data_schema = self.data_schema.add_columns(s_cols)
 
-        self.data[columnName] = pd.Series([pd.NA] * len(self.data), dtype=object) 
+        dtype = self._column_dtype(columnName, schema if isinstance(schema, UserDefinedColumn) else None)
+        self.data[columnName] = pd.Series(pd.NA, index=self.data.index, dtype=dtype)
 
     def isRow(self, pk:Any) -> bool:
-        return pk in self.data.index
-
-def stringify_all(orig_df:pd.DataFrame, cols:dict[str, Column]):
-    def stringify_lists(cell, delimiter:str):
-        """Convert lists into strings using column-specific delimiter."""
-        if isinstance(cell, list):
-            stringified = delimiter.join(map(str, cell))
-            return f"[{stringified}]" 
-        return cell
-
-    df = orig_df.copy()
-    for col in df.columns:
-        cur_col = cols.get(col)
-        cur_delim = cur_col.Delimiter
-        if cur_delim is not None:
-            df[col] = df[col].apply(lambda x: stringify_lists(x, cur_delim))
-    
-    return df
+        return pk in self.data.index or pk in self._pending_keys
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """
+        header of the columns whose key isn't their name in the file, columns are keyed by their schema object
+        (i.e. name__channels) but written by name (name)
+        """
+        ret = {}
+        for key, col in self.columns.items():
+            if isinstance(col, Column) and (name := col.str_name) != key:
+                ret[key] = name
+        return ret
+
+    @property
+    def delimiters(self) -> dict[str, str]:
+        """delimiter of the list values of each column, for the columns which define one"""
+        ret = {}
+        for key, col in self.columns.items():
+            delim = col.Delimiter
+            delim = getattr(delim, "val", delim) # user defined columns keep it as Metadata
+            if delim is not None:
+                ret[key] = delim
+        return ret
 
 @define(slots=True)
 class tabularFile(DatasetCore):
     
     _schema:ClassVar['Namespace']
+    _schema_checker:ClassVar[type[schema_checker]] = schema_checker
+    _track_dirty:ClassVar[bool] = False # the dataframe can be edited in place, so always compare the written bytes
+    default_storage:ClassVar[str] = OBJECT_STORAGE # storage of new tables, see column_storage
 
     _n_schema_true:int = field(init=False, default=0) #number of times schema has been applied
-    data:Union[None, tableView] = field(init=False, default=None)
+    _data:Union[None, tableView] = field(init=False, default=None, alias="_data")
     _cur_labels:set = field(init=False, factory=set)
+    _source:Union[str, None] = field(init=False, default=None, repr=False) # file on disk not loaded yet, see BidsDataset(lazy=True)
 
     columns:ClassVar[MinimalDict[str, Column]] = HookedDescriptor(columnView,factory=make_column_view,tags="columns")
 
-    def _make_file(self, force:bool):
-        final_data = stringify_all(self.data.data, self.data.columns)
+    def _make_file(self, force:bool, manifest:Union['buildManifest', None]=None):
         """UserDefinedLists have specified delimiters, as such need to convert the lists to strings
         with the delimiter implemented, so that then the correct delimiter in the sublists is used"""
-        _write_tsv(self._tree_link.path, final_data, force)
+        if self._source is not None: # never accessed, the file on disk is kept as it is
+            _copy_source(self, self._source, force)
+            return
+        self.data.flush()
+        _write_tsv(self._tree_link.path, self.data.data, force, manifest, delimiters=self.data.delimiters, headers=self.data.headers)
+
+    @property
+    def data(self) -> Union[None, tableView]:
+        if self._source is not None: # first access of a lazily read file
+            self._load_source()
+        return self._data
+
+    @data.setter
+    def data(self, value:Union[None, tableView]):
+        self._data = value
+
+    def _load_rows(self, df:pd.DataFrame):
+        """add the rows read from a file, with the columns the schema doesn't define added as user defined ones"""
+        if keys := {name: key for key, name in self._data.headers.items()}: # headers are the names, see tableView.headers
+            df = df.rename(columns=keys)
+        for col in df.columns:
+            if col not in self._data.data.columns:
+                self._data.addColumn(col)
+            if (column := self._data.columns.get(col)) is not None: # read as text, typed by its schema
+                df[col] = parse_text(df[col], column.value_type)
+        self._data.addDataframe(df)
+
+    def _load_source(self):
+        path, self._source = self._source, None
+        self._load_rows(_read_tsv(path))
 
     def _check_schema(self, add_callbacks:bool=False, tags:Union[list,str] = None):
 
         for flag, label, items in check_schema(self, self._schema, self._cur_labels, add_callbacks, tags):
-            if flag == "add":
-                self._cur_labels.add(label)
-                self._add_metadata_(items)
-            elif flag == "del":
-                self._cur_labels.remove(label)
-                self._remove_metadata_(items)
-            else:
-                raise RuntimeError(f"unknown flag: {flag} given in {self}._check_schema")
+            self._apply_schema_change(flag, label, items)
+
+    def _apply_schema_change(self, flag:str, label:str, items:'Namespace'):
+        if flag == "add":
+            self._cur_labels.add(label)
+            self._add_metadata_(items)
+        elif flag == "del":
+            self._cur_labels.remove(label)
+            self._remove_metadata_(items)
+        else:
+            raise RuntimeError(f"unknown flag: {flag} given in {self}._check_schema")
    
     def _add_metadata_(self, items:'Namespace'):
         
@@ -333,9 +495,10 @@ class tabularFile(DatasetCore):
             if isinstance(columns[key], str): # the value is a requirement
                 processed_cols[key] = Column(key, columns[key])
             else:
-                level = columns[key].pop("level")
+                override = dict(columns[key].items()) # copy, the rule is shared by the cached schema
+                level = override.pop("level")
                 met_instance = Column(key, level)
-                Column._override[met_instance] = columns[key]
+                Column._override[met_instance] = override
                 processed_cols[key] = met_instance
 
         # get other metadata
@@ -355,17 +518,17 @@ class tabularFile(DatasetCore):
         if self._n_schema_true > 1:
             if (initial_columns is not None) or (index_columns is not None) or (additional_columns_flag != "n/a"): # check for added columns              
                 raise RuntimeError(f"{self.__class__.__name__} cannot support the additional given tsv at the moment, please report this error with associated context to reproduce")
-            self.data._update_meta(processed_cols)
+            self._data._update_meta(processed_cols)
         else:
-            self.data = tableView._create(processed_cols, additional_columns_flag, initial_columns, index_columns)
+            self._data = tableView._create(processed_cols, additional_columns_flag, initial_columns, index_columns, self.default_storage)
 
     def _remove_metadata_(self, items:'Namespace'):
         self._n_schema_true -= 1
         if self._n_schema_true == 0:
-            self.data = None
+            self._data = None
         else:
             keys = items.get("columns").keys()
-            self.data._remove_meta(items.get("columns"))
+            self._data._remove_meta(items.get("columns"))
 
     @property
     def json_sidecar(self):
@@ -377,6 +540,12 @@ class tabularFile(DatasetCore):
     def addRow(self, pk:Any=None, values: dict[Any, Any]=None):
         return self.data.addRow(pk, values)
 
+    def appendRow(self, pk:Any=None, values: dict[Any, Any]=None):
+        return self.data.appendRow(pk, values)
+
+    def flush(self):
+        return self.data.flush()
+
     def addValues(self, pk:Any, values: dict):
         return self.data.addValues(pk, values)        
 
@@ -392,10 +561,13 @@ class tabularFile(DatasetCore):
     def isRow(self, pk:Any) -> bool:
         return self.data.isRow(pk)
 
+    def set_storage(self, storage:str):
+        return self.data.set_storage(storage)
+
 class tabularJSONFile(DatasetCore):
     def _check_schema(self, *args, **kwargs):...
 
-    def _make_file(self, force):...
+    def _make_file(self, force, manifest=None):...
     pass
 
 def _set_tabular_schema(schema:'Namespace'):
@@ -4,12 +4,17 @@ import re
 import pandas as pd
 
 from attrs import define, field
-from typing import Union, ClassVar, TYPE_CHECKING, Any
+from typing import Union, ClassVar, TYPE_CHECKING, Any, Callable
 from functools import lru_cache
+import weakref
 from weakref import WeakKeyDictionary
 from abc import ABC, abstractmethod
 from bidsschematools.types.namespace import Namespace
 
+from .validators import compile_rules, compile_user_column, validate_series, compile_value_rules, compile_entity_rules, valueValidator, VALID_TYPES
+from .column_storage import rules_dtype, user_column_dtype
+from ..util.regex_cache import compile_pattern
+
 
 """
 need to be able to overwrite certain values, like the format, enum etc... 
@@ -116,10 +121,12 @@ class nameValueBase(ValueBase):
 
     """
     _override: ClassVar[WeakKeyDictionary] = WeakKeyDictionary()
+    _compiled_validators: ClassVar[dict[tuple, valueValidator]] = {} # shared by every instance with the same name and override
 
     # ---- instance fields ----
     _val:str = field(init=False, default=None, repr=True, alias="_val") 
     level:str = field(repr=True)
+    _validator:valueValidator = field(init=False, default=None, repr=False, eq=False, alias="_validator")
 
     def __attrs_post_init__(self):
         super().__attrs_post_init__()
@@ -133,13 +140,7 @@ class nameValueBase(ValueBase):
         if value not in level_types:
             raise ValueError(f"Value must be one of: {level_types}")
 
-    valid_types:ClassVar = {
-        "integer":int,
-        "string":str,
-        "number":(float, int),
-        "array":list,
-        "object":dict,
-    }
+    valid_types:ClassVar = VALID_TYPES
 
     @classmethod
     def _check_type(cls, inp_type:str, val:Any) -> bool:
@@ -156,6 +157,30 @@ class nameValueBase(ValueBase):
     def val(self):
         """Public getter for the entity value."""
         return self._val
+
+    def _rules(self) -> dict:
+        """rules of the object with its overrides applied, without touching the cached schema object"""
+        rules = dict(self._cached_fetch_object(self._name).items())
+        rules.update(self._override.get(self, {}))
+        return rules
+
+    @classmethod
+    def _compile_value_rules(cls, rules:dict) -> Callable[[Any], bool]:
+        return compile_value_rules(rules, formats.get_pattern)
+
+    def _value_validator(self) -> valueValidator:
+        """compiled rules of this object, looked up once per instance and compiled once per (name, override)"""
+        validator = self._validator
+        if validator is None or validator.name != self._name:
+            override = self._override.get(self, {})
+            key = (type(self), self._name, _freeze(override))
+            validator = self._compiled_validators.get(key)
+            if validator is None:
+                rules = self._rules()
+                validator = valueValidator(self._name, rules, self._compile_value_rules(rules))
+                self._compiled_validators[key] = validator
+            self._validator = validator
+        return validator
     
     @staticmethod
     def _validate_number(is_correct:bool, new_val:Union[float, int], rules:'Namespace', error_msg:str) -> tuple[bool, str]:
@@ -297,17 +322,13 @@ class nameValueBase(ValueBase):
             AssertionError: If the value is not among allowed enum values
             RuntimeError: If the entity format is not index or label
         """
-        info = self._cached_fetch_object(self._name)
-        cur_overrides = self._override.get(self, {})
-        info.update(cur_overrides)
-
-        orig_msg = f"Value: {new_val} for {self.name} is not valid:\n"
-        is_correct, error_msg = self._validate_new_val(new_val, info, orig_msg)
-
-        if not is_correct:
+        validator = self._value_validator()
+        if not validator(new_val):
+            orig_msg = f"Value: {new_val} for {self.name} is not valid:\n"
+            is_correct, error_msg = self._validate_new_val(new_val, validator.rules, orig_msg)
             raise ValueError(error_msg)
-        else:
-            self._val = new_val
+
+        self._val = new_val
 
     def __getitem__(self, key):
         assert isinstance(self._val, dict)
@@ -343,6 +364,14 @@ class nameValueBase(ValueBase):
                 
             raise ValueError(f"Val: {val} is not a valid value for {cls.__name__}")
 
+def _freeze(obj:Any) -> Any:
+    """hashable copy of an override, to key the compiled validators on"""
+    if isinstance(obj, (dict, Namespace)):
+        return tuple(sorted((key, _freeze(val)) for key, val in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(val) for val in obj)
+    return obj
+
 @define(slots=True)
 class formats():
     schema:ClassVar['Namespace']
@@ -363,7 +392,7 @@ class formats():
         """
         try:
             pattern_info = cls.schema.get(key)
-            pattern = re.compile(pattern_info.pattern)
+            pattern = compile_pattern(pattern_info.pattern)
         except KeyError as e:
             raise e
 
@@ -376,7 +405,7 @@ class formats():
 
     @classmethod
     def validate_pattern(cls, inp_pattern:str, val:str) -> bool:
-        pattern = re.compile(inp_pattern)
+        pattern = compile_pattern(inp_pattern)
         return bool(pattern.fullmatch(str(val)))
 
 @define(slots=True, weakref_slot=True, hash=True)
@@ -395,18 +424,21 @@ class Entity(nameValueBase):
             AssertionError: If the value is not among allowed enum values
             RuntimeError: If the entity format is not index or label
         """
-        info = self._cached_fetch_object(self._name)
-        cur_overrides = self._override.get(self, {})
-        info.update(cur_overrides)
-
-        if not formats.check_pattern(info['format'], new_val):
-            raise ValueError(f"val: {new_val} is not of required format: {info.format}")
-       
-        if enums := info.get("enum", None):
+        validator = self._value_validator()
+        if not validator(new_val):
+            info = validator.rules
+            if not formats.check_pattern(info['format'], new_val):
+                raise ValueError(f"val: {new_val} is not of required format: {info['format']}")
+
+            enums = info.get("enum", None)
             assert new_val in enums, f"val for {self} must be one of {enums} not {new_val}"
 
         self._val = new_val
 
+    @classmethod
+    def _compile_value_rules(cls, rules:dict) -> Callable[[Any], bool]:
+        return compile_entity_rules(rules, formats.get_pattern)
+
 @define(slots=True, weakref_slot=True, hash=True)
 class Metadata(nameValueBase):
     """Metadata is quite unique, mainly due to the 'items'/'properties' attribute 
@@ -414,15 +446,16 @@ class Metadata(nameValueBase):
     This basically allows for the value of one metadata field, to be an array, or dictionary of other metadata fields
 
     """
-    """
+    # the JSON file holding this field, set by JSONfile when the field is added. Values can be set on the field directly
+    # (json.metadata[key].val = x), so the field flags its file as changed rather than relying on the file's hooks
+    _owner:Union[weakref.ref, None] = field(init=False, default=None, repr=False, eq=False, alias="_owner")
+
     @nameValueBase.val.setter
     def val(self, new_val):
-        self._val = new_val
+        nameValueBase.val.fset(self, new_val)
+        if self._owner is not None and (owner := self._owner()) is not None:
+            owner._mark_dirty_()
 
-        info:'Namespace' = self._cached_fetch_object(self._name)
-        cur_overrides = self._override.get(self, {})
-        info.update(cur_overrides)
-    """
     @classmethod
     @lru_cache(maxsize=256) # many different values so allow for larger cache for this
     def _cached_fetch_object(cls, name: str) -> 'Namespace':
@@ -440,13 +473,26 @@ class ColumnInterface(ABC):
     """
 
     def vectorized_val_checker(self, series: pd.Series) -> pd.Series:
-        """Apply self.val_checker() to each value in a Series and return a boolean Series."""
-        results = [self.val_checker(val) for val in series]
-        return pd.Series(results, index=series.index, dtype=bool)
+        """Check every value of a Series at once, same result as self.val_checker() per value, as a boolean Series."""
+        if self._series_validator is None:
+            self._series_validator = self._compile_series_validator()
+        return validate_series(self._series_validator, series)
+
+    @abstractmethod
+    def _compile_series_validator(self) -> Callable[[pd.Series], 'np.ndarray']: ...
 
     @abstractmethod
     def val_checker(self, new_val:any) -> bool: ...
 
+    @abstractmethod
+    def storage_dtype(self, storage:str) -> Any:
+        """dtype to hold this column in for the given tableView storage, see column_storage"""
+
+    @property
+    @abstractmethod
+    def value_type(self) -> Union[str, None]:
+        """schema type of the values (or Format of a definition), i.e. "number", None if it isn't given"""
+
     @property
     @abstractmethod
     def Delimiter(self) -> str: ...
@@ -480,6 +526,8 @@ class UserDefinedColumn(ColumnInterface):
     Maximum:Metadata =     field(repr=True)
     Minimum:Metadata =     field(repr=True)
 
+    _series_validator:Callable = field(init=False, default=None, repr=False, eq=False) # compiled on first use
+
     @classmethod
     def create(cls, name:str,
                LongName:str=None,
@@ -525,6 +573,22 @@ class UserDefinedColumn(ColumnInterface):
                Maximum=Maximum,
                Minimum=Minimum)
 
+    def _compile_series_validator(self) -> Callable:
+        return compile_user_column(
+            format_pattern=formats.get_pattern(self.Format.val) if self.Format else None,
+            levels=self.Levels.val if self.Levels else None,
+            delimited=bool(self.Delimiter),
+            maximum=self.Maximum.val if self.Maximum else None,
+            minimum=self.Minimum.val if self.Minimum else None,
+        )
+
+    def storage_dtype(self, storage:str) -> Any:
+        return user_column_dtype(self.Levels.val if self.Levels else None, bool(self.Delimiter), storage)
+
+    @property
+    def value_type(self) -> Union[str, None]:
+        return self.Format.val if self.Format else None
+
     def val_checker(self, new_val:Any) -> bool:
         def check_max(max, val) -> bool:
             if val > max:
@@ -579,28 +643,38 @@ class Column(nameValueBase, ColumnInterface):
     
     _has_definition:bool = field(repr=False, default=False, init=False, alias="_has_definition")
     _definition_obj:UserDefinedColumn = field(repr=False, default=None, init=False, alias="_definition_obj")
+    _series_validator:Callable = field(init=False, default=None, repr=False, eq=False) # compiled on first use
 
     def __attrs_post_init__(self):
         super().__attrs_post_init__()
-        info = self._cached_fetch_object(self._name)
-        cur_overrides = self._override.get(self, {})
-        info.update(cur_overrides)
+        info = self._rules()
         if definition := info.get("definition", False):
             self._has_definition = True
             self._definition_obj = UserDefinedColumn.create(self.name, **definition) # at the moment just a placeholder, will add functionality later
 
+    def _compile_series_validator(self) -> Callable:
+        if self._has_definition:
+            return self._definition_obj._compile_series_validator()
+
+        return compile_rules(self._rules(), formats.get_pattern)
+
+    def storage_dtype(self, storage:str) -> Any:
+        if self._has_definition:
+            return self._definition_obj.storage_dtype(storage)
+        return rules_dtype(self._rules(), storage)
+
+    @property
+    def value_type(self) -> Union[str, None]:
+        if self._has_definition:
+            return self._definition_obj.value_type
+        return self._rules().get("type", None)
+
     def val_checker(self, new_val:Any) -> bool:
         if self._has_definition:
             return self._definition_obj.val_checker(new_val)
 
         else:
-            info = self._cached_fetch_object(self._name)
-            cur_overrides = self._override.get(self, {})
-            info.update(cur_overrides)
-
-            orig_msg = f"Value: {new_val} for {self.name} is not valid:\n"
-            is_correct, error_msg = self._validate_new_val(new_val, info, orig_msg)
-            return is_correct
+            return self._value_validator()(new_val)
 
     @classmethod
     @lru_cache(maxsize=256) #many different values so allow for larger cache for this
@@ -642,6 +716,8 @@ def _set_object_schemas(schema:'Namespace'):
     Metadata.schema = schema.objects.metadata
     formats.schema = schema.objects.formats
     extensions.schema = schema.objects.extensions
+    raw_Datatype.schema = schema.objects.datatypes
+    nameValueBase._compiled_validators.clear()
 
     return
 
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import re
+import operator
+import numpy as np
+import pandas as pd
+
+from attrs import define, field
+from functools import partial
+from typing import Any, Callable, Mapping, Union
+
+from ..util.regex_cache import compile_pattern
+
+"""
+Column level validators, compiled once from the rules of a column and run over a whole Series at a time
+
+compile_rules follows nameValueBase._validate_new_val for the rules of schema.objects.columns (type, format, pattern,
+enum, minimum/maximum, min/maxItems, items and anyOf), compile_user_column follows UserDefinedColumn.val_checker.
+Rather than calling a checker per cell, each rule becomes a single pandas/NumPy operation over the column:
+regexes through Series.str.fullmatch, enums and levels through isin, bounds as numeric comparisons.
+
+A validator takes a Series and returns a boolean array with one entry per value, positionally.
+"""
+
+VALID_TYPES:dict[str, Union[type, tuple[type, ...]]] = {
+    "integer":int,
+    "string":str,
+    "number":(float, int),
+    "array":list,
+    "object":dict,
+}
+
+seriesValidator = Callable[[pd.Series], np.ndarray]
+
+def _positional(values:pd.Series) -> pd.Series:
+    return pd.Series(values.to_numpy(dtype=object), dtype=object)
+
+def _subset(values:pd.Series, mask:np.ndarray) -> pd.Series:
+    return values[mask].reset_index(drop=True)
+
+def _type_mask(cor_type:Union[type, tuple], values:pd.Series) -> np.ndarray:
+    """isinstance(value, cor_type) for every value, only calling isinstance once per distinct type"""
+    types = values.map(type)
+    is_type = {t: issubclass(t, cor_type) for t in types.unique()}
+    return types.map(is_type).to_numpy(dtype=bool)
+
+def _fullmatch(pattern:re.Pattern, values:pd.Series) -> np.ndarray:
+    return values.astype(str).str.fullmatch(pattern).to_numpy(dtype=bool)
+
+def _isin(allowed:list, values:pd.Series) -> np.ndarray:
+    return values.isin(allowed).to_numpy(dtype=bool)
+
+def _numeric(values:pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float) # anything non numeric compares as False
+
+def _compare(op:Callable, bound:Any, values:pd.Series) -> np.ndarray:
+    return op(_numeric(values), bound)
+
+def _lengths(values:pd.Series) -> np.ndarray:
+    """len of each value, NaN for values without one"""
+    return pd.to_numeric(values.str.len(), errors="coerce").to_numpy(dtype=float)
+
+def _n_items(op:Callable, bound:int, values:pd.Series) -> np.ndarray:
+    return op(_lengths(values), bound)
+
+def _all_items(item_check:seriesValidator, values:pd.Series) -> np.ndarray:
+    """item_check holds for every item of the list values, lists are flattened so it runs once"""
+    exploded = values.explode() # keeps the positional index of each list, [] becomes a single NaN
+    items_ok = pd.Series(item_check(exploded.reset_index(drop=True)), index=exploded.index)
+    ok = items_ok.groupby(level=0).all().to_numpy(dtype=bool)
+    ok[_type_mask(list, values) & (_lengths(values) == 0)] = True
+    return ok
+
+def _run_all(checks:list[seriesValidator], values:pd.Series) -> np.ndarray:
+    ok = np.ones(len(values), dtype=bool)
+    for check in checks:
+        ok &= check(values)
+    return ok
+
+def compile_rules(rules:Mapping, format_pattern:Callable[[str], re.Pattern]) -> seriesValidator:
+    """
+    compile the rules of a column (schema.objects.columns[name], with any overrides) into a validator.
+    format_pattern gives the compiled regex of a schema format, i.e. formats.get_pattern
+    """
+    if (all_rules := rules.get("anyOf", False)):
+        any_of = [compile_rules(ruleset, format_pattern) for ruleset in all_rules]
+        return partial(_check_any_of, any_of)
+
+    checks:list[seriesValidator] = []
+    if (c_format := rules.get("format", False)):
+        checks.append(partial(_fullmatch, format_pattern(c_format)))
+
+    if (c_pattern := rules.get("pattern", False)):
+        checks.append(partial(_fullmatch, compile_pattern(c_pattern)))
+
+    if not (c_type := rules.get("type", False)):
+        raise RuntimeError(f"No type for column rules: {rules}")
+    cor_type = VALID_TYPES.get(c_type)
+    if cor_type is None:
+        raise RuntimeError(f"given type: {c_type} is not supported. Valid types include: {VALID_TYPES.keys()}")
+
+    # mirrors the rules.get(key, False) lookups of nameValueBase, a bound of 0 is ignored there too
+    typed_checks:list[seriesValidator] = []
+    if c_type in ("integer", "number"):
+        if (c_max := rules.get("maximum", False)):
+            typed_checks.append(partial(_compare, np.less_equal, c_max))
+        if (c_min := rules.get("minimum", False)):
+            typed_checks.append(partial(_compare, np.greater_equal, c_min))
+        if (c_min := rules.get("exclusiveMinimum", False)):
+            typed_checks.append(partial(_compare, np.greater, c_min))
+    elif c_type == "string":
+        if (enums := rules.get("enum", None)):
+            typed_checks.append(partial(_isin, list(enums)))
+    elif c_type == "array":
+        if (c_max := rules.get("maxItems", False)):
+            typed_checks.append(partial(_n_items, np.less_equal, c_max))
+        if (c_min := rules.get("minItems", False)):
+            typed_checks.append(partial(_n_items, np.greater_equal, c_min))
+        if (item_rules := rules.get("items", False)):
+            typed_checks.append(partial(_all_items, compile_rules(item_rules, format_pattern)))
+
+    return partial(_check_rules, checks, cor_type, typed_checks)
+
+def _check_rules(checks:list[seriesValidator], cor_type:Union[type, tuple], typed_checks:list[seriesValidator], values:pd.Series) -> np.ndarray:
+    ok = _run_all(checks, values)
+    is_type = _type_mask(cor_type, values)
+    ok &= is_type
+
+    # type specific rules only see values of the right type, as the scalar checker returns early on a wrong type
+    if typed_checks and is_type.any():
+        ok[is_type] &= _run_all(typed_checks, _subset(values, is_type))
+    return ok
+
+def _check_any_of(any_of:list[seriesValidator], values:pd.Series) -> np.ndarray:
+    ok = np.zeros(len(values), dtype=bool)
+    for check in any_of:
+        todo = ~ok
+        if not todo.any():
+            break
+        ok[todo] = check(_subset(values, todo))
+    return ok
+
+def compile_user_column(format_pattern:Union[re.Pattern, None]=None, levels:Union[Mapping, None]=None, delimited:bool=False,
+                        maximum:Any=None, minimum:Any=None) -> seriesValidator:
+    """
+    compile the rules of a UserDefinedColumn into a validator.
+    Like UserDefinedColumn.val_checker, with a delimiter every value must be a list, and the bounds apply to each item of lists
+    """
+    checks:list[seriesValidator] = []
+    if format_pattern is not None:
+        checks.append(partial(_fullmatch, format_pattern))
+    if levels is not None:
+        checks.append(partial(_isin_levels, [key for key, description in levels.items() if description]))
+    if delimited:
+        checks.append(partial(_type_mask, list))
+
+    bounds:list[seriesValidator] = []
+    if maximum is not None:
+        bounds.append(partial(_compare, np.less_equal, maximum))
+    if minimum is not None:
+        bounds.append(partial(_compare, np.greater_equal, minimum))
+    if bounds:
+        checks.append(partial(_check_bounds, bounds))
+
+    return partial(_run_all, checks)
+
+def _isin_levels(levels:list, values:pd.Series) -> np.ndarray:
+    ok = np.zeros(len(values), dtype=bool)
+    is_list = _type_mask(list, values) # lists aren't hashable, so never a level
+    ok[~is_list] = _isin(levels, _subset(values, ~is_list))
+    return ok
+
+def _check_bounds(bounds:list[seriesValidator], values:pd.Series) -> np.ndarray:
+    if _type_mask(list, values).any():
+        return _all_items(partial(_run_all, bounds), values)
+    return _run_all(bounds, values)
+
+def validate_series(validator:seriesValidator, series:pd.Series) -> pd.Series:
+    """run a compiled validator over series, returning a boolean Series with the same index"""
+    return pd.Series(validator(_positional(series)), index=series.index, dtype=bool)
+
+"""
+Single value validators, the scalar counterpart of compile_rules used by the nameValueBase.val setter.
+
+The rules are resolved once into a tree of partials, anyOf flattened and the type check bound to its Python type,
+so setting a value only runs the checks that apply to it. They only answer whether a value is valid, the error
+message is built afterwards, by interpreting the rules in nameValueBase._validate_new_val, for the values which aren't.
+"""
+
+valueCheck = Callable[[Any], bool]
+
+@define(slots=True, frozen=True)
+class valueValidator():
+    """compiled rules of one (object name, override) pair, keeping the rules they were compiled from for error messages"""
+    name:str
+    rules:Mapping = field(repr=False)
+    check:valueCheck = field(repr=False)
+
+    def __call__(self, value:Any) -> bool:
+        return self.check(value)
+
+def _raise(error:Exception, value:Any) -> bool:
+    raise error
+
+def _value_any_of(any_of:tuple[valueCheck, ...], value:Any) -> bool:
+    return any(check(value) for check in any_of)
+
+def _value_fullmatch(pattern:re.Pattern, value:Any) -> bool:
+    return pattern.fullmatch(str(value)) is not None
+
+def _value_compare(op:Callable, bound:Any, value:Any) -> bool:
+    return op(value, bound)
+
+def _value_n_items(op:Callable, bound:int, value:list) -> bool:
+    return op(len(value), bound)
+
+def _value_in(allowed:Any, value:Any) -> bool:
+    return value in allowed
+
+def _value_all_items(item_check:valueCheck, value:list) -> bool:
+    return all([item_check(item) for item in value]) # every item is checked, as _validate_array does
+
+def _value_check_rules(checks:tuple[valueCheck, ...], cor_type:Union[type, tuple], typed_checks:tuple[valueCheck, ...], value:Any) -> bool:
+    for check in checks:
+        if not check(value):
+            return False
+    if not isinstance(value, cor_type):
+        return False
+    for check in typed_checks:
+        if not check(value):
+            return False
+    return True
+
+def _flatten_any_of(rules:Mapping) -> list[Mapping]:
+    flat = []
+    for ruleset in rules["anyOf"]:
+        if ruleset.get("anyOf", False):
+            flat.extend(_flatten_any_of(ruleset))
+        else:
+            flat.append(ruleset)
+    return flat
+
+def compile_value_rules(rules:Mapping, format_pattern:Callable[[str], re.Pattern]) -> valueCheck:
+    """
+    compile the rules of a single value (schema.objects.<kind>[name], with any overrides) into a check returning whether
+    the value is valid, with the same result as nameValueBase._validate_new_val
+    """
+    if rules.get("anyOf", False):
+        any_of = tuple(compile_value_rules(ruleset, format_pattern) for ruleset in _flatten_any_of(rules))
+        return partial(_value_any_of, any_of)
+
+    checks:list[valueCheck] = []
+    if (c_format := rules.get("format", False)):
+        checks.append(partial(_value_fullmatch, format_pattern(c_format)))
+
+    if (c_pattern := rules.get("pattern", False)):
+        checks.append(partial(_value_fullmatch, compile_pattern(c_pattern)))
+
+    # errors are only raised once a value reaches these rules, as when interpreting them
+    if not (c_type := rules.get("type", False)):
+        return partial(_raise, RuntimeError(f"No type for rules: {rules}"))
+    cor_type = VALID_TYPES.get(c_type)
+    if cor_type is None:
+        return partial(_raise, RuntimeError(f"given type: {c_type} is not supported. Valid types include: {VALID_TYPES.keys()}"))
+
+    typed_checks:list[valueCheck] = []
+    if c_type in ("integer", "number"):
+        if (c_max := rules.get("maximum", False)):
+            typed_checks.append(partial(_value_compare, operator.le, c_max))
+        if (c_min := rules.get("minimum", False)):
+            typed_checks.append(partial(_value_compare, operator.ge, c_min))
+        if (c_min := rules.get("exclusiveMinimum", False)):
+            typed_checks.append(partial(_value_compare, operator.gt, c_min))
+    elif c_type == "string":
+        if (enums := rules.get("enum", None)):
+            typed_checks.append(partial(_value_in, frozenset(enums)))
+    elif c_type == "array":
+        if (c_max := rules.get("maxItems", False)):
+            typed_checks.append(partial(_value_n_items, operator.le, c_max))
+        if (c_min := rules.get("minItems", False)):
+            typed_checks.append(partial(_value_n_items, operator.ge, c_min))
+        if (item_rules := rules.get("items", False)):
+            typed_checks.append(partial(_value_all_items, compile_value_rules(item_rules, format_pattern)))
+
+    return partial(_value_check_rules, tuple(checks), cor_type, tuple(typed_checks))
+
+def compile_entity_rules(rules:Mapping, format_pattern:Callable[[str], re.Pattern]) -> valueCheck:
+    """entity values are only checked against their format and enum, see Entity.val"""
+    checks:list[valueCheck] = [partial(_value_fullmatch, format_pattern(rules["format"]))]
+    if (enums := rules.get("enum", None)):
+        checks.append(partial(_value_in, list(enums)))
+    return partial(_value_check_rules, tuple(checks), object, ())
+
+__all__ = ["compile_rules", "compile_user_column", "validate_series", "compile_value_rules", "compile_entity_rules",
+           "valueValidator", "VALID_TYPES"]
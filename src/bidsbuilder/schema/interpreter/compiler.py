@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import math
+import operator as op
+
+from itertools import count
+from typing import Any, Callable, TYPE_CHECKING
+
+from .operator_funcs import wrap_list
+
+if TYPE_CHECKING:
+    from .selectors import selectorFunc
+
+"""
+Compiles parsed selectorFunc trees into a single generated python function
+
+selectorFunc.__call__ walks the tree on every call, rebuilding argument lists and checking every argument's type.
+Instead the tree is emitted once as a python expression and compiled, so a selector becomes a single function call:
+
+    datatype == "eeg" && suffix == "channels"
+
+becomes
+
+    def _selector(core=None, add_callbacks=False):
+        return _f0((_f1(core, add_callbacks=add_callbacks) == 'eeg'), (_f2(core, add_callbacks=add_callbacks) == 'channels'))
+
+Semantics are kept identical to the interpreter:
+    - the logic operators still evaluate both sides (exists() may register callbacks on either side)
+    - checkNone wrapped functions are still called through their wrapper, so None propagates the same way
+    - functions which require the input core receive it positionally and add_callbacks as a keyword
+"""
+
+# operators which can be written inline without changing behaviour, none of them are wrapped by checkNone
+_BINARY_OPS = {
+    op.eq: "==",
+    op.ne: "!=",
+    op.lt: "<",
+    op.gt: ">",
+    op.le: "<=",
+    op.ge: ">=",
+    op.add: "+",
+    op.sub: "-",
+    op.mul: "*",
+    op.truediv: "/",
+}
+
+_UNARY_OPS = {
+    op.not_: "not ",
+    op.neg: "-",
+    op.pos: "+",
+}
+
+_LITERALS = (str, int, float, bool, type(None))
+
+class _emitter():
+    """Turns a selectorFunc tree into python source, binding any non literal values into a namespace"""
+
+    def __init__(self):
+        self.namespace: dict[str, Any] = {}
+        self._ids = count()
+
+    def bind(self, val:Any) -> str:
+        if isinstance(val, _LITERALS) and not (isinstance(val, float) and not math.isfinite(val)): # repr(inf) isn't python
+            return repr(val)
+        name = f"_f{next(self._ids)}"
+        self.namespace[name] = val
+        return name
+
+    def expr(self, node:Any) -> str:
+        from .selectors import selectorFunc
+
+        if not isinstance(node, selectorFunc): # raw arguments, i.e. the property name in get_property
+            return self.bind(node)
+        if not node.is_callable:
+            return self.bind(node.val)
+
+        args = [self.expr(arg) for arg in node.args]
+
+        if node.requires_input:
+            args.insert(0, "core")
+            args.append("add_callbacks=add_callbacks")
+            return f"{self.bind(node.val)}({', '.join(args)})"
+
+        if node.val in _BINARY_OPS and len(args) == 2:
+            return f"({args[0]} {_BINARY_OPS[node.val]} {args[1]})"
+        if node.val in _UNARY_OPS and len(args) == 1:
+            return f"({_UNARY_OPS[node.val]}{args[0]})"
+        if node.val is wrap_list:
+            return f"[{', '.join(args)}]"
+
+        return f"{self.bind(node.val)}({', '.join(args)})"
+
+def _build(source:str, namespace:dict, name:str, filename:str) -> Callable:
+    code = compile(source, filename, "exec")
+    exec(code, namespace)
+    func = namespace[name]
+    func.__source__ = source
+    return func
+
+def compile_selector(node:'selectorFunc') -> Callable:
+    """Compile a single selectorFunc tree into a function with signature (core=None, add_callbacks=False)"""
+    emitter = _emitter()
+    source = (
+        "def _selector(core=None, add_callbacks=False):\n"
+        f"    return {emitter.expr(node)}\n"
+    )
+    return _build(source, emitter.namespace, "_selector", "<selector>")
+
+def compile_hook(nodes:list['selectorFunc']) -> Callable:
+    """
+    Compile a list of selectorFunc trees into a single function which returns True only if all of them are truthy
+
+    short circuits in order, matching selectorHook.__call__
+    """
+    emitter = _emitter()
+    lines = ["def _selector_hook(core=None, add_callbacks=False):"]
+    for node in nodes:
+        lines.append(f"    if not {emitter.expr(node)}:")
+        lines.append("        return False")
+    lines.append("    return True\n")
+
+    return _build("\n".join(lines), emitter.namespace, "_selector_hook", "<selectorHook>")
+
+__all__ = ["compile_selector", "compile_hook"]
@@ -5,6 +5,7 @@ import numpy as np
 
 from typing import Any, Union
 from functools import wraps
+from ...util.regex_cache import compile_pattern
 from ...modules.core.dataset_tree import FileEntry
 from ...modules.core.dataset_core import DatasetCore
 
@@ -101,7 +102,11 @@ def intersects(a:list, b:list) -> Union[list, bool]:
     intersects(dataset.modalities, ["pet", "mri"])
 
     Non-empty array if either PET or MRI data is found in dataset, otherwise false
+
+    a single value is treated as an array of it, as the schema also uses intersects(datatype, [...])
     """
+    if isinstance(a, str):
+        a = [a]
     assert isinstance(a, list), f"a {a} is not of type list for function intersects"
     assert isinstance(b, list), f"b {b} is not of type list for function intersects"
 
@@ -153,7 +158,7 @@ def length(arg:list) -> int:
     return len(arg)
 
 @checkNone
-def nMatch(arg:str, pattern:str) -> bool:
+def nMatch(arg:str, pattern:Union[str, re.Pattern]) -> bool:
     """
     true if arg matches the regular expression pattern (anywhere in string)
 
@@ -163,9 +168,9 @@ def nMatch(arg:str, pattern:str) -> bool:
     """
 
     assert isinstance(arg, str), f"arg {arg} is not of type str for function match"
-    assert isinstance(pattern, str), f"pattern {pattern} is not of type str for function match"
+    assert isinstance(pattern, (str, re.Pattern)), f"pattern {pattern} is not of type str for function match"
 
-    return bool(re.search(pattern, arg))
+    return bool(compile_pattern(pattern).search(arg)) # static patterns are already compiled, see selectorFunc.evaluate_static_nodes
 
 @checkNone
 def max(arg:list) -> int:
@@ -25,24 +25,55 @@ def path(core:DatasetCore, add_callbacks:bool=False) -> str:
 def entities(core:DatasetCore, add_callbacks:bool=False):
     "no need to add callbacks, entitites get a default callback to update children"
     try:
-        return core._tree_link._name_link.all_entities
+        return core._tree_link._name_link.resolved_entities
     except AttributeError:
         return None
 
+def _composite_filename(core:DatasetCore):
+    """the CompositeFilename naming core, that of its collection for a file of one (named by its extension)"""
+    from ...modules.core.filenames import CompositeFilename
+    node = core._tree_link
+    if node is None:
+        return None
+    if isinstance(node._name_link, CompositeFilename):
+        return node._name_link
+    parent = node.parent
+    if parent is not None and not parent.is_dir and isinstance(parent._name_link, CompositeFilename):
+        return parent._name_link
+    return None
+
 def datatype(core:DatasetCore, add_callbacks:bool=False):
-    ...
+    "no need to add callbacks, datatype gets a default callback to update children"
+    filename = _composite_filename(core)
+    return None if filename is None else filename.resolved_datatype
 
 def suffix(core:DatasetCore, add_callbacks:bool=False):
-    ...
+    "no need to add callbacks, suffix gets a default callback to update children"
+    filename = _composite_filename(core)
+    return None if filename is None else filename.resolved_suffix
 
 def extension(core:DatasetCore, add_callbacks:bool=False):
-    ...
+    """everything from the first "." of the file's name, i.e. ".nii.gz", an empty string if it has none"""
+    if core._tree_link is None:
+        return None
+    _, dot, ext = core._tree_link.name.partition(".")
+    return dot + ext
 
 def modality(core:DatasetCore, add_callbacks:bool=False):
     ...
 
 def sidecar(core:DatasetCore, add_callbacks:bool=False):
-    ...
+    """
+    metadata of the sidecars applying to core, merged following the inheritance principle, see sidecar_inheritance.
+    Callbacks re-check core when one of those sidecars' metadata changes
+    """
+    resolved = core._dataset.sidecars.resolve(core)
+    if resolved is not None and add_callbacks:
+        from ...modules.file_bases.json_files import JSONfile
+        for source in resolved.sources:
+            if isinstance(source, JSONfile) and source is not core:
+                type(source).metadata.add_callback(source, core._check_schema)
+    return resolved
 
 def associations(core:DatasetCore, add_callbacks:bool=False):
     ...
@@ -51,8 +82,8 @@ def columns(core:DatasetCore, add_callbacks:bool=False):
     ...
 
 def json(core:DatasetCore, add_callbacks:bool=False):
-    """   NOT YET COMPLETED NEED TO MAKE A MORE ROBUST METHOD
-    WHICH TAKES INTO ACCOUNT THE INHERITANCE PRINCIPLE IN ORDER TO COLLECT ALL METADATA
+    """
+    contents of the current JSON file only, the metadata inherited from the sidecars above it is sidecar's
     """
     from ...modules.file_bases.json_files import JSONfile
     if not isinstance(core, JSONfile):
@@ -7,6 +7,8 @@ from typing import Any, TYPE_CHECKING, Callable, Union
 from .evaluation_funcs import *
 from .fields_funcs import *
 from .operator_funcs import *
+from .compiler import compile_selector, compile_hook
+from ...util.regex_cache import compile_pattern
 from dataclasses import dataclass
 from attrs import define, field
 
@@ -15,9 +17,28 @@ if TYPE_CHECKING:
 
 @define(slots=True, repr=True)
 class selectorHook():
-    funcs: list[Callable] = field(repr=False)
+    """
+    Holds a list of raw selector expressions and their compiled selectorFuncs
+
+    Compilation (tokenising, parsing and evaluating the static nodes) can be deferred until the hook is first
+    used, most of the schema is never checked against so there is no point paying for it at startup.
+    Once compiled the result is kept on the hook itself, so it only happens once per schema.
+
+    Calling the hook runs a single generated function (see compiler.py) rather than interpreting the selectorFunc
+    trees, the trees in funcs are kept for introspection and debugging.
+    """
     original: list[str] = field(repr=True)
-    tags: set[str] = field(factory=set)
+    _funcs: Union[list[Callable], None] = field(repr=False, default=None)
+    _tags: Union[set[str], None] = field(repr=False, default=None)
+    _compiled: Union[Callable, None] = field(repr=False, default=None, eq=False) # generated code doesn't pickle, rebuilt on first call
+
+    def __getstate__(self) -> dict:
+        return {"original": self.original, "_funcs": self._funcs, "_tags": self._tags}
+
+    def __setstate__(self, state:dict):
+        for key, val in state.items():
+            object.__setattr__(self, key, val)
+        object.__setattr__(self, "_compiled", None)
 
     def __str__(self) -> str:
         msg = ""
@@ -25,24 +46,53 @@ class selectorHook():
             msg += f"orig: '{val}'\nfunc: {str(self.funcs[i])}"
 
         return msg
-  
-    @classmethod
-    def from_raw(cls, r_selector:list[str]) -> 'selectorHook':
-        if not isinstance(r_selector, list):
-            r_selector = [r_selector]
 
+    @property
+    def is_compiled(self) -> bool:
+        return self._funcs is not None
+
+    @property
+    def funcs(self) -> list[Callable]:
+        if self._funcs is None:
+            self.compile()
+        return self._funcs
+
+    @property
+    def tags(self) -> set[str]:
+        if self._tags is None:
+            self.compile()
+        return self._tags
+
+    def compile(self) -> 'selectorHook':
         funcs = []
         tags = set()
-        for selector in r_selector:
+        for selector in self.original:
             sel_function = SelectorParser.from_raw(selector)
             tags = set.union(tags, sel_function.tags)
             funcs.append(sel_function)
 
-        selHook = cls(funcs, r_selector)
-        selHook.tags = tags
+        # set tags first, a concurrent caller only sees _funcs once everything is in place
+        self._tags = tags
+        self._funcs = funcs
+        return self
+
+    @classmethod
+    def from_raw(cls, r_selector:list[str], lazy:bool=False) -> 'selectorHook':
+        if not isinstance(r_selector, list):
+            r_selector = [r_selector]
+
+        selHook = cls(r_selector)
+        if not lazy:
+            selHook.compile()
         return selHook
     
     def __call__(self, *args, **kwargs):
+        if self._compiled is None:
+            self._compiled = compile_hook(self.funcs)
+        return self._compiled(*args, **kwargs)
+
+    def interpret(self, *args, **kwargs):
+        """evaluate by walking the selectorFunc trees, slower than calling the hook but easier to step through"""
         #all(func(*args, **kwargs) for func in self.funcs) can be slower
         
         for func in self.funcs:            
@@ -72,6 +122,10 @@ class selectorFunc:
         else:
             return str(self.val)
 
+    def compile(self) -> Callable:
+        """generate a single python function equivalent to calling this tree, see compiler.py"""
+        return compile_selector(self)
+
     def evaluate_static_nodes(self) -> bool:
         args_static = True
         for i,func in enumerate(self.args):
@@ -85,6 +139,10 @@ class selectorFunc:
             self.val = self.__call__()
             self.is_callable = False
             return True
+
+        # match() against a literal pattern, compile the pattern once here rather than on every call
+        if self.val is nMatch and len(self.args) == 2 and isinstance(self.args[1], str):
+            self.args[1] = compile_pattern(self.args[1])
         return False
 
     def __call__(self, *args:'DatasetCore', **kwargs) -> Any:
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import copy
+
 from functools import lru_cache
 from typing import TYPE_CHECKING
 
@@ -8,8 +10,11 @@ if TYPE_CHECKING:
 
 import bidsschematools as bst
 
+from mne.utils import logger
+
 from bidsschematools.schema import _find
 from .interpreter.selectors import selectorHook
+from .schema_cache import load_cached_schema, save_cached_schema
 
 def filter_schema(schema:'Namespace'):
     del schema["meta"]
@@ -18,18 +23,18 @@ def filter_schema(schema:'Namespace'):
     del schema.rules.sidecars["derivatives"]
     del schema.rules.tabular_data["derivatives"]
 
-def interpret_schema(schema:'Namespace'):
-    
+def interpret_schema(schema:'Namespace', lazy:bool=False):
+    """Replace every selectors and checks block with a selectorHook, lazy defers compiling them until first use"""
     #IMPORTANT, CAN ONLY SET BY DOING schema["KEY"] = , setting by doing schema.key = DOES NOT WORK
 
     for struct in _find(schema, lambda obj: ("selectors" in obj) or ("checks" in obj)):
     #for struct in _find(schema, lambda obj: "selectors" in obj):
         if "selectors" in struct:
-            t_selector = selectorHook.from_raw(struct["selectors"])
+            t_selector = selectorHook.from_raw(struct["selectors"], lazy=lazy)
             struct.update({"selectors": t_selector})
 
         if "checks" in struct:
-            t_selector = selectorHook.from_raw(struct["checks"])
+            t_selector = selectorHook.from_raw(struct["checks"], lazy=lazy)
             struct.update({"checks": t_selector})
             
 def recursive_interpret(rec_n, schema):
@@ -49,8 +54,24 @@ def recursive_interpret(rec_n, schema):
 
     return schema
 
+def build_schema(schema_path=None, lazy:bool=False) -> 'Namespace':
+    """Load, filter and interpret the schema from scratch, bypassing the on-disk cache
+
+    bidsschematools caches the loaded schema itself, so work on a copy rather than filtering the shared instance
+    """
+    schema = copy.deepcopy(bst.schema.load_schema(schema_path))
+    filter_schema(schema)
+    interpret_schema(schema, lazy=lazy)
+    return schema
+
+def warm_schema_cache(schema_path=None, lazy:bool=True) -> 'Namespace':
+    """Build the schema and (over)write its on-disk cache entry"""
+    schema = build_schema(schema_path, lazy)
+    save_cached_schema(schema, schema_path, lazy)
+    return schema
+
 @lru_cache
-def parse_load_schema(schema_path=None, debug=False) -> 'Namespace':
+def parse_load_schema(schema_path=None, debug=False, use_cache=True, lazy=True) -> 'Namespace':
     """Load and Parse the schema into a dictionary.
 
     This function allows the schema, like BIDS itself, to be specified in
@@ -64,6 +85,10 @@ def parse_load_schema(schema_path=None, debug=False) -> 'Namespace':
     schema_path : str, optional
         Directory containing yaml files or yaml file. If ``None``, use the
         default schema packaged with ``bidsschematools``.
+    use_cache : bool, optional
+        Whether to load the interpreted schema from the on-disk cache, and write it there on a miss.
+    lazy : bool, optional
+        Whether to defer compiling selectors until they are first checked against.
 
     Returns
     -------
@@ -73,10 +98,19 @@ def parse_load_schema(schema_path=None, debug=False) -> 'Namespace':
     Notes
     -----
         This function is cached, so it will only be called once per schema path.
+        Across processes the interpreted schema is cached on disk, see schema_cache.
     """
-    schema = bst.schema.load_schema(schema_path)
-
-    if not debug:
-        filter_schema(schema)
-        interpret_schema(schema)
+    if debug:
+        return bst.schema.load_schema(schema_path)
+
+    if not use_cache:
+        return build_schema(schema_path, lazy)
+
+    schema = load_cached_schema(schema_path, lazy)
+    if schema is None:
+        schema = build_schema(schema_path, lazy)
+        try:
+            save_cached_schema(schema, schema_path, lazy)
+        except OSError as e: # read only home dirs etc.. shouldn't stop the dataset from loading
+            logger.warning(f"unable to write schema cache: {e}")
     return schema
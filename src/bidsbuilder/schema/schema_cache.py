@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Union
+from mne.utils import logger
+
+import bidsschematools as bst
+from bidsschematools import data as bst_data
+from bidsschematools.types import Namespace
+
+if TYPE_CHECKING:
+    from os import PathLike
+
+"""
+On-disk cache of the filtered and interpreted schema
+
+parse_load_schema is lru_cached, which only helps within a single process. Loading the schema from scratch
+means loading the yaml/json tree, filtering it and then compiling every selector and check with selectorHook.from_raw.
+The result is pickled to disk so following processes only need to do a single deserialise.
+
+A cache file is keyed on:
+    - CACHE_FORMAT_VERSION, bump this when the layout of the pickled schema changes
+    - the bidsschematools version
+    - a fingerprint of the interpreter source, so changes to the selector parser invalidate old caches
+    - the resolved schema path and a hash of its contents
+    - whether the selectors were compiled up front or left to compile lazily
+"""
+
+CACHE_FORMAT_VERSION = 1
+CACHE_ENV_VAR = "BIDSBUILDER_CACHE_DIR"
+
+_INTERPRETER_FILES = (
+    "schema.py",
+    "interpreter/selectors.py",
+    "interpreter/evaluation_funcs.py",
+    "interpreter/fields_funcs.py",
+    "interpreter/operator_funcs.py",
+    "interpreter/compiler.py",
+)
+
+def cache_dir() -> Path:
+    """Directory holding the schema cache, can be overwritten with the BIDSBUILDER_CACHE_DIR environment variable"""
+    if (env_dir := os.environ.get(CACHE_ENV_VAR)):
+        return Path(env_dir)
+
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+    return Path(base) / "bidsbuilder"
+
+def _resolve_schema_path(schema_path:Union[str, 'PathLike', None]) -> Path:
+    """mirror the path resolution done by bidsschematools.schema.load_schema"""
+    if schema_path is not None:
+        return Path(schema_path).resolve()
+
+    schema_path = Path(bst_data.load.readable("schema.json"))
+    if not schema_path.is_file():
+        schema_path = Path(bst_data.load.readable("schema"))
+    return schema_path.resolve()
+
+def _hash_path(path:Path, hasher:'hashlib._Hash') -> None:
+    if path.is_file():
+        hasher.update(path.read_bytes())
+        return
+
+    for c_file in sorted(path.rglob("*")):
+        if c_file.is_file():
+            hasher.update(c_file.relative_to(path).as_posix().encode())
+            hasher.update(c_file.read_bytes())
+
+def _interpreter_fingerprint(hasher:'hashlib._Hash') -> None:
+    root = Path(__file__).parent
+    for rel in _INTERPRETER_FILES:
+        hasher.update((root / rel).read_bytes())
+
+def cache_key(schema_path:Union[str, 'PathLike', None]=None, lazy:bool=True) -> str:
+    """Key for the cache file of a given schema, changes whenever the schema or the interpreter changes"""
+    resolved = _resolve_schema_path(schema_path)
+
+    hasher = hashlib.sha256()
+    hasher.update(f"{CACHE_FORMAT_VERSION}|{bst.__version__}|".encode())
+    _interpreter_fingerprint(hasher)
+    _hash_path(resolved, hasher)
+
+    return f"{_path_prefix(resolved, lazy)}-{hasher.hexdigest()[:32]}"
+
+def _path_prefix(resolved:Path, lazy:bool) -> str:
+    return hashlib.sha256(f"{resolved.as_posix()}|{lazy}".encode()).hexdigest()[:12]
+
+def cache_file(schema_path:Union[str, 'PathLike', None]=None, lazy:bool=True) -> Path:
+    return cache_dir() / f"schema-{cache_key(schema_path, lazy)}.pickle"
+
+def load_cached_schema(schema_path:Union[str, 'PathLike', None]=None, lazy:bool=True) -> Union['Namespace', None]:
+    """Return the cached schema, or None if there is no valid cache entry"""
+    c_file = cache_file(schema_path, lazy)
+    if not c_file.is_file():
+        return None
+
+    try:
+        with open(c_file, "rb") as f:
+            properties = pickle.load(f)
+    except Exception as e: # a stale or corrupt cache should never stop the schema from loading
+        logger.warning(f"ignoring unreadable schema cache at '{c_file}': {e}")
+        return None
+
+    if not isinstance(properties, dict):
+        logger.warning(f"ignoring invalid schema cache at '{c_file}'")
+        return None
+
+    return Namespace(properties)
+
+def save_cached_schema(schema:'Namespace', schema_path:Union[str, 'PathLike', None]=None, lazy:bool=True) -> Path:
+    """Pickle the interpreted schema to the cache dir, removing outdated entries for the same schema path"""
+    c_file = cache_file(schema_path, lazy)
+    c_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Namespace itself doesn't survive pickling (its __getattribute__ recurses before _properties is restored)
+    # so pickle the underlying dict and re-wrap it when loading
+    fd, tmp_name = tempfile.mkstemp(dir=c_file.parent, prefix=".schema-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(schema._properties, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, c_file) # atomic so concurrent workers never read a half written cache
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    prefix = c_file.name.split("-")[1]
+    for old in c_file.parent.glob(f"schema-{prefix}-*.pickle"):
+        if old != c_file:
+            old.unlink(missing_ok=True)
+
+    logger.info(f"writing schema cache at '{c_file}'")
+    return c_file
+
+def clear_cache() -> int:
+    """Remove all cached schemas, returns the number of removed files"""
+    removed = 0
+    c_dir = cache_dir()
+    if not c_dir.is_dir():
+        return removed
+
+    for c_file in c_dir.glob("schema-*.pickle"):
+        c_file.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+__all__ = ["cache_dir", "cache_key", "cache_file", "load_cached_schema", "save_cached_schema", "clear_cache"]
@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from ..modules.core.dataset_core import DatasetCore
 
+from .selector_index import get_index
+from .interpreter.selectors import SelectorParser
+
+from collections.abc import Mapping
 from typing import TYPE_CHECKING, Generator, Union, Any
 
 if TYPE_CHECKING:
@@ -10,99 +14,136 @@ if TYPE_CHECKING:
 
 from abc import ABC, abstractmethod
 
-class schema_checker_OLD(ABC):
+# fields whose value for a file doesn't change while the schema is being applied to it, selectors only depending on
+# these can be evaluated once and shared between files with the same values. json, sidecar, columns etc.. change as
+# rules are added, and exists() registers callbacks, so selectors using those are always evaluated per file.
+# path is left out too, it is unique per file so grouping by it never shares anything
+SHARED_FIELDS = frozenset({"schema", "dataset", "subject", "entities", "datatype", "suffix", "extension", "modality"})
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+
+def _context_value(val:Any) -> Any:
+    """
+    hashable stand in for a field value. Mappings (i.e. resolved entities) are compared by their items, the values of
+    entities by their val, other objects by identity: the caller keeps them alive so their ids can't be reused
+    """
+    if isinstance(val, _PRIMITIVES):
+        return (type(val), val)
+    if isinstance(val, tuple) and all(isinstance(v, _PRIMITIVES) for v in val):
+        return (tuple, val)
+    if isinstance(val, Mapping):
+        return (Mapping, tuple(sorted((key, _context_value(getattr(item, "val", item))) for key, item in val.items())))
+    return (object, id(val))
 
-    @abstractmethod
-    def _process_add(cls, fields:'Namespace') -> Any:...
+class schema_checker():
 
-    @abstractmethod
-    def _process_del(cls, fields:'Namespace') -> Any:...
+    @classmethod
+    def _process_add(cls, fields:'Namespace') -> Any:
+        return fields
+
+    @classmethod
+    def _process_del(cls, fields:'Namespace') -> Any:
+        return fields
 
     @classmethod
     def check_schema(cls, reference:'DatasetCore',
-                        schema:'Namespace', 
-                        cur_labels:set=None, 
-                        add_callbacks:bool=False, 
+                        schema:'Namespace',
+                        cur_labels:set=None,
+                        add_callbacks:bool=False,
                         tags:Union[str, list] = None) -> Generator[tuple[str, str, Any], None, None]:
         """
         generator, which when given: a JSON object to check, a schema,
         Optionally: a list of current labels, a bool to add callbacks, a list of tags to check
         yields tuples of the format: ("add"/"del", label, fields)
         the first variable tells whether to add or remove the given fields
+
+        only rules whose datatype/suffix/extension guards can match the reference are evaluated, see selector_index
         """
         if cur_labels is None:
             cur_labels = set()
         if tags is None:
             tags = []
 
-        for label, _sub_schema in cls._recurse_schema_explore(schema):
+        for label, _sub_schema, possible in get_index(schema).iter_rules(reference, cur_labels):
             cur_selector:'selectorHook' = _sub_schema["selectors"]
             if not cls.check_tags(cur_selector, tags):
                 continue
 
-            is_true = cur_selector(reference, add_callbacks=add_callbacks)
+            # rules ruled out by the index have a false guard, evaluating them would short circuit to False
+            is_true = possible and cur_selector(reference, add_callbacks=add_callbacks)
             if is_true and (label not in cur_labels):
-                add_info = cls._process_add(_sub_schema)
-                yield ("add", label, add_info)
+                yield ("add", label, cls._process_add(_sub_schema))
             elif (not is_true) and (label in cur_labels):
-                del_info = cls._process_del(_sub_schema)
-                yield ("del", label, del_info)
-
-    @staticmethod
-    def check_tags(selHook:'selectorHook', tags:Union[str, list]=None) -> bool:
-        if isinstance(tags, str):
-            tags:list = [tags]
-
-        if not tags:  # no tags defined, check all
-            return True
-
-        for tag in tags:
-            if tag in selHook.tags:
-                return True        
-        return False
+                yield ("del", label, cls._process_del(_sub_schema))
 
     @classmethod
-    def _recurse_schema_explore(cls, schema:'Namespace') -> Generator:
-        """
-        Recursively yield schema keys up to cls._recurse_depth levels.
+    def check_schema_batch(cls, references:list['DatasetCore'],
+                              schema:'Namespace',
+                              cur_labels:list[set]=None,
+                              add_callbacks:bool=False,
+                              tags:Union[str, list] = None) -> Generator[tuple[int, str, str, Any], None, None]:
         """
+        check_schema for many files against the same schema at once, yields tuples of the format:
+        (position of the reference, "add"/"del", label, fields)
 
-        for key, value in schema.items():
-            if "selectors" in value.keys():
-                yield key, value
-            else:
-                yield from cls._recurse_schema_explore(value)
-
-
-class schema_checker():
-
-    @classmethod
-    def check_schema(cls, reference:'DatasetCore',
-                        schema:'Namespace', 
-                        cur_labels:set=None, 
-                        add_callbacks:bool=False, 
-                        tags:Union[str, list] = None) -> Generator[tuple[str, str, Any], None, None]:
-        """
-        generator, which when given: a JSON object to check, a schema,
-        Optionally: a list of current labels, a bool to add callbacks, a list of tags to check
-        yields tuples of the format: ("add"/"del", label, fields)
-        the first variable tells whether to add or remove the given fields
+        Rules are walked in schema order and each rule is checked for every file before moving on, so applying the
+        results as they are yielded keeps the top down order for each file.
+        A selector which only depends on SHARED_FIELDS is evaluated once per distinct combination of their values.
         """
         if cur_labels is None:
-            cur_labels = set()
+            cur_labels = [set() for _ in references]
         if tags is None:
             tags = []
 
-        for label, _sub_schema in cls._recurse_schema_explore(schema):
+        index = get_index(schema)
+        per_ref:list[dict[int, bool]] = []
+        positions = set()
+        for ref, labels in zip(references, cur_labels):
+            rules = {i: possible for i, possible in index.iter_positions(ref, labels)}
+            per_ref.append(rules)
+            positions.update(rules)
+
+        fields:list[dict[str, Any]] = [{} for _ in references]
+        for pos in sorted(positions):
+            label, _sub_schema = index.labels[pos], index.rules[pos]
             cur_selector:'selectorHook' = _sub_schema["selectors"]
             if not cls.check_tags(cur_selector, tags):
                 continue
 
-            is_true = cur_selector(reference, add_callbacks=add_callbacks)
-            if is_true and (label not in cur_labels):
-                yield ("add", label, _sub_schema)
-            elif (not is_true) and (label in cur_labels):
-                yield ("del", label, _sub_schema)
+            shared = cur_selector.tags.issubset(SHARED_FIELDS)
+            results:dict[tuple, bool] = {}
+            for i, reference in enumerate(references):
+                possible = per_ref[i].get(pos)
+                if possible is None:
+                    continue
+
+                if not possible:
+                    is_true = False
+                elif shared:
+                    key = cls._context_key(reference, cur_selector.tags, fields[i])
+                    try:
+                        is_true = results[key]
+                    except KeyError:
+                        is_true = results[key] = bool(cur_selector(reference, add_callbacks=add_callbacks))
+                else:
+                    is_true = cur_selector(reference, add_callbacks=add_callbacks)
+
+                if is_true and (label not in cur_labels[i]):
+                    yield (i, "add", label, cls._process_add(_sub_schema))
+                elif (not is_true) and (label in cur_labels[i]):
+                    yield (i, "del", label, cls._process_del(_sub_schema))
+
+    @staticmethod
+    def _context_key(reference:'DatasetCore', sel_tags:set, cache:dict[str, Any]) -> tuple:
+        key = []
+        for tag in sorted(sel_tags):
+            try:
+                val, _ = cache[tag]
+            except KeyError:
+                field_val = SelectorParser.FIELDS_MAP[tag](reference)
+                val, _ = cache[tag] = (_context_value(field_val), field_val) # held for the batch, see _context_value
+            key.append(val)
+        return tuple(key)
 
     @staticmethod
     def check_tags(selHook:'selectorHook', tags:Union[str, list]=None) -> bool:
@@ -114,7 +155,7 @@ class schema_checker():
 
         for tag in tags:
             if tag in selHook.tags:
-                return True        
+                return True
         return False
 
     @classmethod
@@ -129,6 +170,43 @@ class schema_checker():
             else:
                 yield from cls._recurse_schema_explore(value)
 
+class schema_checker_OLD(schema_checker, ABC):
+    """schema_checker which converts the fields of a rule before yielding them"""
+
+    @classmethod
+    @abstractmethod
+    def _process_add(cls, fields:'Namespace') -> Any:...
+
+    @classmethod
+    @abstractmethod
+    def _process_del(cls, fields:'Namespace') -> Any:...
+
+def batch_check_schema(cores:list['DatasetCore'], add_callbacks:bool=False, tags:Union[str, list] = None):
+    """
+    check the schema of many files at once, grouping the files checked against the same schema section
+
+    files are expected to define _schema_checker, _schema, _cur_labels and _apply_schema_change,
+    any others fall back to their own _check_schema
+    """
+    groups:dict[tuple, list['DatasetCore']] = {}
+    for core in cores:
+        checker = getattr(core, "_schema_checker", None)
+        if checker is None:
+            core._check_schema(add_callbacks=add_callbacks, tags=tags)
+            continue
+        groups.setdefault((checker, id(core._schema)), []).append(core)
+
+    for (checker, _), group in groups.items():
+        modified = [False] * len(group)
+        labels = [core._cur_labels for core in group]
+        for i, flag, label, items in checker.check_schema_batch(group, group[0]._schema, labels, add_callbacks, tags):
+            modified[i] = True
+            group[i]._apply_schema_change(flag, label, items)
+
+        for core, was_modified in zip(group, modified):
+            core._schema_check_done(was_modified)
+
 check_schema = schema_checker.check_schema
+check_schema_batch = schema_checker.check_schema_batch
 
-__all__ = ["check_schema"]
\ No newline at end of file
+__all__ = ["check_schema", "check_schema_batch", "batch_check_schema"]
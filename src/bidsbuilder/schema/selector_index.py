@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Generator, Union
+
+from .interpreter.selectors import selectorFunc
+from .interpreter import fields_funcs
+
+if TYPE_CHECKING:
+    from bidsschematools.types.namespace import Namespace
+    from .interpreter.selectors import selectorHook
+    from ..modules.core.dataset_core import DatasetCore
+
+"""
+Dispatch index over the rules of a schema section
+
+Most selectors start with guards on the file's datatype, suffix or extension, i.e.
+
+    - datatype == "eeg"
+    - suffix == "channels"
+    - match(extension, "^\\.nii(\\.gz)?$")
+
+A guard is any selector expression whose only inputs are these three fields, so its result is fully determined by
+the (datatype, suffix, extension) key of a file. The index evaluates the guards once per key and keeps the rules
+which can still match, so checking a file only evaluates those rules instead of every rule in the section.
+
+Only expressions before the first one calling exists() are used as guards: selectorHook evaluates its expressions
+in order and stops at the first false one, so skipping a rule on a false guard never skips registering a callback.
+"""
+
+KEY_FIELDS = ("datatype", "suffix", "extension")
+_KEY_FUNCS = {getattr(fields_funcs, name): i for i, name in enumerate(KEY_FIELDS)}
+
+def _eval_with_key(node:Any, key:tuple) -> Any:
+    """interpret a selectorFunc tree, substituting key fields for the corresponding values in key"""
+    if not isinstance(node, selectorFunc):
+        return node
+    if not node.is_callable:
+        return node.val
+    if node.val in _KEY_FUNCS:
+        return key[_KEY_FUNCS[node.val]]
+
+    args = [_eval_with_key(arg, key) for arg in node.args]
+    return node.val(*args)
+
+def _guards(hook:'selectorHook') -> list[selectorFunc]:
+    guards = []
+    for func in hook.funcs:
+        tags = func.tags or set()
+        if "exists" in tags:
+            break
+        if tags and tags.issubset(KEY_FIELDS):
+            guards.append(func)
+    return guards
+
+def file_key(reference:'DatasetCore') -> Union[tuple, None]:
+    """the (datatype, suffix, extension) key of a file, None if it can't be used to look up the index"""
+    key = tuple(func(reference) for func in _KEY_FUNCS)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+class selectorIndex():
+    """
+    Rules of a schema section in schema order, with the candidates for each (datatype, suffix, extension) key
+    computed on first lookup and memoised
+    """
+    def __init__(self, schema:'Namespace'):
+        self.labels: list[str] = []
+        self.rules: list['Namespace'] = []
+        self.guards: list[list[selectorFunc]] = []
+        self.positions: dict[str, list[int]] = {}
+
+        for label, sub_schema in self._recurse_schema_explore(schema):
+            self.positions.setdefault(label, []).append(len(self.labels))
+            self.labels.append(label)
+            self.rules.append(sub_schema)
+            self.guards.append(_guards(sub_schema["selectors"]))
+
+        self._buckets: dict[tuple, tuple[int, ...]] = {}
+        self._all = tuple(range(len(self.rules)))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def candidates(self, key:Union[tuple, None]) -> tuple[int, ...]:
+        """positions of the rules whose guards hold for key, all rules if key is None"""
+        if key is None:
+            return self._all
+
+        try:
+            return self._buckets[key]
+        except KeyError:
+            pass
+
+        matching = []
+        for i, guards in enumerate(self.guards):
+            try:
+                if all(_eval_with_key(guard, key) for guard in guards):
+                    matching.append(i)
+            except Exception: # leave it to the full selector to raise
+                matching.append(i)
+
+        bucket = self._buckets[key] = tuple(matching)
+        return bucket
+
+    def iter_positions(self, reference:'DatasetCore', cur_labels:set) -> Generator[tuple[int, bool], None, None]:
+        """
+        yield (position, possible) in schema order for every rule which needs looking at:
+        the candidates for the reference's key, and any current label whose rule is no longer a candidate
+        (possible is False for those, their selector is known to be false)
+        """
+        candidates = self.candidates(file_key(reference))
+        if len(candidates) == len(self.rules):
+            for i in candidates:
+                yield i, True
+            return
+
+        possible = set(candidates)
+        positions = set(candidates)
+        for label in cur_labels:
+            positions.update(self.positions.get(label, ()))
+
+        for i in sorted(positions):
+            yield i, (i in possible)
+
+    def iter_rules(self, reference:'DatasetCore', cur_labels:set) -> Generator[tuple[str, 'Namespace', bool], None, None]:
+        """same as iter_positions, but yields (label, sub_schema, possible)"""
+        for i, possible in self.iter_positions(reference, cur_labels):
+            yield self.labels[i], self.rules[i], possible
+
+    @classmethod
+    def _recurse_schema_explore(cls, schema:'Namespace') -> Generator:
+        for key, value in schema.items():
+            if "selectors" in value.keys():
+                yield key, value
+            else:
+                yield from cls._recurse_schema_explore(value)
+
+_INDEXES: dict[int, tuple['Namespace', selectorIndex]] = {}
+
+def get_index(schema:'Namespace') -> selectorIndex:
+    """the selectorIndex of a schema section, built on first use"""
+    try:
+        section, index = _INDEXES[id(schema)]
+        if section is schema:
+            return index
+    except KeyError:
+        pass
+
+    index = selectorIndex(schema)
+    _INDEXES[id(schema)] = (schema, index) # keep a reference so the id can't be reused
+    return index
+
+__all__ = ["selectorIndex", "get_index", "file_key", "KEY_FIELDS"]
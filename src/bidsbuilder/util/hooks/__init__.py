@@ -1,4 +1,5 @@
 from .descriptors import HookedDescriptor, DescriptorProtocol
 from .containers import *
+from .scheduler import recheckScheduler, recheck_scheduler
 # DescriptorProtocol protocol is a type that can be used to annote the descriptor
-__all__ = ["HookedDescriptor", "DescriptorProtocol", "is_supported_type", "MinimalDict", "MinimalList", "MinimalSet"]
+__all__ = ["HookedDescriptor", "DescriptorProtocol", "recheckScheduler", "recheck_scheduler", "is_supported_type", "MinimalDict", "MinimalList", "MinimalSet"]
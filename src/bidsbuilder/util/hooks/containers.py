@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import types
 
-from typing import TYPE_CHECKING, Union, Generator, Type
+from typing import TYPE_CHECKING, Union, Generator, Type, Self
 from weakref import ReferenceType
 
 from functools import wraps
-from collections.abc import MutableMapping, MutableSequence, MutableSet
+from contextlib import contextmanager
+from collections.abc import Mapping, MutableMapping, MutableSequence, MutableSet
 from abc import ABC
 
 
@@ -17,7 +18,7 @@ class hookedContainerABC(ABC):
     """
     ABC class ensuring that users inheriting from base
     """
-    forbidden_instance_names = {"_check_callback_", "_observable_container_init_"}
+    forbidden_instance_names = {"_check_callback_", "_observable_container_init_", "batch"}
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -63,7 +64,7 @@ class MinimalSet(MutableSet, DataMixin, hookedContainerABC):
 
 class ObservableType():
     def _observable_container_init_(self, descriptor:'DescriptorProtocol', weakref:ReferenceType):
-        names = ("_descriptor_", "_object_ref_", "_frozen_flag_")
+        names = ("_descriptor_", "_object_ref_", "_frozen_flag_", "_missed_callback_")
         for n in names:
             if getattr(self, n, False):
                 raise TypeError(f"Observable objects reserve the attribute name: {n}\n Please rename this attribute to something else")
@@ -71,10 +72,39 @@ class ObservableType():
         setattr(self, names[0], descriptor)
         setattr(self, names[1], weakref)
         setattr(self, names[2], False)
+        setattr(self, names[3], False)
 
     def _check_callback_(self):
         if not self._frozen_flag_:
             self._descriptor_._trigger_callback(self._object_ref_()) # weak reference so need to call it to access it
+        else:
+            self._missed_callback_ = True
+
+    @contextmanager
+    def batch(self) -> Generator[Self, None, None]:
+        """
+        Group mutations so that they trigger a single callback
+
+            with sidecar.metadata.batch() as metadata:
+                for key, val in values.items():
+                    metadata[key] = val
+
+        validators still run for every mutation, only the callbacks are held back until the outermost batch exits,
+        which then triggers once if anything changed, even when exiting on an exception
+        """
+        if self._frozen_flag_:
+            yield self
+            return
+
+        self._frozen_flag_ = True
+        self._missed_callback_ = False
+        try:
+            yield self
+        finally:
+            self._frozen_flag_ = False
+            if self._missed_callback_:
+                self._missed_callback_ = False
+                self._check_callback_()
 
 class create_dynamic_container():
     """
@@ -107,6 +137,12 @@ class create_dynamic_container():
         for (orig_method, func_name)  in self.iter_methods_set(self.validate_input_methods):
             setattr(self.dynamic_container, func_name, self.wrap_validate_input(orig_method))
 
+        # bulk methods validate everything before committing anything, then trigger a single callback
+        if issubclass(self.base_container, MinimalDict):
+            setattr(self.dynamic_container, "update", self.make_validated_update(self.base_container.__setitem__))
+        elif issubclass(self.base_container, MinimalList):
+            setattr(self.dynamic_container, "extend", self.make_validated_extend(self.base_container.insert))
+
         _validator_init_name_ = "_observable_container_init_"
         _validator_init_ = getattr(self.dynamic_container, _validator_init_name_)
         setattr(self.dynamic_container, _validator_init_name_, self.wrap_validate_instance_creation(_validator_init_))
@@ -132,10 +168,9 @@ class create_dynamic_container():
     def wrap_frozen_check_callback(orig_method):
         @wraps(orig_method)
         def _wrapped(self:ObservableType, *args, **kwargs):
-            self._frozen_flag_ = True
-            orig_method(self, *args, **kwargs)
-            self._frozen_flag_ = False
-            self._check_callback_()
+            with self.batch():
+                orig_method(self, *args, **kwargs)
+                self._check_callback_() # as before, even if nothing was given
         return _wrapped
 
     @staticmethod
@@ -146,32 +181,60 @@ class create_dynamic_container():
             orig_method(self, *n_args, **kwargs)
         return _wrapped
     
+    @staticmethod
+    def make_validated_update(base_setitem):
+        def update(self:ObservableType, other=(), /, **kwds):
+            if isinstance(other, Mapping):
+                items = list(other.items())
+            elif hasattr(other, "keys"):
+                items = [(key, other[key]) for key in other.keys()]
+            else:
+                items = list(other)
+            items.extend(kwds.items())
+
+            instance, descriptor = self._object_ref_(), self._descriptor_
+            validated = [descriptor.fval(instance, descriptor, key, value) for key, value in items]
+            for n_args in validated:
+                base_setitem(self, *n_args)
+            self._check_callback_()
+        return update
+
+    @staticmethod
+    def make_validated_extend(base_insert):
+        def extend(self:ObservableType, values):
+            values = list(values) # values may be self
+            instance, descriptor = self._object_ref_(), self._descriptor_
+            start = len(self)
+            validated = [descriptor.fval(instance, descriptor, start + i, value) for i, value in enumerate(values)]
+            for n_args in validated:
+                base_insert(self, *n_args)
+            self._check_callback_()
+        return extend
+
     @staticmethod
     def wrap_validate_instance_creation(orig_method):
 
         @wraps(orig_method)
         def _wrapped(self:ObservableType, *args, **kwargs):
             orig_method(self, *args, **kwargs)
-            
-            self._frozen_flag_ = True
 
+            # validate the initial contents in one pass, writing straight to the underlying data
+            instance, descriptor = self._object_ref_(), self._descriptor_
+            data = self._data
             if isinstance(self, MinimalList):
-                 for i in range(len(self)):
-                    self[i] = self[i]
+                validated = [descriptor.fval(instance, descriptor, i, val) for i, val in enumerate(data)]
+                for i, val in validated:
+                    data[i] = val
             elif isinstance(self, MinimalDict):
-                vals = [k for k in self]
-                for key in vals:
-                    val = self.pop(key)
-                    self[key] = val
+                validated = [descriptor.fval(instance, descriptor, key, val) for key, val in data.items()]
+                data.clear()
+                data.update(validated)
             elif isinstance(self, MinimalSet):
-                vals = [item for item in self]
-                for val in vals:
-                    self.remove(val)
-                    self.add(val)
+                validated = [descriptor.fval(instance, descriptor, val) for val in data]
+                data.clear()
+                data.update(n_args[0] for n_args in validated)
             else:
                 raise NotImplementedError(f"Validator wrapping not implemented for {self.__class__}")
-        
-            self._frozen_flag_ = False
 
         return _wrapped
 
@@ -7,6 +7,7 @@ from functools import partial
 
 from .containers import *
 from .containers import ObservableType
+from .scheduler import recheck_scheduler
 
 VAL = TypeVar("VAL")
 CBACK = TypeVar("Descriptor", bound="DescriptorProtocol")
@@ -28,16 +29,41 @@ class DescriptorProtocol(Generic[VAL]):
     def __set__(self:Self, instance:INSTANCE, value:VAL) -> None: ...
     def _trigger_callback(self:Self, instance:INSTANCE) -> None: ...
 
+HOOKED_VALUES = "_hooked_values"
+_MISSING = object()
+_has_hooked_values:dict[type, bool] = {}
+
+def _hooked_values(instance:INSTANCE) -> Union[dict[str, Any], None]:
+    """
+    the per-instance storage of hooked descriptor values, if the class of instance reserves one.
+
+    attrs classes opt in with a field: _hooked_values:dict = field(init=False, factory=dict, repr=False, eq=False)
+    values are then kept on the instance itself, keyed by descriptor name, and go with it.
+    """
+    cls = type(instance)
+    has_slot = _has_hooked_values.get(cls)
+    if has_slot is None:
+        has_slot = _has_hooked_values[cls] = hasattr(cls, HOOKED_VALUES)
+    return getattr(instance, HOOKED_VALUES) if has_slot else None
+
+def _mark_dirty(instance:INSTANCE) -> None:
+    """flag instance as changed since it was last written, for objects tracking it (see DatasetCore._dirty)"""
+    if (mark := getattr(instance, "_mark_dirty_", None)) is not None:
+        mark()
+
 class CallbackBase(Generic[VAL]): # generic base class to enable dynamic type hinting
     """
     Callback base allows for tags to be passed, moreover it also sets the name of the raw attribute
     to be the same as the name of the descriptor with an underscore, i.e. '_test' for 'test'
 
     this is used to support local data storage for slotted classes
+
+    values are stored on the instance when its class reserves _hooked_values (see _hooked_values), otherwise in
+    variables, keyed by id(instance), with each entry removed once its instance is garbage collected
     """
     def __init__(self, *, tags:Union[list, str, None]=None, default:Any=None, **kwargs) -> None:
         self.tags:Union[list, str, None] = tags
-        self.variables: dict[int, Any] = {}
+        self.variables: dict[int, Any] = {} # only for instances without _hooked_values
         self.default:Any = default
         super().__init__(**kwargs)
 
@@ -47,9 +73,29 @@ class CallbackBase(Generic[VAL]): # generic base class to enable dynamic type hi
         also makes debugging easier as the instance owns its attributes"""
         self.name:str = f"{name}"
 
+    def _get_raw(self, instance:INSTANCE, default:Any) -> Any:
+        values = _hooked_values(instance)
+        if values is not None:
+            return values.get(self.name, default)
+        return self.variables.get(id(instance), default)
+
+    def _set_raw(self, instance:INSTANCE, value:Any) -> None:
+        values = _hooked_values(instance)
+        if values is not None:
+            values[self.name] = value
+            return
+
+        instance_id = id(instance)
+        if instance_id not in self.variables:
+            try:
+                weakref.finalize(instance, self.variables.pop, instance_id, None) # the id may be reused once instance is gone
+            except TypeError:
+                pass # not weak referenceable, kept for the lifetime of the descriptor
+        self.variables[instance_id] = value
+
     def _set_quiet(self, instance:INSTANCE, value:VAL) -> None:
         """sets the value without triggering callbacks"""
-        self.variables[id(instance)] = value
+        self._set_raw(instance, value)
 
 class CallbackGetterMixin():
     """
@@ -65,7 +111,7 @@ class CallbackGetterMixin():
     def __get__(self, instance:INSTANCE, owner:OWNER) -> VAL:
         if instance is None:
             return self
-        return self.fget(instance, self.variables.get(id(instance), self.default), self)
+        return self.fget(instance, self._get_raw(instance, self.default), self)
     
 class CallbackNoGetterMixin():
     """
@@ -74,7 +120,7 @@ class CallbackNoGetterMixin():
     def __get__(self, instance:INSTANCE, owner:OWNER) -> VAL:
         if instance is None:
             return self
-        return self.variables.get(id(instance), self.default)
+        return self._get_raw(instance, self.default)
 
 class PerInstanceCallbackMixin():
     """
@@ -89,19 +135,21 @@ class PerInstanceCallbackMixin():
         super().__init__(**kwargs)
 
     def _trigger_callback(self, instance:INSTANCE) -> None:
+        _mark_dirty(instance)
         instance_id = id(instance)
         if (callbacks := self.callbacks.get(instance_id, False)):
             to_del = []
-            for i, cback in enumerate(callbacks):
-                method = cback()
-                # need to unpack it as the callback is a weakref.WeakMethod
-                # as such if the object that the method is linked to gets deleted (garbage collected)
-                # the WeakMethod returns None rather than a callable method 
-                if method:
-                    method(tags=self.tags)
-                else:
-                    to_del.append(i)
-            self._remove_callback(instance_id, to_del)
+            with recheck_scheduler.operation(): # callbacks are queued, and run once the outermost operation ends
+                for i, cback in enumerate(callbacks):
+                    method = cback()
+                    # need to unpack it as the callback is a weakref.WeakMethod
+                    # as such if the object that the method is linked to gets deleted (garbage collected)
+                    # the WeakMethod returns None rather than a callable method 
+                    if method:
+                        recheck_scheduler.schedule(method, self.tags)
+                    else:
+                        to_del.append(i)
+                self._remove_callback(instance_id, to_del)
 
     def _remove_callback(self, instance_id:int, indices:list[int]) -> None:
         if not indices:
@@ -147,6 +195,7 @@ class SingleCallbackMixin():
         super().__init__(**kwargs)
 
     def _trigger_callback(self, instance:INSTANCE) -> None:
+        _mark_dirty(instance)
         self.callback(instance, self.tags)
 
 def _make_container_mixin(_base_getter_cls:Union[CallbackNoGetterMixin, CallbackGetterMixin], validator:bool) -> type:
@@ -182,11 +231,18 @@ def _make_container_mixin(_base_getter_cls:Union[CallbackNoGetterMixin, Callback
             default_instance._observable_container_init_(self, weakref.ref(instance))
             return default_instance
 
+        def _get_container(self, instance:INSTANCE) -> ObservableType:
+            """the container held by instance, created if needed, without going through fget"""
+            container = self._get_raw(instance, _MISSING)
+            if container is _MISSING:
+                container = self._instantiate_default_(instance)
+                self._set_raw(instance, container)
+            return container
+
         def __get__(self, instance:INSTANCE, owner:OWNER) -> VAL:
             if instance is None:
                 return self
-            if id(instance) not in self.variables:
-                self.variables[id(instance)] = self._instantiate_default_(instance)
+            self._get_container(instance)
             return _base_getter_cls.__get__(self, instance, owner) # must return the observable type
 
         def __set__(self, instance:INSTANCE, value:VAL) -> None:
@@ -198,7 +254,7 @@ def _make_container_mixin(_base_getter_cls:Union[CallbackNoGetterMixin, Callback
                 raise TypeError(f"When setting {instance}.{self.name}, it must be a container of type {self.type_hint}")
             _observable_obj:ObservableType = wrap_container(value, self.TYPEIDX)
             _observable_obj._observable_container_init_(self, weakref.ref(instance))
-            self.variables[id(instance)] = _observable_obj
+            self._set_raw(instance, _observable_obj)
             self._trigger_callback(instance)  
             """
             need to trigger callbacks since 05/09/2025. wrap_container just sets the __class__ to an observable type, so doesn't trigger callbacks
@@ -222,7 +278,7 @@ class PlainMixin():
     mixin for descriptors who's value is a plain value, i.e. str, or int, or float.
     """
     def __set__(self, instance:INSTANCE, value:VAL) -> None:
-        self.variables[id(instance)] = value
+        self._set_raw(instance, value)
         self._trigger_callback(instance)
 
 class PlainValMixin():
@@ -235,7 +291,7 @@ class PlainValMixin():
 
     def __set__(self, instance:INSTANCE, value:Any) -> None:
         n_value = self.fval(instance, self, value)
-        self.variables[id(instance)] = n_value
+        self._set_raw(instance, n_value)
         self._trigger_callback(instance)
 
 _callback_types = {}
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Union
+
+"""
+Scheduling of the schema re-checks fired by hooked descriptors
+
+Changing an entity, suffix or datatype re-checks every file below it, and toggling exists re-checks every file with
+a selector depending on it. Rather than calling each re-check as it is fired, they are queued in a recheckScheduler:
+
+    - a callback which is already queued is not queued again, its tags are merged into the queued ones
+      (None, meaning check everything, wins over any tags)
+    - the queue is flushed once the outermost operation() ends, so a change made outside of an operation is still
+      re-checked straight away, while everything changed inside one is re-checked once at the end
+    - re-checks fired while flushing are added to the same queue rather than run recursively
+
+With eager set, callbacks are called as soon as they are fired, as before.
+
+There is one scheduler for the process, as there is one dataset which DatasetCore objects refer to (DatasetCore._dataset).
+"""
+
+Tags = Union[frozenset, None]
+
+def _as_tags(tags:Union[list, str, None]) -> Tags:
+    if not tags: # check_tags treats no tags as all of them
+        return None
+    if isinstance(tags, str):
+        return frozenset((tags,))
+    return frozenset(tags)
+
+def _merge_tags(cur:Tags, new:Tags) -> Tags:
+    if cur is None or new is None:
+        return None
+    return cur | new
+
+class recheckScheduler():
+    """deduplicated queue of callbacks, each called with the union of the tags it was scheduled with"""
+
+    def __init__(self, eager:bool=False):
+        self.eager:bool = eager
+        self._depth:int = 0
+        self._flushing:bool = False
+        self._queue:dict[tuple, list] = {} # key: [callback, tags], in the order they were first scheduled
+
+    @staticmethod
+    def _key(callback:Callable) -> tuple:
+        # bound methods are created anew on each attribute access, so they are keyed by their object and function
+        owner = getattr(callback, "__self__", None)
+        if owner is None:
+            return (callback,)
+        return (id(owner), callback.__func__)
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    @property
+    def deferring(self) -> bool:
+        """whether scheduled callbacks wait for the outermost operation to end, rather than being called straight away"""
+        return self._depth > 0 and not self.eager
+
+    def schedule(self, callback:Callable[..., Any], tags:Union[list, str, None]=None) -> None:
+        """queue callback(tags=...), or call it straight away in eager mode"""
+        if self.eager:
+            callback(tags=tags)
+            return
+
+        tags = _as_tags(tags)
+        key = self._key(callback)
+        if (queued := self._queue.get(key)) is not None:
+            queued[1] = _merge_tags(queued[1], tags)
+        else:
+            self._queue[key] = [callback, tags]
+
+    def flush(self) -> None:
+        """
+        call every queued callback, including those queued while flushing. A callback raising doesn't stop the
+        others, the queue is always left empty and the errors raised once it is, together if there are several
+        """
+        if self._flushing:
+            return # the flush already running picks them up
+
+        self._flushing = True
+        errors = []
+        try:
+            while self._queue:
+                key = next(iter(self._queue))
+                callback, tags = self._queue.pop(key)
+                try:
+                    callback(tags=sorted(tags) if tags is not None else None)
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            self._flushing = False
+
+        if len(errors) == 1:
+            raise errors[0]
+        if errors:
+            raise ExceptionGroup(f"{len(errors)} schema re-checks failed", errors)
+
+    def clear(self) -> None:
+        """drop the queued callbacks without calling them"""
+        self._queue.clear()
+
+    @contextmanager
+    def operation(self) -> Iterator[recheckScheduler]:
+        """
+        defer re-checks until the outermost operation ends. If it ends with an error the queued re-checks still run,
+        but the error is what is raised, with the re-checks' own errors added to it as a note
+        """
+        self._depth += 1
+        try:
+            yield self
+        except BaseException as e:
+            self._depth -= 1
+            if self._depth == 0 and self._queue:
+                try:
+                    self.flush()
+                except Exception as flush_error:
+                    e.add_note(f"the re-checks queued before it also failed: {flush_error!r}")
+            raise
+        self._depth -= 1
+        if self._depth == 0 and self._queue:
+            self.flush()
+
+recheck_scheduler = recheckScheduler()
+
+__all__ = ["recheckScheduler", "recheck_scheduler"]
@@ -1,53 +1,135 @@
 from __future__ import annotations
 
+import gzip
 import json
+import hashlib
+import numpy as np
 import pandas as pd
 
 from pathlib import Path
+from functools import partial
+from typing import TYPE_CHECKING, Union, Generator
 from mne.utils import logger
 
-def _write_tsv(path:str, data:pd.DataFrame, overwrite:bool = False):
+from .manifest import content_hash
+
+if TYPE_CHECKING:
+    from .manifest import buildManifest
+
+def _write_bytes(path:str, payload:bytes, overwrite:bool = False, manifest:Union['buildManifest', None] = None) -> bool:
+    """
+    write serialised content to path, returns whether the file was written.
+
+    with a manifest, content identical to what was last written there is skipped, even if overwrite is False
+    """
     fname = Path(path)
+    digest = None
+    if manifest is not None:
+        digest = content_hash(payload)
+        if manifest.matches(fname, digest):
+            manifest.skip(path)
+            return False
+
     if fname.exists() and not overwrite:
         raise FileExistsError(
             f'"{fname}" already exists. Please set overwrite to True.'
         )
-    
-    args = {"sep":"\t","index":False, "na_rep":"n/a"}
-    if fname.suffix == ".gz" or fname.suffixes[-1] == ".gz":
-        args["compression"] = "gzip"
-    else:
-
-        # check: https://bids-specification.readthedocs.io/en/stable/common-principles.html#tabular-files
-        # at the time of writing 20/08/2025 motion files which end in .tsv MUST not have a header...
-        # Ideally want to add some meta schema to make this all more automated...
-        stem = fname.stem
-        for _ in fname.suffixes:
-            stem = Path(stem).stem
-
-        last_keyword = stem.split("_")[-1]
-        if last_keyword == "motion":
-            args["header"] = False
-        else:
-            args["header"] = True
-
-    data.to_csv(fname,**args)
 
-    logger.info(f"writing TSV at '{path}'")
+    with open(fname, "wb") as f:
+        f.write(payload)
+
+    if manifest is not None:
+        manifest.record(fname, digest)
+    return True
+
+TSV_CHUNKSIZE = 50_000 # rows serialised at a time by _write_tsv
+
+def _tsv_header(fname:Path) -> bool:
+    if fname.suffixes[-1:] == [".gz"]:
+        return True
+
+    # check: https://bids-specification.readthedocs.io/en/stable/common-principles.html#tabular-files
+    # at the time of writing 20/08/2025 motion files which end in .tsv MUST not have a header...
+    # Ideally want to add some meta schema to make this all more automated...
+    stem = fname.stem
+    for _ in fname.suffixes:
+        stem = Path(stem).stem
+
+    last_keyword = stem.split("_")[-1]
+    return last_keyword != "motion"
+
+def _join_lists(col:pd.Series, delimiter:str) -> pd.Series:
+    """convert the list cells of col into "[a<delimiter>b]" strings, other cells are kept as they are"""
+    values = col.to_numpy(dtype=object, copy=True)
+    is_list = np.fromiter((type(cell) is list for cell in values), dtype=bool, count=len(values))
+    if not is_list.any():
+        return col
 
-def _write_json(path, data, overwrite = False):
+    values[is_list] = [f"[{delimiter.join(map(str, cell))}]" for cell in values[is_list]]
+    return pd.Series(values, index=col.index, name=col.name)
+
+def _tsv_chunks(data:pd.DataFrame, delimiters:dict[str, str], header:Union[bool, list[str]], chunksize:int) -> Generator[bytes, None, None]:
+    """
+    serialise data as tsv, chunksize rows at a time, so only one chunk is ever held as strings.
+    header is whether to write one, or the names to write for the columns
+    """
+    list_cols = {col: delim for col, delim in delimiters.items() if delim is not None and col in data.columns}
+
+    for start in range(0, max(len(data), 1), chunksize): # always at least one chunk, for the header of empty tables
+        chunk = data.iloc[start:start + chunksize]
+        if list_cols:
+            chunk = chunk.assign(**{col: _join_lists(chunk[col], delim) for col, delim in list_cols.items()})
+        yield chunk.to_csv(None, sep="\t", index=False, na_rep="n/a", header=(header if start == 0 else False)).encode("utf-8")
+
+def _write_tsv(path:str, data:pd.DataFrame, overwrite:bool = False, manifest:Union['buildManifest', None] = None,
+               delimiters:dict[str, str] = None, chunksize:int = TSV_CHUNKSIZE, headers:dict[str, str] = None):
+    """
+    write data as a tsv, gzip compressed for .tsv.gz
+
+    delimiters maps column names to the delimiter of their list values, which are written as "[a<delimiter>b]",
+    headers maps column names to the header written for them, if it differs.
+    Rows are serialised in chunks straight to the file, so no stringified copy of the whole table is made.
+    With a manifest, the chunks are hashed first and the file is left alone if its content is unchanged
+    """
     fname = Path(path)
+    compress = fname.suffixes[-1:] == [".gz"]
+    header = _tsv_header(fname)
+    if header and headers:
+        header = [headers.get(col, col) for col in data.columns]
+    chunks = partial(_tsv_chunks, data, delimiters or {}, header, chunksize)
+
+    digest = None
+    if manifest is not None: # hash the uncompressed content, skipping without ever compressing or writing
+        hasher = hashlib.sha256()
+        for chunk in chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        if manifest.matches(fname, digest):
+            manifest.skip(path)
+            return
+
     if fname.exists() and not overwrite:
         raise FileExistsError(
             f'"{fname}" already exists. Please set overwrite to True.'
         )
 
-    json_output = json.dumps(data, indent=4, ensure_ascii=False)
-    with open(fname, "w", encoding="utf-8") as f:
-        f.write(json_output)
-        f.write("\n")
+    with open(fname, "wb") as raw:
+        # no filename or timestamp in the gzip header, same data gives the same bytes
+        out = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) if compress else raw
+        for chunk in chunks():
+            out.write(chunk)
+        if compress:
+            out.close()
 
-    logger.info(f"writing JSON at '{path}'")
+    if manifest is not None:
+        manifest.record(fname, digest)
+
+    logger.info(f"writing TSV at '{path}'")
+
+def _write_json(path, data, overwrite = False, manifest:Union['buildManifest', None] = None):
+    json_output = json.dumps(data, indent=4, ensure_ascii=False) + "\n"
+    if _write_bytes(path, json_output.encode("utf-8"), overwrite, manifest):
+        logger.info(f"writing JSON at '{path}'")
 
 def _read_JSON(path):
     #**kwargs is a dictionary defining categories for names
@@ -66,6 +148,18 @@ def _read_JSON(path):
 
         return vals
     
+def _read_tsv(path) -> pd.DataFrame:
+    """
+    read a tsv, or .tsv.gz, as written by _write_tsv
+
+    n/a cells are read as pd.NA and every other cell as the text written, so "01" or "1.50" aren't changed by guessing
+    their type. Converting them is left to the schema of their column, see column_storage.parse_text
+    """
+    fname = Path(path)
+    header = 0 if _tsv_header(fname) else None
+    df = pd.read_csv(fname, sep="\t", header=header, na_values=["n/a"], keep_default_na=False, dtype=str)
+    return df.astype(object).where(df.notna(), pd.NA)
+
 """
 https://github.com/mne-tools/mne-bids/blob/main/mne_bids/utils.py#L228
 https://github.com/mne-tools/mne-bids/blob/main/mne_bids/write.py
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+from pathlib import Path
+from typing import Union
+from mne.utils import logger
+
+"""
+Build manifest, recording what bidsbuilder last wrote to each file of a dataset
+
+The manifest lives in the dataset root under .bidsbuilder/manifest.json and maps the path of every written file,
+relative to the root, to the sha256 of its content (before compression for .tsv.gz) along with its size and
+modification time once written.
+
+An incremental build serialises each file, and only writes it if its hash differs from the recorded one.
+Files whose object hasn't changed since it was last written (see DatasetCore._dirty) aren't even serialised,
+as long as the file on disk still has the recorded size and modification time, so edits made outside of
+bidsbuilder are never silently kept.
+"""
+
+MANIFEST_VERSION = 1
+MANIFEST_DIR = ".bidsbuilder"
+MANIFEST_NAME = "manifest.json"
+
+def content_hash(payload:bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+class buildManifest():
+    """content hashes of the files written to a dataset root, see module docstring"""
+
+    def __init__(self, root:Union[str, os.PathLike], entries:dict[str, dict]=None):
+        self.root = Path(root)
+        self.entries: dict[str, dict] = {} if entries is None else entries
+        self.written: int = 0
+        self.skipped: int = 0
+        self._lock = threading.Lock() # files may be written from the thread pool of build(workers=N)
+
+    @property
+    def path(self) -> Path:
+        return self.root / MANIFEST_DIR / MANIFEST_NAME
+
+    @classmethod
+    def load(cls, root:Union[str, os.PathLike]) -> 'buildManifest':
+        """manifest of the given root, empty if there isn't one yet or it can't be read"""
+        manifest = cls(root)
+        if not manifest.path.is_file():
+            return manifest
+
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+        except Exception as e: # worst case everything is written again
+            logger.warning(f"ignoring unreadable build manifest at '{manifest.path}': {e}")
+            return manifest
+
+        if not isinstance(content, dict) or content.get("version") != MANIFEST_VERSION:
+            logger.warning(f"ignoring outdated build manifest at '{manifest.path}'")
+            return manifest
+
+        manifest.entries = content.get("files", {})
+        return manifest
+
+    def save(self) -> Path:
+        m_path = self.path
+        m_path.parent.mkdir(parents=False, exist_ok=True)
+
+        content = {"version": MANIFEST_VERSION, "files": dict(sorted(self.entries.items()))}
+        fd, tmp_name = tempfile.mkstemp(dir=m_path.parent, prefix=".manifest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(content, f, indent=1)
+            os.replace(tmp_name, m_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        logger.info(f"writing build manifest at '{m_path}', {self.written} files written and {self.skipped} unchanged")
+        return m_path
+
+    def key(self, path:Union[str, os.PathLike]) -> str:
+        return Path(path).relative_to(self.root).as_posix()
+
+    def is_unchanged(self, path:Union[str, os.PathLike]) -> bool:
+        """whether path is still the file recorded in the manifest, going by its size and modification time"""
+        entry = self.entries.get(self.key(path))
+        if entry is None:
+            return False
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def matches(self, path:Union[str, os.PathLike], digest:str) -> bool:
+        """whether writing content with the given hash to path would leave it unchanged"""
+        entry = self.entries.get(self.key(path))
+        return entry is not None and entry["sha256"] == digest and self.is_unchanged(path)
+
+    def record(self, path:Union[str, os.PathLike], digest:str):
+        stat = os.stat(path)
+        with self._lock:
+            self.entries[self.key(path)] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            self.written += 1
+
+    def skip(self, path:Union[str, os.PathLike]):
+        with self._lock:
+            self.skipped += 1
+        logger.info(f"skipping unchanged '{path}'")
+
+__all__ = ["buildManifest", "content_hash", "MANIFEST_DIR", "MANIFEST_NAME"]
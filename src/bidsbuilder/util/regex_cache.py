@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import re
+
+from functools import lru_cache
+from typing import Union
+
+"""
+Shared cache of compiled regular expressions
+
+Schema formats, pattern rules of metadata, entities and columns, and the selector match() function all compile
+their regexes through compile_pattern, so each distinct pattern is only compiled once for the whole process rather
+than relying on re's own small internal cache, which every other library shares.
+
+regex_cache_info gives the hits, misses and size of the cache (a functools _CacheInfo).
+"""
+
+REGEX_CACHE_SIZE = 2048 # far more than the distinct patterns in the schema
+
+@lru_cache(maxsize=REGEX_CACHE_SIZE)
+def _compile(pattern:str, flags:int) -> re.Pattern:
+    return re.compile(pattern, flags)
+
+def compile_pattern(pattern:Union[str, re.Pattern], flags:int=0) -> re.Pattern:
+    """compiled regex of pattern, patterns which are already compiled are returned as is"""
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    return _compile(pattern, flags)
+
+def regex_cache_info():
+    return _compile.cache_info()
+
+def clear_regex_cache():
+    _compile.cache_clear()
+
+__all__ = ["compile_pattern", "regex_cache_info", "clear_regex_cache", "REGEX_CACHE_SIZE"]
@@ -0,0 +1,114 @@
+from bidsbuilder.modules.core.dataset_tree import Directory, FileCollection, FileEntry
+
+def _node(cls, name, parent):
+    node = cls(_name=name, _file_link=None, _name_link=None, parent=parent)
+    if parent is not None:
+        parent.children[name] = node
+    return node
+
+def _make_tree():
+    root = _node(Directory, "/data/root", None)
+    sub = _node(Directory, "sub-01", root)
+    ses = _node(Directory, "ses-01", sub)
+    events = _node(FileCollection, "sub-01_ses-01_events", ses)
+    tsv = _node(FileEntry, ".tsv", events)
+    return root, sub, ses, tsv
+
+def test_paths_are_cached():
+    root, sub, ses, tsv = _make_tree()
+
+    assert tsv.path == "/data/root/sub-01/ses-01/sub-01_ses-01_events.tsv"
+    assert tsv.relative_path == "/sub-01/ses-01/sub-01_ses-01_events.tsv"
+    assert tsv._path_cache == tsv.path
+    assert ses._relpath_cache == "/sub-01/ses-01/"
+
+def test_rename_invalidates_subtree():
+    root, sub, ses, tsv = _make_tree()
+    assert tsv.path == "/data/root/sub-01/ses-01/sub-01_ses-01_events.tsv"
+
+    sub.name = "sub-02"
+    assert "sub-02" in root.children
+    assert tsv.path == "/data/root/sub-02/ses-01/sub-01_ses-01_events.tsv"
+    assert tsv.relative_path == "/sub-02/ses-01/sub-01_ses-01_events.tsv"
+    assert root.path == "/data/root/"
+
+def test_reparent_invalidates_subtree():
+    root, sub, ses, tsv = _make_tree()
+    other = _node(Directory, "sub-02", root)
+    assert tsv.relative_path == "/sub-01/ses-01/sub-01_ses-01_events.tsv"
+
+    other.add_tree_node(ses)
+    assert tsv.relative_path == "/sub-02/ses-01/sub-01_ses-01_events.tsv"
+    assert ses.path == "/data/root/sub-02/ses-01/"
+
+def test_fetch_uses_path_index():
+    root, sub, ses, tsv = _make_tree()
+
+    assert root.fetch("/sub-01/ses-01/sub-01_ses-01_events.tsv", reference=False) is tsv
+    assert sub.fetch("ses-01/sub-01_ses-01_events.tsv", reference=False) is tsv
+    assert root.fetch("sub-01/", reference=False) is sub
+    assert root._path_index["sub-01/ses-01"] is ses
+
+    assert "sub-01/ses-01/sub-01_ses-01_events.tsv" in root
+    assert "sub-01/ses-02" not in root
+    try:
+        root.fetch("sub-01/ses-02")
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("fetch of a missing path should raise a KeyError")
+
+def test_path_index_follows_renames_and_moves():
+    root, sub, ses, tsv = _make_tree()
+    assert "sub-01/ses-01" in root # builds the index
+
+    sub.name = "sub-02"
+    assert "sub-01/ses-01" not in root
+    assert root.fetch("sub-02/ses-01/sub-01_ses-01_events.tsv", reference=False) is tsv
+
+    other = _node(Directory, "sub-03", root)
+    other.add_tree_node(ses)
+    assert "ses-01" not in sub.children
+    assert "sub-02/ses-01" not in root
+    assert root.fetch("sub-03/ses-01", reference=False) is ses
+
+def test_parallel_make(tmp_path):
+    from bidsbuilder.modules.core.dataset_core import UnknownFile
+
+    def _core(exists=True):
+        core = UnknownFile()
+        core.exists = exists
+        return core
+
+    def _file(cls, name, parent, core):
+        node = cls(_name=name, _file_link=core, _name_link=None, parent=parent)
+        if parent is not None:
+            parent.children[name] = node
+        return node
+
+    root = _file(Directory, (tmp_path / "ds").as_posix(), None, _core())
+    sub = _file(Directory, "sub-01", root, _core())
+    _file(FileEntry, "README", root, _core())
+    events = _file(FileCollection, "sub-01_events", sub, None)
+    _file(FileEntry, ".tsv", events, _core())
+    _file(FileEntry, ".json", events, _core())
+
+    root._make_parallel(force=False, workers=4)
+    assert (tmp_path / "ds" / "README").is_file()
+    assert (tmp_path / "ds" / "sub-01" / "sub-01_events.tsv").is_file()
+    assert (tmp_path / "ds" / "sub-01" / "sub-01_events.json").is_file()
+
+    # files in a folder which isn't made fail, but every other file is still written
+    missing = _file(Directory, "sub-02", root, _core(exists=False))
+    _file(FileEntry, "a.txt", missing, _core())
+    _file(FileEntry, "b.txt", missing, _core())
+    _file(FileEntry, "CHANGES", root, _core())
+    try:
+        root._make_parallel(force=True, workers=4)
+    except ExceptionGroup as group:
+        assert len(group.exceptions) == 2
+        assert all(isinstance(exc, FileNotFoundError) for exc in group.exceptions)
+        assert group.exceptions[0].__notes__ == [f"while writing {missing.path}a.txt"]
+    else:
+        raise AssertionError("failed files should be raised as an ExceptionGroup")
+    assert (tmp_path / "ds" / "CHANGES").is_file()
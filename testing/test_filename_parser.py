@@ -0,0 +1,54 @@
+import pytest
+
+from bidsbuilder import BidsDataset
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsbuilder.modules.core.filename_parser import filenameParser
+from bidsbuilder.modules.core.filenames import CompositeFilename
+
+def _parser():
+    return filenameParser.from_schema(parse_load_schema())
+
+def test_parse_is_reverse_of_construct_name(tmp_path):
+    BidsDataset(tmp_path.as_posix(), minimal=True)
+    parsed = CompositeFilename.parse_name("sub-01_ses-02_task-rest_run-1_eeg.json")
+    assert parsed.entities == {"subject": "01", "session": "02", "task": "rest", "run": "1"}
+    assert list(parsed.entities) == ["subject", "session", "task", "run"]
+    assert (parsed.suffix, parsed.extension, parsed.stem) == ("eeg", ".json", "sub-01_ses-02_task-rest_run-1_eeg")
+
+    filename = CompositeFilename.create({key: ("optional", val) for key, val in parsed.entities.items()}, parsed.suffix)
+    assert filename.local_name == parsed.stem
+
+def test_parse_without_suffix_or_extension():
+    parser = _parser()
+    assert parser.parse("sub-01_ses-a").entities == {"subject": "01", "session": "a"}
+    assert parser.parse("sub-01.json").entities == {"subject": "01"}
+    assert parser.parse("scans.tsv").suffix == "scans"
+    assert parser.parse("sub-01_") is None
+    assert parser.parse("") is None
+
+@pytest.mark.parametrize("name, reason", [
+    ("sub-01_task-rest_ses-02_eeg.json", "must come before"),
+    ("sub-01_foo-bar_eeg.json", "unknown entity"),
+    ("sub-01_task-re_st_eeg.json", "unknown entity"),
+    ("sub-01_run-a_eeg.json", "not a valid value"),
+    ("sub-01_notasuffix.json", "unknown suffix"),
+    ("sub-01_sub-02_eeg.json", "given twice"),
+])
+def test_invalid_names(name, reason):
+    parser = _parser()
+    assert parser.parse(name) is None
+    with pytest.raises(ValueError, match=reason):
+        parser.parse(name, strict=True)
+
+def test_parse_many_and_walk(tmp_path):
+    parser = _parser()
+    names = ["sub-01_T1w.nii.gz", "notes.txt", "sub-02_ses-b_task-rest_events.tsv"]
+    parsed = parser.parse_many(names)
+    assert parsed[0].extension == ".nii.gz" and parsed[1] is None and parsed[2].suffix == "events"
+
+    (tmp_path / "sub-01" / "anat").mkdir(parents=True)
+    for name in ("sub-01_T1w.nii.gz", "notes.txt"):
+        (tmp_path / "sub-01" / "anat" / name).write_bytes(b"")
+    walked = {path.rsplit("/", 1)[-1]: result for path, result in parser.walk(tmp_path)}
+    assert walked["notes.txt"] is None
+    assert walked["sub-01_T1w.nii.gz"].entities == {"subject": "01"}
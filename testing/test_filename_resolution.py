@@ -0,0 +1,44 @@
+from bidsbuilder import BidsDataset
+
+def _dataset(tmp_path):
+    return BidsDataset(tmp_path.as_posix(), minimal=True)
+
+def test_resolved_entities_are_memoised(tmp_path):
+    dataset = _dataset(tmp_path)
+    sub = dataset.add_subject("01")
+    ses = sub.add_session("a")
+
+    ses_name = ses._tree_link._name_link
+    resolved = ses_name.resolved_entities
+    assert set(resolved) == {"subject", "session"}
+    assert ses_name.resolved_entities is resolved
+    assert ses_name.name == "sub-01_ses-a"
+
+def test_update_entity_invalidates_children(tmp_path):
+    dataset = _dataset(tmp_path)
+    sub = dataset.add_subject("01")
+    ses = sub.add_session("a")
+    ses_name = ses._tree_link._name_link
+    assert ses_name.name == "sub-01_ses-a"
+
+    sub.val = "02"
+    assert ses_name.resolved_entities["subject"].val == "02"
+    assert ses_name.name == "sub-02_ses-a"
+    assert ses._tree_link.relative_path == "/sub-02/ses-a/"
+
+def test_entity_order_and_batch_names(tmp_path):
+    from bidsbuilder.modules.core.filenames import CompositeFilename
+
+    dataset = _dataset(tmp_path)
+    order = CompositeFilename._entity_order
+    assert order["subject"] == (0, "sub")
+    assert order["session"] == (1, "ses")
+    assert list(order) == list(dataset.schema.rules.entities)
+
+    names = []
+    for i in range(3):
+        sub = dataset.add_subject(f"{i:02d}")
+        names.append(sub.add_session("a")._tree_link._name_link)
+
+    assert CompositeFilename.build_names(names) == ["sub-00_ses-a", "sub-01_ses-a", "sub-02_ses-a"]
+    assert CompositeFilename.build_names(names, local=True) == ["ses-a"] * 3
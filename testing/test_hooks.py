@@ -1,4 +1,4 @@
-from bidsbuilder.util.hooks import HookedDescriptor, DescriptorProtocol
+from bidsbuilder.util.hooks import HookedDescriptor, DescriptorProtocol, recheckScheduler, recheck_scheduler
 from attrs import define, field
 from typing import ClassVar
 import gc
@@ -133,13 +133,14 @@ def test_deleted_callback():
     assert len(demo_property.number.callbacks[id(t1)]) == 3
     assert len(demo_property.number.callbacks.keys()) == 1
     t1.number = 1
-    _mock1.assert_has_calls([call(10), call(10), call(1348)])
+    _mock1.assert_has_calls([call(10), call(1348)]) # the same method registered twice is only called once per change
+    assert _mock1.call_count == 2
     del smth1
     gc.collect()
     t1.number = 58193
     """test after as the weak references stay until they are tried and removed if None"""
     assert len(demo_property.number.callbacks[id(t1)]) == 1 
-    _mock1.assert_has_calls([call(10), call(10), call(1348), call(1348)])
+    _mock1.assert_has_calls([call(10), call(1348), call(1348)])
     t2 = demo_property(5)
     demo_property.number.add_callback(t2, smth2.my_callback)
     assert len(demo_property.number.callbacks.keys()) == 2
@@ -147,7 +148,7 @@ def test_deleted_callback():
     t1 = 5
     t2 = 5
     assert len(demo_property.number.callbacks) == 0
-    _mock1.assert_has_calls([call(10), call(10), call(1348), call(1348)])
+    _mock1.assert_has_calls([call(10), call(1348), call(1348)])
 
 def test_list_callback():
     t1 = demo_list_property([10,4,2])
@@ -242,6 +243,117 @@ def test_validator():
 def test_correct_callback_inputs():
     ...
 
+@define(slots=True)
+class demo_slot_storage():
+    _hooked_values:dict = field(init=False, factory=dict, repr=False, eq=False)
+    number:ClassVar = HookedDescriptor(int, default=0)
+    myItems:ClassVar[list] = HookedDescriptor(list)
+
+def test_values_kept_on_instance():
+    t1 = demo_slot_storage()
+    assert t1.number == 0
+    t1.number = 5
+    t1.myItems.append(1)
+    assert t1._hooked_values["number"] == 5 and t1.myItems == [1]
+    assert not demo_slot_storage.number.variables and not demo_slot_storage.myItems.variables
+
+def test_values_dropped_with_instance():
+    descriptor = demo_property.number
+    t1 = demo_property(3)
+    assert descriptor.variables[id(t1)] == 3
+    t1_id = id(t1)
+
+    del t1
+    gc.collect()
+    assert t1_id not in descriptor.variables
+
+def test_batch_coalesces_callbacks():
+    t1 = demo_list_property([1, 2])
+    _mock = Mock()
+    smth = demo_smthElse(0, _mock)
+    demo_list_property.myItems.add_callback(t1, smth.my_callback)
+
+    with t1.myItems.batch() as items:
+        items.append(3)
+        with items.batch(): # nested batches wait for the outermost
+            items[0] = 10
+        items.extend([4, 5])
+        _mock.assert_not_called()
+    _mock.assert_called_once_with(5)
+    assert t1.myItems == [10, 2, 3, 4, 5]
+
+    with t1.myItems.batch():
+        pass
+    _mock.assert_called_once() # nothing changed
+
+def test_validated_update_is_all_or_nothing():
+    @define(slots=True)
+    class demo_positive():
+        @staticmethod
+        def _validate(instance, descriptor, key, value):
+            if value < 0:
+                raise ValueError(f"{key} must be positive")
+            return (key, value)
+        myItems:ClassVar[dict] = HookedDescriptor(dict, fval=_validate)
+
+    t1 = demo_positive()
+    t1.myItems = {"a": 1}
+    try:
+        t1.myItems.update({"b": 2, "c": -1})
+    except ValueError:
+        pass
+    assert t1.myItems == {"a": 1}
+
+    t1.myItems.update({"b": 2}, c=3)
+    assert t1.myItems == {"a": 1, "b": 2, "c": 3}
+
+def test_scheduler_merges_rechecks():
+    scheduler = recheckScheduler()
+    _mock = Mock()
+
+    @define(slots=True)
+    class demo_core():
+        def check(self, tags=None):
+            _mock(self, tags)
+            if tags is not None and "suffix" in tags:
+                scheduler.schedule(self.check, "exists") # fired while flushing, queued rather than recursed into
+
+    core, other = demo_core(), demo_core()
+    with scheduler.operation():
+        scheduler.schedule(core.check, "entities")
+        with scheduler.operation():
+            scheduler.schedule(core.check, ["suffix"])
+        scheduler.schedule(other.check, "datatype")
+        assert scheduler.pending == 2
+        _mock.assert_not_called()
+
+    _mock.assert_has_calls([call(core, ["entities", "suffix"]), call(other, ["datatype"]), call(core, ["exists"])])
+    assert _mock.call_count == 3 and scheduler.pending == 0
+
+    _mock.reset_mock()
+    with scheduler.operation():
+        scheduler.schedule(core.check, "entities")
+        scheduler.schedule(core.check, None) # no tags checks everything
+    _mock.assert_called_once_with(core, None)
+
+    _mock.reset_mock()
+    scheduler.eager = True
+    with scheduler.operation():
+        scheduler.schedule(core.check, "entities")
+        _mock.assert_called_once_with(core, "entities")
+
+def test_exists_callbacks_wait_for_operation():
+    t1 = demo_property(10)
+    _mock = Mock()
+    smth = demo_smthElse(0, _mock)
+    demo_property.number.add_callback(t1, smth.my_callback)
+
+    with recheck_scheduler.operation():
+        t1.number = 1
+        t1.number = 2
+        _mock.assert_not_called()
+    _mock.assert_called_once_with(5)
+
 if __name__ == "__main__":
     print("Testing hooks 0")
     test_basic_instance_callbacks()
@@ -258,4 +370,40 @@ if __name__ == "__main__":
     # the following are not finished tests
 
     test_validator()
-    test_correct_callback_inputs()
\ No newline at end of file
+    test_correct_callback_inputs()
+def test_scheduler_flushes_everything_when_a_recheck_fails():
+    scheduler = recheckScheduler()
+    _mock = Mock()
+
+    def failing(tags=None):
+        raise ValueError("invalid")
+
+    scheduler.schedule(failing)
+    scheduler.schedule(_mock)
+    try:
+        scheduler.flush()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("the failing re-check should be raised")
+    _mock.assert_called_once_with(tags=None) # still run
+    assert scheduler.pending == 0 # nothing left over for a later operation
+
+def test_operation_keeps_the_error_of_its_body():
+    scheduler = recheckScheduler()
+    _mock = Mock()
+
+    def failing(tags=None):
+        raise RuntimeError("re-check failed")
+
+    try:
+        with scheduler.operation():
+            scheduler.schedule(failing)
+            scheduler.schedule(_mock)
+            raise ValueError("body failed")
+    except ValueError as e:
+        assert any("re-check failed" in note for note in e.__notes__)
+    else:
+        raise AssertionError("the error of the body should be raised")
+    _mock.assert_called_once_with(tags=None) # the queue is still run
+    assert scheduler.pending == 0 and scheduler._depth == 0
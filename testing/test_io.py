@@ -0,0 +1,38 @@
+import gzip
+import pandas as pd
+
+from bidsbuilder.util.io import _write_tsv
+
+df = pd.DataFrame({
+    "onset": [0.0, 1.5, 3.0, 4.5, 6.0],
+    "trial_type": ["go", None, "stop", "go", "stop"],
+    "channels": [[1, 2], [], "Cz", pd.NA, [3]],
+})
+
+def _reference(data:pd.DataFrame) -> str:
+    data = data.copy()
+    data["channels"] = data["channels"].apply(lambda c: "[" + ",".join(map(str, c)) + "]" if isinstance(c, list) else c)
+    return data.to_csv(None, sep="\t", index=False, na_rep="n/a")
+
+def test_chunked_tsv_matches_one_shot(tmp_path):
+    path = tmp_path / "sub-01_events.tsv"
+    _write_tsv(path, df, delimiters={"channels": ","}, chunksize=2)
+    assert path.read_text() == _reference(df)
+
+    empty = tmp_path / "empty_events.tsv"
+    _write_tsv(empty, df.iloc[0:0], delimiters={"channels": ","})
+    assert empty.read_text().splitlines() == ["onset\ttrial_type\tchannels"]
+
+def test_chunked_tsv_gzip(tmp_path):
+    path = tmp_path / "sub-01_physio.tsv.gz"
+    _write_tsv(path, df, delimiters={"channels": ","}, chunksize=3)
+    first = path.read_bytes()
+    assert gzip.decompress(first).decode() == _reference(df)
+
+    _write_tsv(path, df, True, delimiters={"channels": ","}, chunksize=4)
+    assert path.read_bytes() == first # no timestamp in the header, chunking doesn't change the output
+
+def test_motion_tsv_has_no_header(tmp_path):
+    path = tmp_path / "sub-01_motion.tsv"
+    _write_tsv(path, df[["onset"]], chunksize=2)
+    assert path.read_text().splitlines() == ["0.0", "1.5", "3.0", "4.5", "6.0"]
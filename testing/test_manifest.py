@@ -0,0 +1,69 @@
+import os
+import pandas as pd
+
+from bidsbuilder.util.io import _write_json, _write_tsv
+from bidsbuilder.util.manifest import buildManifest
+from bidsbuilder.modules.core.dataset_core import UnknownFile
+from bidsbuilder.modules.core.dataset_tree import Directory, FileEntry
+
+def test_unchanged_json_is_skipped(tmp_path):
+    manifest = buildManifest(tmp_path)
+    path = tmp_path / "dataset_description.json"
+
+    _write_json(path, {"Name": "test"}, manifest=manifest)
+    mtime = os.stat(path).st_mtime_ns
+    _write_json(path, {"Name": "test"}, manifest=manifest) # no overwrite needed, nothing is written
+    assert os.stat(path).st_mtime_ns == mtime
+    assert (manifest.written, manifest.skipped) == (1, 1)
+
+    _write_json(path, {"Name": "changed"}, True, manifest)
+    assert manifest.written == 2
+
+    # edits made outside of bidsbuilder are overwritten
+    path.write_text("{}")
+    _write_json(path, {"Name": "changed"}, True, manifest)
+    assert "changed" in path.read_text()
+
+def test_manifest_roundtrip(tmp_path):
+    manifest = buildManifest(tmp_path)
+    df = pd.DataFrame({"participant_id": ["sub-01", "sub-02"], "age": [20, 30]})
+    for name in ("participants.tsv", "events.tsv.gz"):
+        _write_tsv(tmp_path / name, df, manifest=manifest)
+    manifest.save()
+
+    loaded = buildManifest.load(tmp_path)
+    assert loaded.entries == manifest.entries
+    for name in ("participants.tsv", "events.tsv.gz"):
+        _write_tsv(tmp_path / name, df, manifest=loaded) # gzip output is deterministic, so also unchanged
+    assert (loaded.written, loaded.skipped) == (0, 2)
+
+def test_clean_objects_are_not_serialised(tmp_path):
+    manifest = buildManifest(tmp_path)
+    root = Directory(_name=tmp_path.as_posix(), _file_link=UnknownFile(), _name_link=None, parent=None)
+    core = UnknownFile()
+    root.children["README"] = FileEntry(_name="README", _file_link=core, _name_link=None, parent=root)
+
+    root._make(True, manifest)
+    assert core._dirty is False
+    assert manifest.written == 1
+
+    root._make(True, manifest)
+    assert manifest.skipped == 1
+
+    core.exists = True # hooked descriptors flag the object as changed
+    assert core._dirty is True
+
+def test_metadata_edits_are_rebuilt(tmp_path):
+    import json
+    from bidsbuilder import BidsDataset
+
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True)
+    dataset.dataset_description["Name"] = "first"
+    dataset.build(force=True, incremental=True)
+
+    description = dataset.dataset_description
+    assert description._dirty is False
+    description.metadata["Name"].val = "second" # set on the field, not through the file
+    assert description._dirty is True
+    dataset.build(force=True, incremental=True)
+    assert json.loads((tmp_path / "dataset_description.json").read_text())["Name"] == "second"
@@ -0,0 +1,262 @@
+import json
+import pytest
+
+from bidsbuilder import BidsDataset
+from bidsbuilder.modules.core.dataset_core import SourceFile
+from bidsbuilder.modules.core.dataset_tree import FileCollection
+from bidsbuilder.modules.core.filenames import CompositeFilename, agnosticFilename
+from bidsbuilder.modules.file_bases.directories import Subject, Session, Datatype
+from bidsbuilder.modules.file_bases.json_files import sidecar_JSONfile
+from bidsbuilder.modules.schema_objects import Metadata
+from bidsbuilder.schema.interpreter import fields_funcs
+
+def _write_dataset(root):
+    (root / "dataset_description.json").write_text(json.dumps({"Name": "read", "BIDSVersion": "1.10.0"}))
+    (root / "participants.tsv").write_text("participant_id\tage\nsub-01\t25\nsub-02\tn/a\n")
+    (root / "README.md").write_text("readme\n")
+    eeg = root / "sub-01" / "ses-a" / "eeg"
+    eeg.mkdir(parents=True)
+    (eeg / "sub-01_ses-a_task-rest_eeg.edf").write_bytes(b"\x00raw")
+    (eeg / "sub-01_ses-a_task-rest_eeg.json").write_text(json.dumps({"SamplingFrequency": 256}))
+    (eeg / "notes.txt").write_text("not bids\n")
+    (root / "sub-02" / "anat").mkdir(parents=True)
+    (root / "sub-02" / "anat" / "sub-02_T1w.nii.gz").write_bytes(b"nii")
+
+def _read(root):
+    return BidsDataset(root.as_posix(), minimal=True).read(workers=2)
+
+def test_read_builds_tree(tmp_path):
+    _write_dataset(tmp_path)
+    dataset = _read(tmp_path)
+
+    assert isinstance(dataset.tree.fetch("sub-01"), Subject)
+    assert isinstance(dataset.tree.fetch("sub-01/ses-a"), Session)
+    assert isinstance(dataset.tree.fetch("sub-02/anat"), Datatype)
+
+    collection = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_eeg", reference=False)
+    entities = collection._name_link.resolved_entities
+    assert {key: val.val for key, val in entities.items()} == {"subject": "01", "session": "a", "task": "rest"}
+    assert collection._name_link.resolved_suffix == "eeg"
+
+    assert isinstance(dataset.tree.fetch("sub-01/ses-a/eeg/notes.txt"), SourceFile)
+    assert dataset.dataset_description["Name"] == "read"
+
+    participants = dataset.tree.fetch("participants.tsv")
+    participants.flush()
+    assert participants.data.data.loc["sub-01", "age"] == 25
+    assert set(participants.data.data.index) == {"sub-01", "sub-02"}
+
+def test_build_in_place_keeps_files(tmp_path):
+    _write_dataset(tmp_path)
+    description = json.loads((tmp_path / "dataset_description.json").read_text())
+    (tmp_path / "dataset_description.json").write_text(json.dumps({**description, "MyCustomKey": "keep me"}))
+    before = {path: path.read_bytes() for path in tmp_path.rglob("*") if path.is_file()}
+
+    dataset = _read(tmp_path)
+    dataset.build(force=True)
+
+    after = {path: path.read_bytes() for path in tmp_path.rglob("*") if path.is_file() and ".bidsbuilder" not in path.parts}
+    assert set(after) == set(before)
+    changed = {path.name for path in before if before[path] != after[path]}
+    # GeneratedBy is added, the sidecar gets the keys its schema rules require written out as null
+    assert changed == {"dataset_description.json", "sub-01_ses-a_task-rest_eeg.json"}
+    for path in before:
+        if path.suffix == ".json": # every key read is written back, custom ones included
+            old, new = json.loads(before[path]), json.loads(after[path])
+            assert {key: new.get(key) for key in old} == old
+
+def test_tsv_headers_round_trip(tmp_path):
+    _write_dataset(tmp_path)
+    channels = tmp_path / "sub-01" / "ses-a" / "eeg" / "sub-01_ses-a_task-rest_channels.tsv"
+    channels.write_text("name\ttype\tunits\nFp1\tEEG\tuV\nFp2\tEEG\tuV\n")
+    events = channels.with_name("sub-01_ses-a_task-rest_events.tsv") # no index columns
+    events.write_text("onset\tduration\n0.5\t1\n2.5\t1\n")
+    dataset = _read(tmp_path)
+
+    table = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_channels.tsv")
+    table.flush()
+    # columns are keyed by their schema object, "name" of channels.tsv isn't "name" of electrodes.tsv
+    headers = table.data.headers
+    assert headers["name__channels"] == "name" and headers["type__channels"] == "type" and "units" not in headers
+    assert list(table.data.data["type__channels"]) == ["EEG", "EEG"]
+
+    dataset.build(force=True)
+    assert channels.read_text().splitlines()[:3] == ["name\ttype\tunits", "Fp1\tEEG\tuV", "Fp2\tEEG\tuV"]
+    assert events.read_text().splitlines() == ["onset\tduration", "0.5\t1", "2.5\t1"]
+
+def test_tsv_text_round_trip(tmp_path):
+    _write_dataset(tmp_path)
+    (tmp_path / "participants.tsv").write_text("participant_id\tage\tgroup\nsub-01\t25\t01\nsub-02\tn/a\t1.50\n")
+    channels = tmp_path / "sub-01" / "ses-a" / "eeg" / "sub-01_ses-a_task-rest_channels.tsv"
+    channels.write_text("name\ttype\tunits\tsampling_frequency\n01\tEEG\tuV\t256\n1.50\tEEG\tuV\t512.0\n")
+    before = {path: path.read_text() for path in (tmp_path / "participants.tsv", channels)}
+    dataset = _read(tmp_path)
+
+    participants = dataset.tree.fetch("participants.tsv")
+    participants.flush()
+    assert participants.data.data.loc["sub-01", "group"] == "01" # no type, kept as written
+    assert participants.data.data.loc["sub-01", "age"] == 25 # typed by the schema
+    table = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_channels.tsv")
+    table.flush()
+    assert list(table.data.data["name__channels"]) == ["01", "1.50"]
+
+    dataset.build(force=True)
+    for path, text in before.items():
+        assert path.read_text() == text
+
+def test_lazy_read_loads_on_access(tmp_path):
+    _write_dataset(tmp_path)
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True, lazy=True).read()
+
+    description = dataset.tree.fetch("dataset_description.json")
+    assert description._source is not None
+    assert description._metadata["Name"].val is None # schema checked, not loaded
+    assert dataset.dataset_description["Name"] == "read"
+    assert description._source is None
+
+    participants = dataset.tree.fetch("participants.tsv")
+    assert participants._source is not None
+    participants.flush()
+    assert participants.data.data.loc["sub-01", "age"] == 25
+
+def test_lazy_build_skips_untouched(tmp_path):
+    _write_dataset(tmp_path)
+    participants = tmp_path / "participants.tsv"
+    participants.write_text("participant_id\tage\nsub-01\t025\nsub-02\tn/a\n") # not how it would be written back
+    before = {path: path.read_bytes() for path in tmp_path.rglob("*") if path.is_file()}
+
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True, lazy=True).read()
+    dataset.build(force=True)
+
+    after = {path: path.read_bytes() for path in tmp_path.rglob("*") if path.is_file() and ".bidsbuilder" not in path.parts}
+    changed = {path.name for path in before if before[path] != after[path]}
+    assert changed == {"dataset_description.json"}
+
+    dataset.tree.fetch("participants.tsv").addValues("sub-02", {"age": 30})
+    dataset.build(force=True) # once accessed it is written from the object model
+    assert participants.read_text().splitlines()[1:] == ["sub-01\t25", "sub-02\t30"]
+
+def test_query_index(tmp_path):
+    _write_dataset(tmp_path)
+    eeg = tmp_path / "sub-01" / "ses-a" / "eeg"
+    (eeg / "sub-01_ses-a_task-rest_run-2_eeg.edf").write_bytes(b"")
+    (eeg / "sub-01_ses-a_task-rest_run-2_eeg.json").write_text("{}")
+    dataset = _read(tmp_path)
+
+    found = dataset.query(subject="01", suffix="eeg", extension=".json", reference=False)
+    assert [node.name for node in found] == [".json", ".json"]
+    assert [node.parent.name for node in dataset.query(run="2", datatype="eeg", reference=False)] == ["sub-01_ses-a_task-rest_run-2_eeg"] * 2
+    assert len(dataset.query(run=["1", "2"], extension=".edf")) == 1
+    assert dataset.query(subject="02", suffix="T1w")[0]._tree_link.relative_path == "/sub-02/anat/sub-02_T1w.nii.gz"
+    assert dataset.tree.fetch("sub-02", reference=False).query(subject="01") == []
+    assert dataset.tree._query_index.values("subject") == {"01", "02"}
+
+    def scan(**criteria): # what the index replaces
+        found = []
+        for node in dataset.tree._iter_tree():
+            if isinstance(node, FileCollection) or node.parent.is_dir: # only files of collections carry entities here
+                continue
+            filename = node.parent._name_link
+            if not hasattr(filename, "resolved_entities"): # participants.tsv...
+                continue
+            entities = {key: str(val.val) for key, val in filename.resolved_entities.items()}
+            if all(entities.get(key) == val for key, val in criteria.items()):
+                found.append(node._file_link)
+        return sorted(found, key=lambda core: core._tree_link.relative_path)
+
+    # a collection inheriting its subject and session from the folders above it
+    eeg_dir = dataset.tree.fetch("sub-01/ses-a/eeg", reference=False)
+    nap = eeg_dir.add_child(CompositeFilename.create({"task": ("optional", "nap")}, "eeg"), None, "collection")
+    nap.add_child(agnosticFilename('', [".edf"], ".edf"), SourceFile.create(_source=str(eeg / "sub-01_ses-a_task-rest_eeg.edf")))
+    assert len(dataset.query(subject="01", session="a", task="nap")) == 1
+
+    sub = dataset.tree.fetch("sub-01")
+    sub.val = "03" # renames re-index everything below
+    ses = dataset.tree.fetch("sub-03/ses-a")
+    ses.val = "b"
+    for criteria in ({"subject": "03"}, {"subject": "01"}, {"session": "a"}, {"session": "b"}):
+        assert dataset.query(**criteria) == scan(**criteria)
+    assert dataset.query(subject="01", task="nap") == []
+    assert dataset.query(subject="03", session="b", task="nap")[0]._tree_link.relative_path == "/sub-03/ses-b/eeg/task-nap_eeg.edf"
+
+    with pytest.raises(ValueError):
+        dataset.query(colour="blue")
+
+def test_sidecar_inheritance(tmp_path):
+    _write_dataset(tmp_path)
+    (tmp_path / "task-rest_eeg.json").write_text(json.dumps({"PowerLineFrequency": 50, "EEGReference": "Cz"}))
+    (tmp_path / "sub-01" / "sub-01_task-rest_eeg.json").write_text(json.dumps({"PowerLineFrequency": 60}))
+    (tmp_path / "sub-01" / "sub-01_task-nap_eeg.json").write_text(json.dumps({"PowerLineFrequency": 0})) # other task
+    dataset = _read(tmp_path)
+
+    edf = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_eeg.edf")
+    resolved = dataset.resolve_sidecar(edf)
+    assert dict(resolved) == {"PowerLineFrequency": 60, "EEGReference": "Cz", "SamplingFrequency": 256}
+    assert [core._tree_link.relative_path for core in resolved.sources] == [
+        "/task-rest_eeg.json", "/sub-01/sub-01_task-rest_eeg.json", "/sub-01/ses-a/eeg/sub-01_ses-a_task-rest_eeg.json"]
+    assert resolved["RecordingDuration"] is None # as null in the schema's expressions
+    assert dataset.resolve_sidecar(dataset.tree.fetch("participants.tsv")) is None
+
+    # a sidecar of the object model, its changes invalidate what was merged from it
+    sidecars = dataset.sidecars
+    eeg_dir = dataset.tree.fetch("sub-01/ses-a/eeg", reference=False)
+    nap = eeg_dir.add_child(CompositeFilename.create({"task": ("optional", "nap")}, "eeg"), None, "collection")
+    nap.add_child(agnosticFilename('', [".edf"], ".edf"), SourceFile.create(_source=str(tmp_path / "README.md")))
+    sidecar = nap.add_child(agnosticFilename('', [".json"], ".json"), sidecar_JSONfile.create())._file_link
+    sidecar._metadata.set_metadata({"PowerLineFrequency": Metadata("PowerLineFrequency", "recommended")})
+    sidecar["PowerLineFrequency"] = 55
+    nap_edf = dataset.tree.fetch("sub-01/ses-a/eeg/task-nap_eeg.edf")
+    assert dataset.resolve_sidecar(nap_edf)["PowerLineFrequency"] == 55
+
+    merged = len(sidecars._merged)
+    assert dataset.resolve_sidecar(nap_edf)["PowerLineFrequency"] == 55
+    assert len(sidecars._merged) == merged # cached
+    sidecar["PowerLineFrequency"] = 45
+    assert dataset.resolve_sidecar(nap_edf)["PowerLineFrequency"] == 45
+    assert dataset.resolve_sidecar(edf)["PowerLineFrequency"] == 60
+
+class _dependent():
+    """a file whose rules select on the sidecar values of edf"""
+    def __init__(self, dataset, edf):
+        self._dataset, self._tree_link, self.checks = dataset, edf._tree_link, []
+
+    def _check_schema(self, add_callbacks=False, tags=None):
+        self.checks.append(tags)
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_sidecar_rules_see_read_values(tmp_path, lazy):
+    _write_dataset(tmp_path)
+    values = {"SamplingFrequency": 256, "RecordingType": "epoched", "EpochLength": 2}
+    (tmp_path / "sub-01" / "ses-a" / "eeg" / "sub-01_ses-a_task-rest_eeg.json").write_text(json.dumps(values))
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True, lazy=lazy).read()
+
+    sidecar = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_eeg.json")
+    edf = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_eeg.edf")
+    assert dict(dataset.resolve_sidecar(edf)) == values # not what was merged before the contents were read
+    assert "EpochedData" in sidecar._cur_labels # selected by sidecar.RecordingType == "epoched"
+    assert sidecar["EpochLength"] == 2
+
+    dependent = _dependent(dataset, edf)
+    fields_funcs.sidecar(dependent, add_callbacks=True)
+    sidecar["RecordingType"] = "continuous"
+    dataset.flush()
+    assert dependent.checks == [None]
+    assert dataset.resolve_sidecar(edf)["RecordingType"] == "continuous"
+
+def test_fields_of_a_label_which_stops_applying_are_not_written(tmp_path):
+    _write_dataset(tmp_path)
+    path = tmp_path / "sub-01" / "ses-a" / "eeg" / "sub-01_ses-a_task-rest_eeg.json"
+    path.write_text(json.dumps({"SamplingFrequency": 256, "RecordingType": "epoched", "EpochLength": 2, "MyKey": "keep"}))
+    dataset = _read(tmp_path)
+
+    sidecar = dataset.tree.fetch("sub-01/ses-a/eeg/sub-01_ses-a_task-rest_eeg.json")
+    sidecar["RecordingType"] = "continuous"
+    sidecar._check_schema()
+    assert "EpochedData" not in sidecar._cur_labels
+    dataset.build(force=True)
+    written = json.loads(path.read_text())
+    assert "EpochLength" not in written and written["MyKey"] == "keep"
+
+    sidecar["RecordingType"] = "epoched" # applies again, with the value it had
+    sidecar._check_schema()
+    assert sidecar["EpochLength"] == 2
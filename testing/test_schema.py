@@ -74,6 +74,58 @@ def new():
     print(f"errors: {exception}")
     print(f"can't interpret: {cant_interpret}")
 
+def test_compiled_matches_interpreter():
+    for pair in schema.meta.expression_tests:
+        try:
+            func = SelectorParser.from_raw(pair["expression"])
+            expected = func()
+        except Exception:
+            continue
+
+        assert func.compile()() == expected, pair["expression"]
+
+def test_compiled_non_finite_literals():
+    from bidsbuilder.schema.interpreter.selectors import selectorFunc
+    big = "9" * 400 + ".0" # parses to inf
+    for expression, expected in [(f"{big} > 5", True), (f"-{big} < 0", True), (f"{big} - {big} == 0", False)]:
+        assert SelectorParser.from_raw(expression).compile()() == expected, expression
+
+    nan = selectorFunc(val=float("nan"))
+    assert nan.compile()() != nan.compile()()
+
+def test_compiled_hooks_match_interpreter(tmp_path):
+    from bidsbuilder import BidsDataset
+    from bidsschematools.schema import _find
+
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True)
+    cores = [node._file_link for node in dataset.tree._iter_tree() if node._file_link]
+    hooks = [struct["selectors"] for struct in _find(dataset.schema, lambda obj: "selectors" in obj)]
+
+    compared = 0
+    for hook in hooks:
+        for core in cores:
+            try:
+                expected = hook.interpret(core)
+            except Exception:
+                continue
+            assert hook(core) == expected, hook.original
+            compared += 1
+    assert compared > 0
+
+def test_static_match_patterns_are_precompiled():
+    import re
+    from bidsbuilder.schema.interpreter.evaluation_funcs import nMatch
+    from bidsbuilder.util.regex_cache import regex_cache_info, compile_pattern
+
+    func = SelectorParser.from_raw('match(extension, ".gz$")')
+    assert func.val is nMatch
+    assert isinstance(func.args[1], re.Pattern)
+    assert nMatch(".tsv.gz", func.args[1]) and not nMatch(".tsv", func.args[1])
+
+    before = regex_cache_info()
+    assert compile_pattern(".gz$") is func.args[1]
+    assert regex_cache_info().hits == before.hits + 1
+
 if __name__ == "__main__":
     new()
 
@@ -0,0 +1,51 @@
+from bidsbuilder.schema import schema_cache
+from bidsbuilder.schema.schema import build_schema, warm_schema_cache
+from bidsbuilder.schema.interpreter.selectors import selectorHook
+
+def test_warm_and_load_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv(schema_cache.CACHE_ENV_VAR, str(tmp_path))
+
+    assert schema_cache.load_cached_schema() is None
+    built = warm_schema_cache()
+    assert schema_cache.cache_file().is_file()
+
+    cached = schema_cache.load_cached_schema()
+    assert cached is not None
+    assert list(cached.rules.sidecars.keys()) == list(built.rules.sidecars.keys())
+
+    selector = cached.rules.sidecars.eeg.EEGHardware.selectors
+    assert isinstance(selector, selectorHook)
+    assert selector.original == built.rules.sidecars.eeg.EEGHardware.selectors.original
+    assert selector.tags == {"datatype", "suffix"}
+
+def test_stale_entries_are_replaced(tmp_path, monkeypatch):
+    monkeypatch.setenv(schema_cache.CACHE_ENV_VAR, str(tmp_path))
+
+    stale = tmp_path / f"schema-{schema_cache.cache_key().split('-')[0]}-outdated.pickle"
+    stale.write_bytes(b"old")
+    warm_schema_cache()
+
+    assert not stale.exists()
+    assert len(list(tmp_path.glob("schema-*.pickle"))) == 1
+
+def test_corrupt_cache_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setenv(schema_cache.CACHE_ENV_VAR, str(tmp_path))
+
+    schema_cache.cache_file().write_bytes(b"not a pickle")
+    assert schema_cache.load_cached_schema() is None
+
+def test_build_does_not_modify_loaded_schema():
+    import bidsschematools.schema as bst_schema
+
+    build_schema()
+    assert "meta" in bst_schema.load_schema()
+
+def test_lazy_selectors_compile_on_first_use():
+    schema = build_schema(lazy=True)
+    selector = schema.rules.sidecars.eeg.EEGHardware.selectors
+    assert not selector.is_compiled
+
+    eager = build_schema(lazy=False).rules.sidecars.eeg.EEGHardware.selectors
+    assert selector.tags == eager.tags
+    assert selector.is_compiled
+    assert [str(f) for f in selector.funcs] == [str(f) for f in eager.funcs]
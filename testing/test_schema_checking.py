@@ -0,0 +1,78 @@
+from bidsbuilder import BidsDataset
+from bidsbuilder.schema.schema_checking import schema_checker
+
+def _cores(tmp_path):
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True)
+    cores = [node._file_link for node in dataset.tree._iter_tree() if hasattr(node._file_link, "_schema_checker")]
+    return dataset, cores
+
+def test_batch_matches_single_checks(tmp_path):
+    dataset, cores = _cores(tmp_path)
+    sections = [dataset.schema.rules.dataset_metadata, dataset.schema.rules.tabular_data, dataset.schema.rules.sidecars]
+
+    for section in sections:
+        expected = []
+        for i, core in enumerate(cores):
+            for flag, label, _ in schema_checker.check_schema(core, section):
+                expected.append((i, flag, label))
+
+        batched = [(i, flag, label) for i, flag, label, _ in schema_checker.check_schema_batch(cores, section)]
+        assert sorted(batched) == sorted(expected)
+
+def test_batch_reports_deletions(tmp_path):
+    dataset, cores = _cores(tmp_path)
+    section = dataset.schema.rules.tabular_data
+
+    labels = [{"EEGChannels"} for _ in cores]
+    batched = list(schema_checker.check_schema_batch(cores, section, labels))
+    deleted = {i for i, flag, label, _ in batched if flag == "del" and label == "EEGChannels"}
+    assert deleted == set(range(len(cores)))
+
+def test_unfreezing_dataset_applies_batch(tmp_path):
+    dataset, _ = _cores(tmp_path) # the initial check happens when the dataset unfreezes at the end of __init__
+    description = dataset.dataset_description
+
+    assert "dataset_description" in description._cur_labels
+    assert description.metadata["Name"].level == "required"
+
+def test_renames_in_a_batch_recheck_once(tmp_path):
+    from bidsbuilder.util.hooks import recheck_scheduler
+    dataset, _ = _cores(tmp_path)
+    sub = dataset.add_subject("01")
+    sub.add_session("a")
+    sub.add_session("b")
+
+    with dataset.batch():
+        sub.val = "02"
+        sub.val = "03"
+        assert recheck_scheduler.pending == 4 # the subject and its two sessions, queued once each, and its participants row
+    assert recheck_scheduler.pending == 0
+    assert [node.name for node in sub._tree_link._iter_tree()] == ["sub-03", "ses-a", "ses-b"]
+
+    dataset.eager_checks = True
+    try:
+        sub.val = "04"
+        assert recheck_scheduler.pending == 0
+    finally:
+        dataset.eager_checks = False
+
+def test_context_values_compare_entities_by_value(tmp_path):
+    from types import MappingProxyType
+    from bidsbuilder.schema.schema_checking import SHARED_FIELDS, _context_value
+    dataset, _ = _cores(tmp_path)
+    first = dataset.add_subject("01").add_session("a")._tree_link._name_link.resolved_entities
+    other = dataset.add_subject("02").add_session("a")._tree_link._name_link.resolved_entities
+
+    copy = MappingProxyType(dict(first)) # another mapping of the same entities
+    assert _context_value(copy) == _context_value(first)
+    assert _context_value(first) != _context_value(other)
+    assert "path" not in SHARED_FIELDS # unique per file, grouping by it only adds overhead
+
+def test_eager_checks_kept_by_later_datasets(tmp_path):
+    from bidsbuilder.util.hooks import recheck_scheduler
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True, eager_checks=True)
+    try:
+        BidsDataset((tmp_path / "other").as_posix(), minimal=True) # not given, so left as it is
+        assert dataset.eager_checks and recheck_scheduler.eager
+    finally:
+        dataset.eager_checks = False
@@ -0,0 +1,54 @@
+from bidsbuilder.schema.schema import build_schema
+from bidsbuilder.schema.selector_index import selectorIndex
+
+schema = build_schema()
+
+def _labels(index:selectorIndex, key:tuple) -> list[str]:
+    return [index.labels[i] for i in index.candidates(key)]
+
+def test_guards_select_matching_rules():
+    index = selectorIndex(schema.rules.tabular_data)
+
+    labels = _labels(index, ("eeg", "channels", ".tsv"))
+    assert "EEGChannels" in labels
+    assert "MEGChannels" not in labels
+    assert len(labels) < len(index)
+
+    # match(extension, ...) guards are evaluated on the key too
+    sidecars = selectorIndex(schema.rules.sidecars)
+    assert "MRIHardware" in _labels(sidecars, ("anat", "T1w", ".nii.gz"))
+    assert "MRIHardware" not in _labels(sidecars, ("anat", "T1w", ".json"))
+
+def test_unhashable_key_falls_back_to_all_rules():
+    index = selectorIndex(schema.rules.tabular_data)
+    assert len(index.candidates(None)) == len(index)
+
+def test_current_labels_are_kept_for_deletion():
+    index = selectorIndex(schema.rules.tabular_data)
+
+    class fakeCore:
+        _tree_link = None # not in a tree, so every key field is None
+
+    rules = list(index.iter_rules(fakeCore(), {"EEGChannels"}))
+    flagged = {label: possible for label, _, possible in rules}
+    assert flagged["EEGChannels"] is False
+    assert all(possible for label, possible in flagged.items() if label != "EEGChannels")
+
+def test_real_file_key_narrows_rules(tmp_path):
+    from bidsbuilder import BidsDataset
+    from bidsbuilder.modules.core.filenames import CompositeFilename, agnosticFilename
+    from bidsbuilder.modules.file_bases.tabular_files import tabularFile
+    from bidsbuilder.schema.selector_index import file_key
+
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True)
+    eeg = dataset.add_subject("01").add_datatype("eeg")
+    collection = eeg._tree_link.add_child(CompositeFilename.create({"task": ("optional", "rest")}, "channels"), None, "collection")
+    channels = collection.add_child(agnosticFilename('', [".tsv"], ".tsv"), tabularFile.create())._file_link
+
+    key = file_key(channels)
+    assert key == ("eeg", "channels", ".tsv")
+    index = selectorIndex(dataset.schema.rules.tabular_data)
+    labels = _labels(index, key)
+    assert "EEGChannels" in labels and "MEGChannels" not in labels
+    assert len(labels) < len(index)
+    assert "EEGChannels" in channels._cur_labels # the schema check applies the narrowed rules
@@ -1,3 +1,6 @@
+import pytest
+import pandas as pd
+import pandera.pandas as pa
 from bidsbuilder.schema.schema import parse_load_schema
 from bidsbuilder.modules.file_bases.tabular_files import _set_tabular_schema, tabularFile
 from bidsbuilder.modules.schema_objects import _set_object_schemas
@@ -8,14 +11,102 @@ schema = parse_load_schema(debug=True)
 _set_object_schemas(schema=schema)
 _set_tabular_schema(schema=schema)
 
-test_file = tabularFile()
-test_file_name = FileCollection(parent=None, _name=r"C:\Users\augus\BCI_Stuff\Aspen\test.tsv", _file_link=test_file, _name_link=None)
-test_file._tree_link = test_file_name
-
-cur_schema = schema.rules.tabular_data.modality_agnostic.Participants
-test_file._add_metadata_(cur_schema)
-test_file.addRow(pk="sub-person")
-test_file.addRow(pk="sub-pers")
-test_file.addColumn("age")
-test_file.addValues("sub-pers", {"age": 29})
-test_file._make_file(force=True)
\ No newline at end of file
+def test_make_file(tmp_path):
+    test_file = tabularFile()
+    test_file_name = FileCollection(parent=None, _name=(tmp_path / "test.tsv").as_posix(), _file_link=test_file, _name_link=None)
+    test_file._tree_link = test_file_name
+
+    cur_schema = schema.rules.tabular_data.modality_agnostic.Participants
+    test_file._add_metadata_(cur_schema)
+    test_file.addRow(pk="sub-person")
+    test_file.addRow(pk="sub-pers")
+    test_file.addColumn("age")
+    test_file.addValues("sub-pers", {"age": 29})
+    test_file._make_file(force=True)
+    assert (tmp_path / "test.tsv").read_text().splitlines() == ["participant_id\tage", "sub-person\tn/a", "sub-pers\t29"]
+
+def _participants():
+    table = tabularFile()
+    table._add_metadata_(schema.rules.tabular_data.modality_agnostic.Participants)
+    return table
+
+def test_append_rows_flush_together():
+    table = _participants()
+    for i in range(50):
+        table.appendRow(f"sub-{i:02d}")
+    assert table.isRow("sub-49")
+    assert len(table.data.data) == 0
+
+    table.flush()
+    assert table.data.data.index.tolist() == [f"sub-{i:02d}" for i in range(50)]
+
+def test_append_rows_report_each_bad_row():
+    table = _participants()
+    table.appendRow("sub-01")
+    table.appendRow("not a subject")
+    table.appendRow("sub-02")
+    table.appendRow("sub 03")
+    try:
+        table.flush()
+    except ExceptionGroup as group:
+        notes = sorted(exc.__notes__[0] for exc in group.exceptions)
+        assert notes == ["while adding row not a subject", "while adding row sub 03"]
+    else:
+        raise AssertionError("invalid rows should be raised")
+
+    assert table.data.data.index.tolist() == ["sub-01", "sub-02"] # the valid rows are still added
+
+def test_typed_storage():
+    table = _participants()
+    table.set_storage("typed")
+    table.addColumn("sex")
+    table.addRow("sub-01", {"sex": "M"})
+    table.appendRow("sub-02", {"sex": "F"})
+    table.flush()
+
+    data = table.data.data
+    assert isinstance(data["sex"].dtype, pd.CategoricalDtype)
+    assert data["participant_id"].dtype == pd.StringDtype("python")
+    assert data["sex"].tolist() == ["M", "F"]
+
+    try:
+        table.addValues("sub-01", {"sex": "not a sex"})
+    except pa.errors.SchemaError:
+        pass
+    else:
+        raise AssertionError("values are validated whatever the storage")
+
+    table.set_storage("object")
+    assert (table.data.data.dtypes == object).all()
+
+def test_subjects_in_a_batch_merge_once(tmp_path, monkeypatch):
+    from bidsbuilder import BidsDataset
+    from bidsbuilder.modules.file_bases.directories import Subject
+    from bidsbuilder.modules.file_bases.tabular_files import tableView
+    dataset = BidsDataset(tmp_path.as_posix(), minimal=True)
+    participants = dataset.tree.fetch("participants.tsv")
+    participants.flush()
+
+    merges = []
+    merge = tableView._merge_validated
+    monkeypatch.setattr(tableView, "_merge_validated", lambda self, *args, **kwargs: merges.append(1) or merge(self, *args, **kwargs))
+    with dataset.batch():
+        for i in range(20):
+            dataset.add_subject(f"{i:02d}")
+        assert len(participants.data.data) == 0 # appended, validated when the batch ends
+    assert len(merges) == 1
+    assert participants.data.data.index.tolist() == [f"sub-{i:02d}" for i in range(20)]
+
+    dataset.add_subject("20") # a batch of its own, validated before add_subject returns
+    assert participants.data._pending == [] and participants.isRow("sub-20")
+
+    data = participants.data
+    data.data_schema = data.data_schema.update_column("participant_id", checks=[pa.Check(lambda ids: ids != "sub-bad")])
+    n_subjects = Subject._n_subjects
+    with pytest.raises(ExceptionGroup):
+        with dataset.batch():
+            dataset.add_subject("bad")
+            dataset.add_subject("good")
+    assert "sub-bad" not in dataset.tree and "sub-good" in dataset.tree
+    assert not participants.isRow("sub-bad") and participants.isRow("sub-good")
+    assert Subject._n_subjects == n_subjects + 1
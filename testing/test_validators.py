@@ -0,0 +1,79 @@
+import pandas as pd
+
+from bidsbuilder.schema.schema import parse_load_schema
+from bidsbuilder.modules.schema_objects import _set_object_schemas, Column, UserDefinedColumn, Metadata
+
+schema = parse_load_schema()
+_set_object_schemas(schema=schema)
+
+values = [0, 1, -1, 2.5, 1e9, True, "", "abc", "n/a", "sub-01", "M", "male", "left", "2020-01-01T00:00:00",
+          "https://bids.neuroimaging.io", [1, 2], [], ["a", "b"], {"a": 1}, None, pd.NA]
+series = pd.Series(values, dtype=object, index=range(100, 100 + len(values)))
+
+def test_compiled_columns_match_val_checker():
+    checked = 0
+    for name in schema.objects.columns.keys():
+        col = Column(name, "optional")
+        try:
+            result = col.vectorized_val_checker(series)
+        except RuntimeError: # types the scalar checker doesn't support either
+            continue
+
+        assert result.index.equals(series.index)
+        for val, got in zip(values, result):
+            try:
+                expected = col.val_checker(val)
+            except Exception:
+                continue
+            assert got == expected, f"{name}: {val!r} gave {got}, val_checker gave {expected}"
+        checked += 1
+    assert checked > 50
+
+def test_compiled_user_column():
+    col = UserDefinedColumn.create("reaction_time", Maximum=10, Minimum=0)
+    vals = [5, 11, -1, [1, 20], [2, 3], 0, "x"]
+    result = col.vectorized_val_checker(pd.Series(vals, dtype=object)).tolist()
+    assert result == [True, False, False, False, True, True, False]
+
+    col = UserDefinedColumn.create("hand", Levels={"left": "Left", "right": "Right"})
+    assert col.vectorized_val_checker(pd.Series(["left", "up", "right"])).tolist() == [True, False, True]
+
+    col = UserDefinedColumn.create("channels", Delimiter=",")
+    assert col.vectorized_val_checker(pd.Series([["Cz", "Pz"], "Cz", []], dtype=object)).tolist() == [True, False, True]
+
+def test_compiled_values_match_interpreter():
+    checked = 0
+    for cls, objects in ((Metadata, schema.objects.metadata), (Column, schema.objects.columns)):
+        for name in objects.keys():
+            obj = cls(name, "optional")
+            if getattr(obj, "_has_definition", False): # checked by the UserDefinedColumn instead
+                continue
+            rules = obj._rules()
+            for val in values:
+                try:
+                    expected, _ = obj._validate_new_val(val, rules, "")
+                except Exception as e:
+                    expected = type(e)
+                try:
+                    got = obj._value_validator()(val)
+                except Exception as e:
+                    got = type(e)
+                assert got == expected, f"{name}: {val!r} gave {got}, _validate_new_val gave {expected}"
+            checked += 1
+    assert checked > 400
+
+def test_setting_values_leaves_schema_untouched():
+    meta = Metadata("TaskName", "required")
+    Metadata._override[meta] = {"enum": ["rest"]}
+    before = dict(schema.objects.metadata.TaskName.items())
+
+    meta.val = "rest"
+    try:
+        meta.val = "nback"
+    except ValueError as e:
+        assert "must be one of ['rest']" in str(e)
+    else:
+        raise AssertionError("the override only allows rest")
+
+    assert dict(schema.objects.metadata.TaskName.items()) == before
+    assert Metadata("TaskName", "optional")._value_validator() is Metadata("TaskName", "required")._value_validator()